@@ -0,0 +1,60 @@
+"""比较各特征后端在相同模板/背景对上的耗时和精度
+
+用法:
+    python -m benchmarks.featureBackends [--width 1920 --height 1080 --cases 5 --repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framework.lib.imgFeature import BACKENDS, FeatureBackend
+from framework.lib.imgTool import ImageProcessor
+from benchmarks.synthetic import corner_error, make_cases
+
+
+def run(width: int, height: int, cases: int, repeat: int, tolerance: float):
+    samples = make_cases(width, height, cases)
+    backends = list(BACKENDS.values()) + [FeatureBackend('orb', matcher='lsh'),
+                                          FeatureBackend('sift', tiles=(2, 2)), 'auto']
+
+    print(f"背景 {width}x{height}, 用例 {cases}, 每例重复 {repeat} 次")
+    print(f"{'后端':<16}{'p50(ms)':>10}{'p95(ms)':>10}{'成功率':>8}{'最大误差':>10}")
+    for backend in backends:
+        timings, hits, errors = [], 0, []
+        for case in samples:
+            if backend == 'auto':
+                # 选择过程只在首次使用模板时进行，不计入单次耗时
+                ImageProcessor.select_backend(case.template, case.scene)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                corners = ImageProcessor.get_corners(case.template, case.scene, backend=backend)
+                timings.append((time.perf_counter() - start) * 1000)
+                if corners is not None:
+                    error = corner_error(corners, case.box)
+                    errors.append(error)
+                    hits += error <= tolerance
+        label = backend if isinstance(backend, str) else f"{backend.name}/{backend.matcher}"
+        if getattr(backend, 'tiles', None):
+            label += f"/{backend.tiles[0]}x{backend.tiles[1]}"
+        max_error = f"{max(errors):.1f}" if errors else "-"
+        print(f"{label:<16}{np.percentile(timings, 50):>10.1f}{np.percentile(timings, 95):>10.1f}"
+              f"{hits / len(timings):>8.0%}{max_error:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="特征后端性能对比")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--cases', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=3.0, help="判定成功的最大角点误差(像素)")
+    args = parser.parse_args()
+
+    from loguru import logger
+    logger.remove()
+    run(args.width, args.height, args.cases, args.repeat, args.tolerance)
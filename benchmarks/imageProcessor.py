@@ -0,0 +1,209 @@
+"""ImageProcessor 常用方法的微基准测试
+
+在多种分辨率的合成界面截图上运行 load_and_process_images、mark_target、compare_image_v3、
+compare_image_colors、colors_exists 和 crop_image_by_corners，记录每次调用的耗时分位数、
+Python/NumPy 内存分配峰值(tracemalloc)以及与已知真实结果对照的准确率。
+结果可保存为 JSON 基线，之后用 --compare 与基线对比，耗时、内存或准确率退化时返回非零退出码。
+不需要显示器，可在普通 Linux 机器或 CI 中运行。
+
+用法:
+    python -m benchmarks.imageProcessor [--sizes 1280x720,1920x1080] [--repeat 10] [--save baseline.json]
+    python -m benchmarks.imageProcessor --compare baseline.json [--threshold 0.2]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framework.lib.imgTool import ImageProcessor
+from benchmarks.synthetic import corner_error, make_cases, make_indicator, make_ui_scene
+
+RED = [[0, 100, 100], [10, 255, 255]]
+
+
+class Trial(NamedTuple):
+    """一次基准调用: 无参函数及判断其返回值是否正确的函数"""
+    call: Callable[[], object]
+    check: Callable[[object], bool]
+
+
+def _corners(box: Tuple[int, int, int, int]) -> List[List[int]]:
+    x, y, w, h = box
+    return [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+
+
+def make_trials(width: int, height: int, cases: int, tolerance: float) -> Dict[str, List[Trial]]:
+    """为每个被测方法生成带真实结果的调用列表"""
+    samples = make_cases(width, height, cases)
+    # 不在场景中的模板，用于检查相似度判断的误报
+    foreign = make_cases(width, height, cases, seed=100)
+    radius = height // 4
+    red, _ = make_indicator(width, height, (0, 0, 255), radius)
+    red_other, _ = make_indicator(width, height, (0, 0, 255), radius, seed=1)
+    red_small, _ = make_indicator(width, height, (0, 0, 255), radius // 2)
+    green, _ = make_indicator(width, height, (0, 255, 0), radius)
+    blank = make_ui_scene(width, height, seed=200)
+
+    def located(box):
+        return lambda matches: any(abs(m[0] - box[0]) <= tolerance and abs(m[1] - box[1]) <= tolerance
+                                   for m in matches)
+
+    trials = {
+        'load_and_process_images': [
+            Trial(lambda c=c: ImageProcessor.load_and_process_images(c.template, c.scene)[2],
+                  lambda dst, c=c: corner_error(dst, c.box) <= tolerance) for c in samples],
+        'mark_target': [
+            Trial(lambda c=c: ImageProcessor.mark_target(c.template, c.scene, show=False), located(c.box))
+            for c in samples],
+        'compare_image_v3': (
+            [Trial(lambda c=c: ImageProcessor.compare_image_v3(c.template, c.scene), lambda r: r is True)
+             for c in samples]
+            + [Trial(lambda c=c: ImageProcessor.compare_image_v3(c.template, blank), lambda r: r is False)
+               for c in foreign[:1]]),
+        'compare_image_colors': [
+            Trial(lambda: ImageProcessor.compare_image_colors(red, red_other, RED, 0.9), lambda r: r is True),
+            Trial(lambda: ImageProcessor.compare_image_colors(red, red_small, RED, 0.9), lambda r: r is False),
+        ],
+        'colors_exists': [
+            Trial(lambda: ImageProcessor.colors_exists(red, RED, 0.05), lambda r: r is True),
+            Trial(lambda: ImageProcessor.colors_exists(green, RED, 0.05), lambda r: r is False),
+        ],
+        'crop_image_by_corners': [
+            Trial(lambda c=c: ImageProcessor.crop_image_by_corners(c.scene, _corners(c.box)),
+                  lambda crop, c=c: crop is not None and np.array_equal(crop, c.template)) for c in samples],
+    }
+    return trials
+
+
+def measure(trials: List[Trial], repeat: int) -> dict:
+    """计时、统计内存分配峰值和准确率
+
+    每个调用先预热一次(不计时)，再计时 repeat 次；内存分配单独用 tracemalloc 跟踪一次，避免影响计时。
+    """
+    timings, peaks, correct = [], [], 0
+    for trial in trials:
+        correct += bool(trial.check(trial.call()))
+        for _ in range(repeat):
+            start = time.perf_counter()
+            trial.call()
+            timings.append((time.perf_counter() - start) * 1000)
+        tracemalloc.start()
+        trial.call()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p95_ms': round(float(np.percentile(timings, 95)), 4),
+        'mean_ms': round(float(np.mean(timings)), 4),
+        'peak_kb': round(max(peaks) / 1024, 1),
+        'accuracy': round(correct / len(trials), 4),
+        'calls': len(timings),
+    }
+
+
+def run(sizes: List[Tuple[int, int]], cases: int, repeat: int, tolerance: float,
+        only: List[str] = None) -> Dict[str, dict]:
+    results = {}
+    for width, height in sizes:
+        for name, trials in make_trials(width, height, cases, tolerance).items():
+            if only and name not in only:
+                continue
+            # 被测方法中的 print 不计入报告
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results[f"{name}@{width}x{height}"] = measure(trials, repeat)
+            ImageProcessor.template_cache.clear()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            min_ms: float = 0.05) -> List[str]:
+    """与基线对比，返回退化项的描述
+
+    耗时(p50、p95)或内存峰值超过基线的 1 + threshold 倍，或准确率下降时视为退化；
+    基线耗时小于 min_ms 的项只比较准确率，避免计时噪声造成误报。
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'peak_kb'):
+            if metric != 'peak_kb' and base[metric] < min_ms:
+                continue
+            if current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {base[metric]} -> {current[metric]}")
+        if current['accuracy'] < base['accuracy']:
+            regressions.append(f"{key} accuracy: {base['accuracy']} -> {current['accuracy']}")
+    return regressions
+
+
+def report(results: Dict[str, dict], baseline: Dict[str, dict] = None) -> None:
+    print(f"{'方法@分辨率':<40}{'p50(ms)':>10}{'p95(ms)':>10}{'峰值(KB)':>11}{'准确率':>8}{'p50变化':>10}")
+    for key, r in results.items():
+        base = (baseline or {}).get(key)
+        delta = f"{r['p50_ms'] / base['p50_ms'] - 1:+.0%}" if base and base['p50_ms'] > 0 else "-"
+        print(f"{key:<40}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['peak_kb']:>11.1f}"
+              f"{r['accuracy']:>8.0%}{delta:>10}")
+
+
+def _environment() -> dict:
+    return {'python': platform.python_version(), 'opencv': cv2.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ImageProcessor 微基准测试")
+    parser.add_argument('--sizes', default='960x540,1280x720,1920x1080', help="逗号分隔的背景分辨率")
+    parser.add_argument('--cases', type=int, default=3, help="每种分辨率的模板数")
+    parser.add_argument('--repeat', type=int, default=5, help="每个调用的计时次数")
+    parser.add_argument('--tolerance', type=float, default=3.0, help="判定定位正确的最大偏差(像素)")
+    parser.add_argument('--only', default='', help="只运行指定的方法，逗号分隔")
+    parser.add_argument('--save', help="将结果保存为 JSON 基线")
+    parser.add_argument('--compare', help="与 JSON 基线对比，有退化时返回 1")
+    parser.add_argument('--threshold', type=float, default=0.2, help="判定退化的相对增幅")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+    logger.remove()
+
+    sizes = [tuple(int(v) for v in size.split('x')) for size in args.sizes.split(',')]
+    only = [name for name in args.only.split(',') if name]
+    results = run(sizes, args.cases, args.repeat, args.tolerance, only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'environment': _environment(), 'args': vars(args), 'results': results},
+                      f, ensure_ascii=False, indent=1)
+        print(f"基线已保存: {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"退化: {line}")
+        if regressions:
+            return 1
+        print("未发现退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+from typing import List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+
+class SyntheticCase(NamedTuple):
+    """合成测试用例: 背景截图、模板及模板在背景中的真实位置 (x, y, w, h)"""
+    scene: np.ndarray
+    template: np.ndarray
+    box: Tuple[int, int, int, int]
+
+
+def make_ui_scene(width: int = 1280, height: int = 720, seed: int = 0) -> np.ndarray:
+    """生成类似应用界面的合成截图: 渐变背景、色块、按钮和文字"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 90, height, dtype=np.float32)[:, None]
+    scene = np.empty((height, width, 3), dtype=np.uint8)
+    scene[:] = np.repeat(gradient, width, axis=1)[..., None].astype(np.uint8)
+
+    # 背景纹理，保证特征检测有足够的角点
+    noise = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    texture = cv2.resize(noise, (width, height), interpolation=cv2.INTER_NEAREST)
+    scene = cv2.addWeighted(scene, 0.6, texture, 0.4, 0)
+
+    scale = width / 1280
+    for i in range(int(60 * scale * scale) + 20):
+        x = int(rng.integers(0, width - 80 * scale))
+        y = int(rng.integers(0, height - 40 * scale))
+        w = int(rng.integers(40, 160) * scale)
+        h = int(rng.integers(24, 60) * scale)
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(scene, (x, y), (x + w, y + h), color, -1)
+        cv2.rectangle(scene, (x, y), (x + w, y + h), (255, 255, 255), max(1, int(scale)))
+        cv2.putText(scene, f"BTN{i}", (x + 4, y + h - 6), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5 * scale, (0, 0, 0), max(1, int(scale)), cv2.LINE_AA)
+    return scene
+
+
+def make_cases(width: int = 1280, height: int = 720, count: int = 5, seed: int = 0,
+               template_size: Tuple[int, int] = (160, 90)) -> List[SyntheticCase]:
+    """生成若干模板/背景对，模板从背景中裁剪，真实位置已知"""
+    rng = np.random.default_rng(seed)
+    scene = make_ui_scene(width, height, seed)
+    tw, th = template_size
+    cases = []
+    for _ in range(count):
+        x = int(rng.integers(0, width - tw))
+        y = int(rng.integers(0, height - th))
+        template = scene[y:y + th, x:x + tw].copy()
+        cases.append(SyntheticCase(scene, template, (x, y, tw, th)))
+    return cases
+
+
+def corner_error(corners, box: Tuple[int, int, int, int]) -> float:
+    """匹配角点与真实位置四角的最大偏差(像素)"""
+    x, y, w, h = box
+    truth = np.float32([[x, y], [x, y + h - 1], [x + w - 1, y + h - 1], [x + w - 1, y]])
+    return float(np.abs(np.float32(corners).reshape(-1, 2) - truth).max())
+
+
+def make_indicator(width: int = 120, height: int = 120, color: Tuple[int, int, int] = (0, 0, 255),
+                   radius: int = 40, seed: int = 0) -> Tuple[np.ndarray, float]:
+    """生成状态指示灯图片: 暗色噪声背景上的一个纯色圆
+
+    Returns:
+        (图片, 圆形像素占比)
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.integers(20, 60, (height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.circle(mask, (width // 2, height // 2), radius, 255, -1)
+    image[mask > 0] = color
+    return image, cv2.countNonZero(mask) / mask.size
@@ -0,0 +1,199 @@
+"""多进程批量图像匹配
+
+用法:
+    python -m framework.lib.imgBatch --templates <模板文件或目录> --backgrounds <背景文件或目录>
+                                     [--mode center] [--workers 4] [--backend sift] [--output result.jsonl]
+
+模板和背景均可为单个文件或目录，程序对两者的每一对组合做匹配，结果按完成顺序逐行输出为 JSON。
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import nullcontext, redirect_stdout
+from itertools import product
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import cv2
+from loguru import logger
+
+from .imgFrame import Frame
+from .imgTool import ImageProcessor
+
+# 批量匹配时识别的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+# 匹配模式及对应的 ImageProcessor 方法
+MODES = {
+    'center': lambda src, back, backend: ImageProcessor.get_center_location(src, back, backend=backend),
+    'corners': lambda src, back, backend: ImageProcessor.get_corners(src, back, backend=backend),
+    # 模板匹配不使用特征后端；不读写进程内的位置记录，结果与任务分配到哪个进程无关
+    'template': lambda src, back, backend: ImageProcessor.find_template(src, back, use_location=False),
+}
+
+
+class BatchResult(NamedTuple):
+    """单个 (模板, 背景) 组合的匹配结果"""
+    template: str
+    background: str
+    result: object
+    elapsed: float
+    error: Optional[str] = None
+
+
+def list_images(path: str) -> List[str]:
+    """列出目录下的图片文件(按文件名排序)，传入文件时直接返回该文件"""
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"路径不存在: {path}")
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+# 工作进程内的状态: 最近使用的背景帧，同一背景的后续任务复用其解码结果和特征索引
+_frames: 'OrderedDict[str, Frame]' = OrderedDict()
+_max_frames = 4
+_backend = None
+_quiet = False
+
+
+def _init_worker(backend, quiet: bool) -> None:
+    """工作进程初始化: 限制 OpenCV 线程数，避免多个进程争用CPU"""
+    global _backend, _quiet
+    cv2.setNumThreads(1)
+    _backend = backend
+    _quiet = quiet
+    if quiet:
+        logger.remove()
+
+
+def _frame(background: str) -> Frame:
+    frame = _frames.pop(background, None) or Frame(background)
+    _frames[background] = frame
+    while len(_frames) > _max_frames:
+        _frames.popitem(last=False)
+    return frame
+
+
+def _run_task(task) -> BatchResult:
+    template, background, mode = task
+    start = time.perf_counter()
+    try:
+        # ImageProcessor 部分方法直接 print 错误信息，避免与命令行输出的结果混在一起
+        with redirect_stdout(io.StringIO()) if _quiet else nullcontext():
+            result = MODES[mode](template, _frame(background), _backend)
+        return BatchResult(template, background, result, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(template, background, None, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+
+def _order(templates: Sequence[str], backgrounds: Sequence[str], mode: str) -> List[tuple]:
+    """生成任务列表，同一背景的任务相邻，使工作进程能复用缓存的背景帧"""
+    return [(template, background, mode) for background, template in product(backgrounds, templates)]
+
+
+def batch_match(templates: Union[str, Sequence[str]], backgrounds: Union[str, Sequence[str]],
+                mode: str = 'center', workers: Optional[int] = None, backend=None,
+                chunksize: int = 1, quiet: bool = True) -> Iterator[BatchResult]:
+    """在进程池中批量匹配，结果按完成顺序逐个返回
+
+    每个工作进程常驻内存，模板特征缓存(ImageProcessor.template_cache)和最近使用的背景帧
+    在同一进程的多个任务间复用，因此一个背景对应大量模板、或一个模板对应大量截图时，
+    特征只在每个进程中计算一次。
+
+    Args:
+        templates: 模板文件路径、目录或路径列表
+        backgrounds: 背景文件路径、目录或路径列表
+        mode: 'center'(中心点)、'corners'(四角坐标) 或 'template'(模板匹配)
+        workers: 进程数，None 时使用CPU核数；为 1 时在当前进程中执行
+        backend: 特征后端名称或 FeatureBackend，需可被 pickle；'template' 模式不支持
+        chunksize: 每次分发给工作进程的任务数，任务很多且单个很快时可适当调大
+        quiet: 是否关闭工作进程中的日志输出
+
+    Returns:
+        按完成顺序产生 BatchResult 的迭代器
+
+    Raises:
+        ValueError: 匹配模式无效或 'template' 模式指定了特征后端时抛出
+        FileNotFoundError: 模板或背景路径不存在时抛出
+    """
+    # 参数在调用时检查，而不是推迟到第一次迭代
+    if mode not in MODES:
+        raise ValueError(f"不支持的匹配模式: {mode}，可选: {', '.join(MODES)}")
+    if mode == 'template' and backend is not None:
+        raise ValueError("'template' 模式不使用特征后端，不能指定 backend")
+    templates = list_images(templates) if isinstance(templates, str) else list(templates)
+    backgrounds = list_images(backgrounds) if isinstance(backgrounds, str) else list(backgrounds)
+    return _batch_match(templates, backgrounds, mode, workers, backend, chunksize, quiet)
+
+
+def _batch_match(templates: List[str], backgrounds: List[str], mode: str, workers: Optional[int], backend,
+                 chunksize: int, quiet: bool) -> Iterator[BatchResult]:
+    """batch_match 的实现，参数已经过检查"""
+    tasks = _order(templates, backgrounds, mode)
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 1
+    logger.debug(f"批量匹配: 模板 {len(templates)} 个, 背景 {len(backgrounds)} 个, 进程数 {workers}")
+
+    if workers <= 1:
+        global _backend
+        previous, _backend = _backend, backend
+        try:
+            yield from map(_run_task, tasks)
+        finally:
+            _backend = previous
+            _frames.clear()
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(backend, quiet)) as pool:
+        yield from pool.imap_unordered(_run_task, tasks, chunksize)
+
+
+def _to_json(item: BatchResult) -> str:
+    result = item.result
+    if result is not None and hasattr(result, 'tolist'):
+        result = result.tolist()
+    return json.dumps({'template': item.template, 'background': item.background, 'result': result,
+                       'elapsed_ms': round(item.elapsed * 1000, 2), 'error': item.error}, ensure_ascii=False)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="多进程批量图像匹配")
+    parser.add_argument('--templates', required=True, help="模板文件或目录")
+    parser.add_argument('--backgrounds', required=True, help="背景文件或目录")
+    parser.add_argument('--mode', default='center', choices=list(MODES))
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument('--backend', default=None, help="特征后端: sift/orb/akaze/brisk/auto")
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--output', default=None, help="结果文件(JSON Lines)，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    count = failed = errors = 0
+    try:
+        # 单进程执行时 ImageProcessor 的 print 输出转到标准错误，标准输出只保留结果
+        with redirect_stdout(sys.stderr):
+            for item in batch_match(args.templates, args.backgrounds, args.mode, args.workers,
+                                    args.backend, args.chunksize):
+                count += 1
+                failed += item.result is None
+                errors += item.error is not None
+                output.write(_to_json(item) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"完成 {count} 个匹配, 未找到 {failed} 个(其中出错 {errors} 个), 耗时 {elapsed:.2f}s", file=sys.stderr)
+    # 有未找到或出错的组合时返回非零，便于脚本判断
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
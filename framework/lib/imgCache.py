@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+
+def keypoints_to_array(keypoints) -> np.ndarray:
+    """将 cv2.KeyPoint 序列转换为紧凑的 float32 数组
+
+    Args:
+        keypoints: cv2.KeyPoint 序列
+
+    Returns:
+        形状为 (N, 6) 的数组，列依次为 x, y, size, angle, response, octave
+    """
+    if not keypoints:
+        return np.empty((0, 6), dtype=np.float32)
+    return np.array([(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave)
+                     for kp in keypoints], dtype=np.float32)
+
+
+def template_key(gray: np.ndarray) -> str:
+    """按灰度像素内容(含形状)计算的模板标识，内存中的模板和模板包中的模板共用"""
+    digest = hashlib.blake2b(np.ascontiguousarray(gray).data, digest_size=16).hexdigest()
+    return f"{gray.shape}:{digest}"
+
+
+def array_to_keypoints(array: np.ndarray) -> List[cv2.KeyPoint]:
+    """将 keypoints_to_array 生成的数组还原为 cv2.KeyPoint 列表"""
+    return [cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave))
+            for x, y, size, angle, response, octave in array]
+
+
+class TemplateFeatures(NamedTuple):
+    """模板图像的特征数据，所有数组均为只读"""
+    gray: np.ndarray
+    keypoints: np.ndarray
+    descriptors: Optional[np.ndarray]
+
+    @property
+    def points(self) -> np.ndarray:
+        """关键点坐标 (N, 2)"""
+        return self.keypoints[:, :2]
+
+    @property
+    def nbytes(self) -> int:
+        descriptors = 0 if self.descriptors is None else self.descriptors.nbytes
+        return self.gray.nbytes + self.keypoints.nbytes + descriptors
+
+
+class TemplateFeatureCache:
+    """模板特征缓存
+
+    以 (文件绝对路径, 特征算法) 为键缓存模板的灰度图、关键点和描述符，
+    文件的 mtime/size 变化后自动失效。按 LRU 顺序淘汰，总占用不超过 max_bytes。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_bytes: 缓存内存预算(字节)
+            max_entries: 最大缓存条目数，None 表示不限制
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], TemplateFeatures]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path: str,
+            extractor: Callable[[np.ndarray], Tuple[list, Optional[np.ndarray]]],
+            name: str = 'sift') -> TemplateFeatures:
+        """获取模板特征，未命中时读取图像并调用 extractor 计算
+
+        Args:
+            path: 模板图像路径
+            extractor: 接收灰度图，返回 (keypoints, descriptors) 的函数
+            name: 特征算法名称，用于区分不同算法的缓存
+
+        Returns:
+            模板特征
+
+        Raises:
+            FileNotFoundError: 当模板文件不存在时抛出
+            ValueError: 当模板无法读取时抛出
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"目标图像文件不存在: {path}")
+
+        key = (os.path.abspath(path), name)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"无法读取图像: {path}")
+        keypoints, descriptors = extractor(gray)
+        features = self._freeze(TemplateFeatures(gray, keypoints_to_array(keypoints), descriptors))
+        logger.debug(f"计算模板特征: {path}, 算法={name}, 特征点={len(features.keypoints)}")
+
+        self.put(key, signature, features)
+        return features
+
+    def put(self, key: Tuple[str, str], signature: Tuple[int, int], features: TemplateFeatures) -> None:
+        """写入缓存条目，并按 LRU 顺序淘汰超出预算的条目"""
+        size = features.nbytes
+        if size > self.max_bytes:
+            logger.debug(f"模板特征超出缓存预算，不缓存: {key[0]}")
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1].nbytes
+            self._entries[key] = (signature, features)
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or
+                                     (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                evicted_key, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                logger.debug(f"淘汰模板特征缓存: {evicted_key[0]}")
+
+    @staticmethod
+    def _freeze(features: TemplateFeatures) -> TemplateFeatures:
+        for array in features:
+            if array is not None:
+                array.flags.writeable = False
+        return features
+
+    def clear(self) -> None:
+        """清空缓存并重置命中统计"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        """当前缓存占用字节数"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,171 @@
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgFrame import Frame, ImageInput, Rect, RoiSpec, normalize_roi
+
+
+class FrameChange(NamedTuple):
+    """当前帧与上一次报告变化的帧之间的差异"""
+    frame: Frame
+    # 发生变化的缩略图像素比例，0 表示与参考帧相同
+    ratio: float
+    # 变化区域 (x, y, w, h)，原图坐标，可直接作为 ImageProcessor 各方法的 roi 参数
+    rects: List[Rect]
+    # 是否为检测器收到的第一帧(或 reset 之后的第一帧)，此时 rects 为整幅图像
+    first: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return self.first or bool(self.rects)
+
+    def intersects(self, roi: RoiSpec) -> bool:
+        """变化区域是否与 roi 相交，roi 为 None 时表示整幅图像"""
+        if self.first:
+            return True
+        if not self.rects:
+            return False
+        for x, y, w, h in normalize_roi(roi, self.frame.size):
+            for rx, ry, rw, rh in self.rects:
+                if rx < x + w and x < rx + rw and ry < y + h and y < ry + rh:
+                    return True
+        return False
+
+
+class ChangeDetector:
+    """截图变化检测
+
+    轮询时大多数截图与上一张完全相同或只有局部变化。每张截图先缩小为 cell x cell 像素一格的灰度缩略图，
+    与参考缩略图逐格比较，平均灰度差超过 threshold 的格子视为变化，相邻的变化格子合并为矩形。
+    参考帧只在报告变化时更新，进度条、渐变文字等每帧都低于阈值的缓慢变化会逐帧累积，最终被检测到。
+    调用方据此跳过没有变化的帧，或只在变化区域内做模板匹配和 OCR；ratio 可作为"画面是否有变化"的廉价判断。
+
+    用法:
+        detector = ChangeDetector()
+        change = detector.capture(operator.screenshot)
+        if change.changed:
+            ImageProcessor.find_template(template, change.frame, roi=change.rects)
+    """
+
+    def __init__(self, cell: int = 8, threshold: int = 8, min_ratio: float = 0.0,
+                 padding: int = 1, max_rects: int = 16):
+        """
+        Args:
+            cell: 缩略图一格对应的原图边长(像素)
+            threshold: 判定格子变化的平均灰度差
+            min_ratio: 变化格子比例不超过该值时视为无变化，用于忽略光标闪烁等细小变化
+            padding: 变化区域向外扩展的格数，使跨越格子边界的目标完整落在区域内
+            max_rects: 变化区域超过该数量时合并为一个外接矩形
+        """
+        self.cell = cell
+        self.threshold = threshold
+        self.min_ratio = min_ratio
+        self.padding = padding
+        self.max_rects = max_rects
+        self._prev: Optional[np.ndarray] = None
+        self._results: Dict[Hashable, Tuple[RoiSpec, Any]] = {}
+        # 统计: 有变化、无变化的帧数
+        self.changed = 0
+        self.unchanged = 0
+
+    def _thumbnail(self, frame: Frame) -> np.ndarray:
+        """每 cell x cell 像素取平均得到的灰度缩略图，缓存在 Frame 中"""
+        def compute():
+            gray = frame.gray
+            size = (max(1, gray.shape[1] // self.cell), max(1, gray.shape[0] // self.cell))
+            return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return frame.cached(('change_thumbnail', self.cell), compute)
+
+    def reset(self) -> None:
+        """丢弃上一帧和已缓存的结果，下一帧视为第一帧"""
+        self._prev = None
+        self._results.clear()
+
+    def update(self, image: ImageInput) -> FrameChange:
+        """与参考帧(上一次报告变化的帧)比较
+
+        Args:
+            image: 当前截图，路径、ndarray、图像字节、PIL图像或 Frame
+
+        Returns:
+            FrameChange
+        """
+        frame = Frame.of(image)
+        thumb = self._thumbnail(frame)
+        prev = self._prev
+        if prev is None or prev.shape != thumb.shape:
+            self._prev = thumb
+            self.changed += 1
+            self._results.clear()
+            width, height = frame.size
+            return FrameChange(frame, 1.0, [(0, 0, width, height)], first=True)
+
+        mask = cv2.threshold(cv2.absdiff(thumb, prev), self.threshold, 255, cv2.THRESH_BINARY)[1]
+        ratio = cv2.countNonZero(mask) / mask.size
+        if ratio <= self.min_ratio:
+            # 不更新参考帧，低于阈值的差异累积到之后的帧
+            self.unchanged += 1
+            return FrameChange(frame, ratio, [])
+
+        self._prev = thumb
+        self.changed += 1
+        change = FrameChange(frame, ratio, self._rects(mask, frame.size))
+        # 依赖变化区域的缓存结果失效，即使调用方跳过了这一帧
+        for key in [key for key, (roi, _) in self._results.items() if change.intersects(roi)]:
+            del self._results[key]
+        logger.debug(f"画面变化: 比例={ratio:.4f}, 区域数={len(change.rects)}")
+        return change
+
+    def _rects(self, mask: np.ndarray, size: Tuple[int, int]) -> List[Rect]:
+        """变化格子合并为原图坐标的矩形"""
+        if self.padding > 0:
+            kernel = np.ones((2 * self.padding + 1, 2 * self.padding + 1), np.uint8)
+            mask = cv2.dilate(mask, kernel)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        boxes = stats[1:, :4]
+        if len(boxes) > self.max_rects:
+            x0, y0 = boxes[:, :2].min(axis=0)
+            x1, y1 = (boxes[:, :2] + boxes[:, 2:]).max(axis=0)
+            boxes = np.array([[x0, y0, x1 - x0, y1 - y0]])
+
+        width, height = size
+        rects = []
+        for x, y, w, h in boxes * self.cell:
+            # 最后一行/列格子之外的余数像素归入边缘的矩形
+            x1 = width if x + w >= (width // self.cell) * self.cell else x + w
+            y1 = height if y + h >= (height // self.cell) * self.cell else y + h
+            rects.append((int(x), int(y), int(x1 - x), int(y1 - y)))
+        return rects
+
+    def capture(self, screenshot: Callable[[], ImageInput]) -> Optional[FrameChange]:
+        """调用截图函数(如 PlatformOperator.screenshot)并与上一帧比较，截图失败时返回 None"""
+        image = screenshot()
+        if image is None:
+            logger.debug("截图失败")
+            return None
+        return self.update(image)
+
+    def reuse(self, key: Hashable, change: FrameChange, compute: Callable[[], Any], roi: RoiSpec = None) -> Any:
+        """自上次计算以来 roi 内没有变化时返回上一次的结果，否则调用 compute 重新计算
+
+        Args:
+            key: 结果标识，如模板路径或 OCR 区域名称
+            change: 当前帧的 update 结果
+            compute: 计算结果的函数，如 lambda: ImageProcessor.find_template(t, change.frame)
+            roi: 结果依赖的区域，None 表示整幅图像
+        """
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == roi and not change.first:
+            return cached[1]
+        result = compute()
+        self._results[key] = (roi, result)
+        return result
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'changed': self.changed, 'unchanged': self.unchanged}
+
+    def __repr__(self) -> str:
+        return f"ChangeDetector(cell={self.cell}, changed={self.changed}, unchanged={self.unchanged})"
@@ -0,0 +1,257 @@
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgFrame import Frame, ImageInput, Rect
+
+# HSV颜色范围: [[H_min, S_min, V_min], [H_max, S_max, V_max]]，与 cv2.inRange 的上下界相同
+ColorRange = Sequence[Sequence[int]]
+
+# 每张标签图最多容纳的颜色范围数(uint8 的位数)
+_BITS = 8
+
+
+class ColorStats(NamedTuple):
+    """单个颜色范围的统计结果"""
+    ratio: float
+    pixels: int
+    blob_area: float
+
+
+class ColorAnalyzer:
+    """一次遍历同时统计多个HSV颜色范围
+
+    颜色范围是 H、S、V 三个通道上的区间之积，因此像素是否落入第 i 个范围等于
+    lut_h[h] & lut_s[s] & lut_v[v] 的第 i 位。对三个通道各做一次 cv2.LUT 再按位与，
+    就得到每个像素命中了哪些范围的位掩码(标签图)，各范围的像素数只需在标签图上按位计数，
+    代替每个范围各做一次 cv2.inRange。超过 8 个范围时按每 8 个一组生成多张标签图。
+
+    默认与 cv2.inRange 一致，H_min 大于 H_max 的范围不匹配任何像素；wrap_hue 为 True 时
+    视为跨越 0 度的色相区间(如红色 [170, 10])。
+    """
+
+    def __init__(self, ranges: Union[Dict[str, ColorRange], Sequence[ColorRange]], wrap_hue: bool = False):
+        """
+        Args:
+            ranges: {名称: 颜色范围} 或颜色范围列表，列表时以下标作为名称
+            wrap_hue: H_min 大于 H_max 时是否按跨越 0 度的色相区间处理
+        """
+        items = ranges.items() if isinstance(ranges, dict) else enumerate(ranges)
+        self.names: List = []
+        bounds = []
+        for name, color_range in items:
+            lower, upper = (tuple(int(v) for v in bound) for bound in color_range)
+            if len(lower) != 3 or len(upper) != 3:
+                raise ValueError(f"颜色范围格式错误: {color_range}")
+            self.names.append(name)
+            bounds.append((lower, upper))
+        if not bounds:
+            raise ValueError("至少需要一个颜色范围")
+        self.bounds: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...] = tuple(bounds)
+        self.wrap_hue = wrap_hue
+        self._luts = [self._build_lut(bounds[i:i + _BITS], wrap_hue) for i in range(0, len(bounds), _BITS)]
+
+    @staticmethod
+    def _build_lut(bounds, wrap_hue: bool = False) -> np.ndarray:
+        """构建 (3, 256) 的查找表，每个通道值映射为其所在范围的位掩码"""
+        values = np.arange(256)
+        lut = np.zeros((3, 256), dtype=np.uint8)
+        for bit, (lower, upper) in enumerate(bounds):
+            for channel in range(3):
+                low, high = lower[channel], upper[channel]
+                if wrap_hue and channel == 0 and low > high:
+                    hit = (values >= low) | (values <= high)
+                else:
+                    hit = (values >= low) & (values <= high)
+                lut[channel, hit] |= np.uint8(1 << bit)
+        return lut
+
+    @staticmethod
+    def sample(image: ImageInput, step: int = 1) -> np.ndarray:
+        """获取用于统计的HSV图，step > 1 时每隔 step 个像素取一个
+
+        按步长抽样而不是插值缩放，以免相邻像素的色相被混合成不存在的颜色。
+        占比的误差来自抽样，颜色块边长远大于 step 时可以忽略。
+        """
+        frame = Frame.of(image)
+        if step <= 1:
+            return frame.hsv
+        return frame.cached(('hsv', step), lambda: cv2.cvtColor(
+            np.ascontiguousarray(frame.bgr[::step, ::step]), cv2.COLOR_BGR2HSV))
+
+    def labels(self, image: ImageInput, step: int = 1) -> List[np.ndarray]:
+        """计算标签图，第 g 张图的第 i 位表示像素落入第 g * 8 + i 个颜色范围
+
+        Frame 输入时标签图缓存在 Frame 上，同一帧的重复查询不再计算。
+        """
+        frame = Frame.of(image)
+
+        def compute():
+            channels = cv2.split(self.sample(frame, step))
+            result = []
+            for lut in self._luts:
+                h, s, v = (cv2.LUT(channel, table) for channel, table in zip(channels, lut))
+                result.append(cv2.bitwise_and(cv2.bitwise_and(h, s), v))
+            return result
+        return frame.cached(('color_labels', self.bounds, self.wrap_hue, step), compute)
+
+    def masks(self, image: ImageInput, step: int = 1) -> Dict[object, np.ndarray]:
+        """各颜色范围的二值掩码(0/255)，wrap_hue 为 False 时与 cv2.inRange 的结果一致"""
+        labels = self.labels(image, step)
+        result = {}
+        for index, name in enumerate(self.names):
+            group, bit = divmod(index, _BITS)
+            result[name] = cv2.compare(cv2.bitwise_and(labels[group], 1 << bit), 0, cv2.CMP_GT)
+        return result
+
+    def analyze(self, image: ImageInput, step: int = 1, blobs: bool = False) -> Dict[object, ColorStats]:
+        """统计所有颜色范围的像素占比，可选计算最大连通区域面积
+
+        Args:
+            image: 图像输入，传入 Frame 时复用其HSV图和标签图
+            step: 抽样步长，1 为逐像素统计
+            blobs: 是否计算每个范围经过去噪后的最大轮廓面积，面积按原图像素计
+
+        Returns:
+            {名称: ColorStats}
+        """
+        labels = self.labels(image, step)
+        total = labels[0].size
+        result = {}
+        for index, name in enumerate(self.names):
+            group, bit = divmod(index, _BITS)
+            count = cv2.countNonZero(cv2.bitwise_and(labels[group], 1 << bit))
+            result[name] = ColorStats(count / total, count * step * step, 0.0)
+        if blobs:
+            for name, mask in self.masks(image, step).items():
+                result[name] = result[name]._replace(blob_area=largest_blob_area(mask) * step * step)
+        logger.debug("颜色统计: " + ", ".join(f"{name}={stats.ratio:.4f}" for name, stats in result.items()))
+        return result
+
+    def integrals(self, image: ImageInput, step: int = 1) -> Dict[object, Tuple[np.ndarray, int]]:
+        """各颜色范围掩码的积分图，缓存在 Frame 上
+
+        Returns:
+            {名称: (积分图, 除数)}，积分图由标签图按位与后的值(0 或 2^bit)累加得到，
+            除以除数即为像素数，省去把掩码转换为 0/1 的一次遍历。累加值最大为 128 倍像素数，
+            使用 float64 积分图避免大图像上 int32 溢出
+        """
+        frame = Frame.of(image)
+
+        def compute():
+            labels = self.labels(frame, step)
+            result = {}
+            for index, name in enumerate(self.names):
+                group, bit = divmod(index, _BITS)
+                result[name] = (cv2.integral(cv2.bitwise_and(labels[group], 1 << bit), sdepth=cv2.CV_64F), 1 << bit)
+            return result
+        return frame.cached(('color_integrals', self.bounds, self.wrap_hue, step), compute)
+
+
+def _rect_sums(integral: np.ndarray, rects: np.ndarray) -> np.ndarray:
+    """用积分图计算一组矩形 (x0, y0, x1, y1) 内的像素和"""
+    x0, y0, x1, y1 = rects.T
+    return (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]).astype(np.float64)
+
+
+class RegionQuery:
+    """基于积分图的区域颜色占比和亮度查询
+
+    每帧只为各颜色范围的掩码和灰度图各计算一次积分图，之后任意矩形内的颜色占比或平均亮度
+    都是 4 次查表，成千上万个按钮、血条等区域的检查只相当于一次掩码计算。
+    积分图缓存在 Frame 上，对同一帧多次创建 RegionQuery 不会重复计算。
+    """
+
+    def __init__(self, image: ImageInput, color_ranges: Union[Dict[str, ColorRange], Sequence[ColorRange], None] = None,
+                 step: int = 1, wrap_hue: bool = False):
+        """
+        Args:
+            image: 图像输入
+            color_ranges: {名称: 颜色范围} 或颜色范围列表，None 时只支持亮度查询
+            step: 颜色掩码的抽样步长，大于 1 时在抽样后的图像上计算积分图
+            wrap_hue: H_min 大于 H_max 时是否按跨越 0 度的色相区间处理
+        """
+        self.frame = Frame.of(image)
+        self.analyzer = get_analyzer(color_ranges, wrap_hue) if color_ranges else None
+        self.step = max(1, int(step))
+
+    def _rects(self, rects, step: int, shape: Tuple[int, int]) -> np.ndarray:
+        """把 (x, y, w, h) 矩形转换为抽样图像上裁剪后的 (x0, y0, x1, y1)"""
+        rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        corners = np.empty_like(rects)
+        # 抽样图像的第 j 个像素对应原图第 j * step 个像素，向上取整得到矩形内的抽样点
+        corners[:, 0] = -(-rects[:, 0] // step)
+        corners[:, 1] = -(-rects[:, 1] // step)
+        corners[:, 2] = -(-(rects[:, 0] + rects[:, 2]) // step)
+        corners[:, 3] = -(-(rects[:, 1] + rects[:, 3]) // step)
+        np.clip(corners[:, 0::2], 0, shape[1], out=corners[:, 0::2])
+        np.clip(corners[:, 1::2], 0, shape[0], out=corners[:, 1::2])
+        return corners
+
+    @staticmethod
+    def _areas(corners: np.ndarray) -> np.ndarray:
+        return np.maximum(corners[:, 2] - corners[:, 0], 0) * np.maximum(corners[:, 3] - corners[:, 1], 0)
+
+    def color_ratios(self, name, rects) -> np.ndarray:
+        """一组矩形内某颜色范围的像素占比
+
+        Args:
+            name: 颜色范围名称(列表形式时为下标)
+            rects: (x, y, w, h) 矩形或矩形数组，坐标为原图像素
+
+        Returns:
+            每个矩形的占比，矩形完全在图像外时为 0
+        """
+        if self.analyzer is None:
+            raise ValueError("未指定颜色范围，无法查询颜色占比")
+        integral, divisor = self.analyzer.integrals(self.frame, self.step)[name]
+        corners = self._rects(rects, self.step, (integral.shape[0] - 1, integral.shape[1] - 1))
+        areas = self._areas(corners)
+        sums = _rect_sums(integral, corners) / divisor
+        return np.divide(sums, areas, out=np.zeros(len(corners)), where=areas > 0)
+
+    def color_ratio(self, name, rect: Rect) -> float:
+        """单个矩形内某颜色范围的像素占比"""
+        return float(self.color_ratios(name, rect)[0])
+
+    def ratios(self, rect: Rect) -> Dict[object, float]:
+        """单个矩形内所有颜色范围的像素占比"""
+        return {name: self.color_ratio(name, rect) for name in self.analyzer.names} if self.analyzer else {}
+
+    def brightness_many(self, rects) -> np.ndarray:
+        """一组矩形内灰度图的平均亮度(0~255)"""
+        integral = self.frame.cached('gray_integral', lambda: cv2.integral(self.frame.gray, sdepth=cv2.CV_64F))
+        corners = self._rects(rects, 1, self.frame.gray.shape[:2])
+        areas = self._areas(corners)
+        return np.divide(_rect_sums(integral, corners), areas, out=np.zeros(len(corners)), where=areas > 0)
+
+    def brightness(self, rect: Rect) -> float:
+        """单个矩形内灰度图的平均亮度(0~255)"""
+        return float(self.brightness_many(rect)[0])
+
+
+def largest_blob_area(mask: np.ndarray, kernel_size: int = 5) -> float:
+    """对掩码模糊、开运算、闭运算去噪后，返回最大外轮廓的面积"""
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    blurred = cv2.GaussianBlur(mask, (5, 5), 0)
+    cleaned = cv2.morphologyEx(cv2.morphologyEx(blurred, cv2.MORPH_OPEN, kernel), cv2.MORPH_CLOSE, kernel)
+    # 内轮廓(孔洞)的面积不会超过其外轮廓，只取外轮廓即可
+    contours, _ = cv2.findContours(cleaned, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return 0.0
+    return float(max(cv2.contourArea(contour) for contour in contours))
+
+
+@lru_cache(maxsize=128)
+def _analyzer(bounds: Tuple, wrap_hue: bool) -> ColorAnalyzer:
+    return ColorAnalyzer(list(bounds), wrap_hue)
+
+
+def get_analyzer(ranges: Union[Dict[str, ColorRange], Sequence[ColorRange]], wrap_hue: bool = False) -> ColorAnalyzer:
+    """获取颜色分析器，列表形式的范围按内容缓存，避免每次调用重建查找表"""
+    if isinstance(ranges, dict):
+        return ColorAnalyzer(ranges, wrap_hue)
+    return _analyzer(tuple((tuple(map(int, lower)), tuple(map(int, upper))) for lower, upper in ranges), wrap_hue)
@@ -0,0 +1,227 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# FLANN 索引算法编号
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_LSH = 6
+
+
+class FeatureBackend:
+    """特征匹配后端，封装特征检测器、描述符匹配器和匹配参数
+
+    - sift: SIFT + FLANN KD树，精度最高、速度最慢
+    - orb / akaze / brisk: 二进制描述符，使用 Hamming 距离的 BFMatcher 或 LSH-FLANN
+
+    指定 tiles 时，大图被切分为相互重叠的分块，在线程池中并行提取特征(OpenCV 计算期间释放 GIL)，
+    每个关键点只保留在其坐标所在分块的核心区域内，从而去除接缝处的重复点。
+    """
+
+    def __init__(self, name: str, matcher: Optional[str] = None, ratio: float = 0.7,
+                 ransac_thresh: float = 5.0, max_features: Optional[int] = None,
+                 tiles: Optional[Tuple[int, int]] = None, tile_overlap: int = 48, min_tile_size: int = 256):
+        """
+        Args:
+            name: 特征算法，'sift'、'orb'、'akaze' 或 'brisk'
+            matcher: 匹配器，'flann'(KD树)、'bf'(暴力匹配) 或 'lsh'(LSH-FLANN)；
+                     None 时 SIFT 使用 'flann'，二进制描述符使用 'bf'
+            ratio: Lowe 比率测试阈值
+            ransac_thresh: RANSAC 重投影误差阈值(像素)
+            max_features: 每张图像最多保留的特征点数，按响应值从高到低保留；None 表示不限制
+            tiles: 分块提取的列数和行数 (cols, rows)，None 表示不分块
+            tile_overlap: 分块之间的重叠宽度(像素)，应不小于描述符的支撑半径
+            min_tile_size: 分块核心区域的最小边长，图像过小时不分块(如模板)
+        """
+        name = name.lower()
+        if name not in _DETECTORS:
+            raise ValueError(f"不支持的特征算法: {name}，可选: {', '.join(_DETECTORS)}")
+        self.name = name
+        self.binary = name != 'sift'
+        self.matcher = matcher or ('bf' if self.binary else 'flann')
+        if self.matcher not in ('flann', 'bf', 'lsh'):
+            raise ValueError(f"不支持的匹配器: {self.matcher}")
+        if self.binary and self.matcher == 'flann':
+            raise ValueError("二进制描述符不能使用KD树，请选择 'bf' 或 'lsh'")
+        if not self.binary and self.matcher == 'lsh':
+            raise ValueError("SIFT描述符不能使用LSH，请选择 'flann' 或 'bf'")
+        self.ratio = ratio
+        self.ransac_thresh = ransac_thresh
+        self.max_features = max_features
+        self.tiles = tuple(tiles) if tiles else None
+        self.tile_overlap = tile_overlap
+        self.min_tile_size = min_tile_size
+
+    @property
+    def key(self) -> str:
+        """特征缓存键，只包含影响特征提取结果的参数"""
+        key = f"{self.name}:{self.max_features or 0}"
+        if self.tiles:
+            key += f":{self.tiles[0]}x{self.tiles[1]}+{self.tile_overlap}"
+        return key
+
+    def __repr__(self) -> str:
+        tiles = f", tiles={self.tiles}" if self.tiles else ""
+        return (f"FeatureBackend({self.name!r}, matcher={self.matcher!r}, ratio={self.ratio}, "
+                f"ransac_thresh={self.ransac_thresh}, max_features={self.max_features}{tiles})")
+
+    def extract(self, gray: np.ndarray) -> Tuple[list, Optional[np.ndarray]]:
+        """检测关键点并计算描述符
+
+        Args:
+            gray: 灰度图像
+
+        Returns:
+            (关键点列表, 描述符)
+        """
+        grid = self._grid(gray.shape[:2])
+        if grid is None:
+            detector = _DETECTORS[self.name](self.max_features)
+            keypoints, descriptors = detector.detectAndCompute(gray, None)
+        else:
+            keypoints, descriptors = self._extract_tiled(gray, grid)
+        if descriptors is not None and self.max_features and len(keypoints) > self.max_features:
+            responses = np.array([kp.response for kp in keypoints])
+            keep = np.sort(np.argsort(-responses, kind='stable')[:self.max_features])
+            keypoints = [keypoints[i] for i in keep]
+            descriptors = descriptors[keep]
+        return keypoints, descriptors
+
+    def _grid(self, shape: Tuple[int, int]) -> Optional[Tuple[list, list]]:
+        """计算分块的列、行边界，图像不足以分块时返回 None"""
+        if not self.tiles:
+            return None
+        height, width = shape
+        cols, rows = self.tiles
+        if (cols <= 1 and rows <= 1) or width // cols < self.min_tile_size or height // rows < self.min_tile_size:
+            return None
+        xs = [width * i // cols for i in range(cols + 1)]
+        ys = [height * i // rows for i in range(rows + 1)]
+        return xs, ys
+
+    def _extract_tiled(self, gray: np.ndarray, grid: Tuple[list, list]) -> Tuple[list, Optional[np.ndarray]]:
+        """分块并行提取特征并合并"""
+        xs, ys = grid
+        height, width = gray.shape[:2]
+        overlap = self.tile_overlap
+        # 有特征点数上限的检测器(如 ORB)把上限平均分给各分块，合并后再按响应值取全局前 N 个
+        limit = self.max_features or _DEFAULT_LIMITS.get(self.name)
+        count = (len(xs) - 1) * (len(ys) - 1)
+        tile_limit = -(-limit // count) if limit else None
+
+        def extract_tile(bounds):
+            x0, y0, x1, y1 = bounds
+            # 分块向四周扩展 overlap，保证核心区域边缘的关键点有完整的邻域
+            ox, oy = max(0, x0 - overlap), max(0, y0 - overlap)
+            tile = gray[oy:min(height, y1 + overlap), ox:min(width, x1 + overlap)]
+            detector = _DETECTORS[self.name](tile_limit)
+            keypoints, descriptors = detector.detectAndCompute(tile, None)
+            if descriptors is None:
+                return [], None
+            kept, rows = [], []
+            for i, kp in enumerate(keypoints):
+                x, y = kp.pt[0] + ox, kp.pt[1] + oy
+                # 只保留落在本分块核心区域内的关键点，接缝两侧的重复检测由此去除
+                if x0 <= x < x1 and y0 <= y < y1:
+                    kp.pt = (x, y)
+                    kept.append(kp)
+                    rows.append(i)
+            return kept, descriptors[rows]
+
+        tiles = [(xs[c], ys[r], xs[c + 1], ys[r + 1]) for r in range(len(ys) - 1) for c in range(len(xs) - 1)]
+        keypoints, descriptors = [], []
+        for tile_keypoints, tile_descriptors in _executor().map(extract_tile, tiles):
+            if tile_descriptors is not None and len(tile_keypoints):
+                keypoints.extend(tile_keypoints)
+                descriptors.append(tile_descriptors)
+        logger.debug(f"分块提取特征: 分块={len(tiles)}, 特征点={len(keypoints)}")
+        if not descriptors:
+            return [], None
+        descriptors = np.concatenate(descriptors)
+        if limit and len(keypoints) > limit:
+            responses = np.array([kp.response for kp in keypoints])
+            keep = np.sort(np.argsort(-responses, kind='stable')[:limit])
+            keypoints, descriptors = [keypoints[i] for i in keep], descriptors[keep]
+        return keypoints, descriptors
+
+    def build_matcher(self, train_des: np.ndarray) -> cv2.DescriptorMatcher:
+        """以背景描述符构建匹配器索引，多个模板匹配同一背景时可复用"""
+        if self.matcher == 'bf':
+            norm = cv2.NORM_HAMMING if self.binary else cv2.NORM_L2
+            matcher = cv2.BFMatcher(norm)
+        elif self.matcher == 'lsh':
+            index_params = dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+            matcher = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+        else:
+            index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+            matcher = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+        matcher.add([train_des])
+        matcher.train()
+        return matcher
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    """分块特征提取共用的线程池，首次使用时创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(thread_name_prefix='feature-tile')
+        return _pool
+
+
+def _factory(attr: str, limit_arg: Optional[str] = None, default_limit: int = 0):
+    """按名称获取 OpenCV 检测器构造函数，当前 OpenCV 版本不提供时给出明确错误"""
+    def create(max_features: Optional[int]):
+        constructor = getattr(cv2, attr, None)
+        if constructor is None:
+            raise ValueError(f"当前OpenCV版本({cv2.__version__})不支持 {attr}")
+        if limit_arg:
+            return constructor(**{limit_arg: max_features or default_limit})
+        return constructor()
+    return create
+
+
+# 各检测器默认的特征点数上限
+_DEFAULT_LIMITS = {'orb': 5000}
+
+_DETECTORS = {
+    'sift': _factory('SIFT_create', 'nfeatures'),
+    'orb': _factory('ORB_create', 'nfeatures', _DEFAULT_LIMITS['orb']),
+    'akaze': _factory('AKAZE_create'),
+    'brisk': _factory('BRISK_create'),
+}
+
+# 预置后端，使用各自默认的匹配器和参数
+BACKENDS: Dict[str, FeatureBackend] = {
+    'orb': FeatureBackend('orb'),
+    'brisk': FeatureBackend('brisk'),
+    'akaze': FeatureBackend('akaze'),
+    'sift': FeatureBackend('sift'),
+}
+
+
+def get_backend(backend: Union[str, FeatureBackend, None] = None) -> FeatureBackend:
+    """根据名称获取预置后端，传入 FeatureBackend 实例时原样返回
+
+    Args:
+        backend: 后端名称或实例，None 时返回 SIFT
+
+    Returns:
+        特征匹配后端
+    """
+    if backend is None:
+        return BACKENDS['sift']
+    if isinstance(backend, FeatureBackend):
+        return backend
+    try:
+        return BACKENDS[backend.lower()]
+    except KeyError:
+        logger.error(f"未知的特征后端: {backend}")
+        raise ValueError(f"未知的特征后端: {backend}，可选: {', '.join(BACKENDS)}, auto") from None
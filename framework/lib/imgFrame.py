@@ -0,0 +1,211 @@
+import os
+import threading
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 图像输入: 文件路径、OpenCV图像(BGR/灰度)、编码后的图像字节、PIL图像或 Frame
+ImageInput = Union[str, bytes, np.ndarray, Image.Image, 'Frame']
+# 矩形区域: (x, y, w, h)
+Rect = Tuple[int, int, int, int]
+# 搜索区域: (x, y, w, h) 矩形、[[x1, y1], ..., [x4, y4]] 四角坐标，或它们的列表
+RoiSpec = Union[Sequence[int], Sequence[Sequence[int]], Sequence[Sequence[Sequence[int]]], None]
+
+
+def describe_image(image_input) -> str:
+    """生成用于日志的图像输入描述，避免输出整段字节或数组"""
+    if isinstance(image_input, str):
+        return image_input
+    if isinstance(image_input, np.ndarray):
+        return f"ndarray{image_input.shape}"
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        return f"bytes[{len(image_input)}]"
+    if isinstance(image_input, Frame):
+        return f"Frame({describe_image(image_input.source)})"
+    return type(image_input).__name__
+
+
+def decode_image(image_input, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """将文件路径、字节、ndarray 或 PIL 图像解码为OpenCV图像
+
+    文件路径和字节数据只解码一次；ndarray 直接使用，仅在通道数不符时转换；
+    PIL 图像按 RGB 读取后转换为 BGR。
+
+    Args:
+        image_input: 文件路径、np.ndarray、编码后的图像字节或PIL图像
+        flags: cv2.IMREAD_COLOR 返回BGR图像，cv2.IMREAD_GRAYSCALE 返回灰度图
+
+    Returns:
+        解码后的图像
+
+    Raises:
+        FileNotFoundError: 当图像文件不存在时抛出
+        ValueError: 当图像无法解码时抛出
+        TypeError: 当输入类型不受支持时抛出
+    """
+    gray = flags == cv2.IMREAD_GRAYSCALE
+    if isinstance(image_input, str):
+        if not os.path.exists(image_input):
+            raise FileNotFoundError(f"图像文件不存在: {image_input}")
+        image = cv2.imread(image_input, flags)
+    elif isinstance(image_input, (bytes, bytearray, memoryview)):
+        image = cv2.imdecode(np.frombuffer(image_input, dtype=np.uint8), flags)
+    elif isinstance(image_input, np.ndarray):
+        image = image_input
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if gray else cv2.COLOR_BGRA2BGR)
+        elif image.ndim == 3 and gray:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        elif image.ndim == 2 and not gray:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif isinstance(image_input, Image.Image):
+        if gray:
+            image = np.asarray(image_input.convert('L'))
+        else:
+            image = cv2.cvtColor(np.asarray(image_input.convert('RGB')), cv2.COLOR_RGB2BGR)
+    else:
+        raise TypeError(f"不支持的图像输入类型: {type(image_input)}")
+
+    if image is None or image.size == 0:
+        raise ValueError(f"无法读取图像: {describe_image(image_input)}")
+    return image
+
+
+def normalize_roi(roi: RoiSpec, size: Tuple[int, int]) -> List[Rect]:
+    """将各种形式的搜索区域转换为裁剪到图像范围内的 (x, y, w, h) 列表
+
+    Args:
+        roi: (x, y, w, h) 矩形、四角坐标(与 OcrActions.region_of_interest 格式相同)或它们的列表
+        size: 图像尺寸 (width, height)
+
+    Returns:
+        与图像有交集的矩形列表，roi 为 None 时返回整幅图像
+    """
+    width, height = size
+    if roi is None:
+        return [(0, 0, width, height)]
+    roi = list(roi)
+    if len(roi) == 4 and all(np.isscalar(v) for v in roi):
+        rects = [tuple(int(v) for v in roi)]
+    elif roi and all(len(point) == 2 and all(np.isscalar(v) for v in point) for point in roi):
+        rects = [cv2.boundingRect(np.int32(roi))]
+    else:
+        rects = [rect for item in roi for rect in normalize_roi(item, size)]
+
+    result = []
+    for x, y, w, h in rects:
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(width, x + w), min(height, y + h)
+        if x1 > x0 and y1 > y0:
+            result.append((x0, y0, x1 - x0, y1 - y0))
+    return result
+
+
+class Frame:
+    """单帧图像及其派生视图的缓存
+
+    图像在首次使用时解码一次，灰度图、HSV、缩放副本、直方图、金字塔和特征等派生视图
+    按需计算并缓存。同一步骤内把 Frame 传给多个 ImageProcessor 方法，即可共享解码和转换结果。
+    返回的数组为缓存本身，调用方不应原地修改。
+    """
+
+    def __init__(self, image: ImageInput):
+        """
+        Args:
+            image: 文件路径、np.ndarray、编码后的图像字节或PIL图像
+        """
+        self.source = image.source if isinstance(image, Frame) else image
+        self._views = {}
+        self._lock = threading.RLock()
+        # 子帧左上角在原始帧中的坐标，见 crop
+        self.offset: Tuple[int, int] = image.offset if isinstance(image, Frame) else (0, 0)
+
+    @classmethod
+    def of(cls, image: ImageInput) -> 'Frame':
+        """已是 Frame 时原样返回，否则包装为新的 Frame"""
+        return image if isinstance(image, Frame) else cls(image)
+
+    def cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """获取派生视图，未缓存时调用 compute 计算并缓存"""
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = compute()
+            return self._views[key]
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """BGR 彩色图"""
+        return self.cached('bgr', lambda: decode_image(self.source, cv2.IMREAD_COLOR))
+
+    @property
+    def gray(self) -> np.ndarray:
+        """灰度图"""
+        def compute():
+            if isinstance(self.source, np.ndarray) and self.source.ndim == 2:
+                return self.source
+            return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self.cached('gray', compute)
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV 图"""
+        return self.cached('hsv', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.bgr.shape
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """图像尺寸 (width, height)"""
+        height, width = self.bgr.shape[:2]
+        return width, height
+
+    def resized(self, size: Tuple[int, int], interpolation: int = cv2.INTER_LINEAR,
+                gray: bool = False) -> np.ndarray:
+        """缩放到指定尺寸 (width, height) 的副本"""
+        source = self.gray if gray else self.bgr
+        return self.cached(('resized', tuple(size), interpolation, gray),
+                           lambda: cv2.resize(source, tuple(size), interpolation=interpolation))
+
+    def hist(self, channel: int = 0, bins: int = 256,
+             size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """BGR 单通道直方图，size 不为空时基于缩放后的图像计算"""
+        image = self.bgr if size is None else self.resized(size)
+        return self.cached(('hist', channel, bins, size and tuple(size)),
+                           lambda: cv2.calcHist([image], [channel], None, [bins], [0, 256]))
+
+    def pyramid(self, levels: int) -> List[np.ndarray]:
+        """灰度图金字塔，第 0 层为原图，每层尺寸减半"""
+        with self._lock:
+            pyramid = self.cached('pyramid', lambda: [self.gray])
+            while len(pyramid) <= levels:
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            return pyramid[:levels + 1]
+
+    def crop(self, rect: Rect) -> 'Frame':
+        """(x, y, w, h) 区域的子帧
+
+        子帧的像素是本帧图像的 NumPy 视图，不复制数据；本帧已缓存灰度图时子帧直接使用其视图。
+        子帧缓存在本帧中，同一区域的重复搜索可复用子帧的特征和金字塔。
+        子帧中的坐标加上 offset 即为原始帧中的坐标。
+        """
+        width, height = self.size
+        x, y, w, h = rect
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"裁剪区域 {rect} 与图像 {width}x{height} 没有交集")
+
+        def compute():
+            child = Frame(self.bgr[y0:y1, x0:x1])
+            if 'gray' in self._views:
+                child._views['gray'] = self._views['gray'][y0:y1, x0:x1]
+            child.offset = (self.offset[0] + x0, self.offset[1] + y0)
+            return child
+        return self.cached(('crop', x0, y0, x1, y1), compute)
+
+    def __repr__(self) -> str:
+        return f"Frame({describe_image(self.source)}, views={list(self._views)})"
@@ -0,0 +1,252 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgFrame import Frame, ImageInput, describe_image
+
+
+def dhash(image: ImageInput, hash_size: int = 8) -> int:
+    """差值哈希: 缩放到 (hash_size+1) x hash_size 后比较相邻像素的亮度
+
+    Args:
+        image: 图像输入，Frame 时复用其缓存的缩放灰度图
+        hash_size: 哈希边长，结果为 hash_size * hash_size 位整数
+
+    Returns:
+        哈希值
+    """
+    small = _thumbnail(Frame.of(image), (hash_size + 1, hash_size))
+    return _pack_bits(small[:, 1:] > small[:, :-1])
+
+
+def ahash(image: ImageInput, hash_size: int = 8) -> int:
+    """均值哈希: 缩放到 hash_size x hash_size 后与平均亮度比较
+
+    大面积纯色背景上的像素与均值相差很远，压缩噪声几乎不改变哈希，适合文字截图等背景平坦的图像。
+
+    Args:
+        image: 图像输入，Frame 时复用其缓存的缩放灰度图
+        hash_size: 哈希边长，结果为 hash_size * hash_size 位整数
+
+    Returns:
+        哈希值
+    """
+    small = _thumbnail(Frame.of(image), (hash_size, hash_size))
+    return _pack_bits(small > small.mean())
+
+
+def phash(image: ImageInput, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """感知哈希: 对缩放后的灰度图做 DCT，取低频系数与中位数比较
+
+    Args:
+        image: 图像输入，Frame 时复用其缓存的缩放灰度图
+        hash_size: 哈希边长，结果为 hash_size * hash_size 位整数
+        highfreq_factor: DCT 输入尺寸相对 hash_size 的倍数
+
+    Returns:
+        哈希值
+    """
+    size = hash_size * highfreq_factor
+    small = _thumbnail(Frame.of(image), (size, size))
+    low = cv2.dct(np.float32(small))[:hash_size, :hash_size]
+    return _pack_bits(low > np.median(low))
+
+
+def _thumbnail(frame: Frame, size: Tuple[int, int]) -> np.ndarray:
+    """生成哈希用的灰度缩略图
+
+    大图直接用 INTER_AREA 缩到几十像素很慢，先按步长抽取一个约为目标 4 倍大小的视图(不复制)，
+    再做区域平均。
+    """
+    def compute():
+        gray = frame.gray
+        step = max(1, min(gray.shape[0] // (size[1] * 4), gray.shape[1] // (size[0] * 4)))
+        return cv2.resize(gray[::step, ::step], size, interpolation=cv2.INTER_AREA)
+    return frame.cached(('thumbnail', size), compute)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    """将布尔矩阵按行优先打包为整数"""
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), 'big')
+
+
+# Python 3.10+ 提供 int.bit_count
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def hamming(a: int, b: int) -> int:
+    """两个哈希值的汉明距离"""
+    return _popcount(a ^ b)
+
+
+HASH_FUNCTIONS = {'ahash': ahash, 'dhash': dhash, 'phash': phash}
+
+
+class BKTree:
+    """按汉明距离组织的 BK 树，用于在大量哈希中查找距离不超过阈值的项"""
+
+    def __init__(self):
+        # 节点: [哈希, 标签列表, {距离: 子节点}]
+        self._root = None
+        self._size = 0
+
+    def add(self, value: int, label) -> None:
+        """插入哈希及其标签，哈希相同时追加标签"""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [label], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(label)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [label], {}]
+                return
+            node = child
+
+    def query(self, value: int, max_distance: int) -> List[Tuple[int, object]]:
+        """查找距离不超过 max_distance 的所有项
+
+        Returns:
+            按距离升序排列的 [(距离, 标签), ...]
+        """
+        results = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, label) for label in node[1])
+            # 三角不等式: 只有边距离在 [d - r, d + r] 内的子树可能包含结果
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class ScreenRegistry:
+    """基于感知哈希的界面识别
+
+    为每个参考截图计算指纹并存入 BK 树，识别时只需计算一次实时截图的哈希并在树中查找，
+    不需要模板匹配或OCR。注册表可保存为 .npz 文件，启动时直接加载。
+    """
+
+    def __init__(self, method: str = 'phash', hash_size: int = 8, max_distance: int = 10):
+        """
+        Args:
+            method: 哈希算法，'phash'、'dhash' 或 'ahash'
+            hash_size: 哈希边长
+            max_distance: 默认的最大汉明距离
+        """
+        if method not in HASH_FUNCTIONS:
+            raise ValueError(f"不支持的哈希算法: {method}，可选: {', '.join(HASH_FUNCTIONS)}")
+        self.method = method
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self._tree = BKTree()
+        self._hashes: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, image: ImageInput) -> int:
+        """计算图像指纹"""
+        return HASH_FUNCTIONS[self.method](image, self.hash_size)
+
+    def register(self, name: str, image: ImageInput) -> int:
+        """登记参考截图，同一名称可登记多张截图
+
+        Args:
+            name: 界面名称
+            image: 参考截图
+
+        Returns:
+            参考截图的指纹
+        """
+        value = self.fingerprint(image)
+        self._add(name, value)
+        logger.debug(f"登记界面: {name}, 图像={describe_image(image)}, 指纹={value:0{self.hash_size ** 2 // 4}x}")
+        return value
+
+    def _add(self, name: str, value: int) -> None:
+        with self._lock:
+            self._tree.add(value, name)
+            self._hashes.setdefault(name, []).append(value)
+
+    def match(self, image: ImageInput, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """查找与截图指纹距离不超过阈值的所有界面
+
+        Returns:
+            按距离升序排列的 [(界面名称, 距离), ...]，同一界面只保留最近的一项
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        value = self.fingerprint(image)
+        # 与 register 互斥，避免遍历子节点字典时被其他线程修改
+        with self._lock:
+            found = self._tree.query(value, max_distance)
+        seen = {}
+        for distance, name in found:
+            seen.setdefault(name, distance)
+        return list(seen.items())
+
+    def classify(self, image: ImageInput, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """识别当前截图属于哪个界面
+
+        Args:
+            image: 实时截图
+            max_distance: 最大汉明距离，None 时使用注册表默认值
+
+        Returns:
+            (界面名称, 距离)，没有足够相近的界面时返回 None
+        """
+        matches = self.match(image, max_distance)
+        if not matches:
+            logger.debug("未识别出界面")
+            return None
+        logger.debug(f"识别界面: {matches[0][0]}, 距离={matches[0][1]}")
+        return matches[0]
+
+    def save(self, path: str) -> None:
+        """将注册表保存为 .npz 文件"""
+        with self._lock:
+            names = [name for name, values in self._hashes.items() for _ in values]
+            values = [value for values in self._hashes.values() for value in values]
+        # 哈希可能超过 64 位，按字节存储
+        width = (self.hash_size ** 2 + 7) // 8
+        packed = np.array([list(value.to_bytes(width, 'big')) for value in values],
+                          dtype=np.uint8).reshape(-1, width)
+        # 通过文件对象写入，np.savez 不会给没有 .npz 后缀的路径追加后缀
+        with open(path, 'wb') as f:
+            np.savez(f, names=np.array(names, dtype=str), hashes=packed,
+                     method=self.method, hash_size=self.hash_size, max_distance=self.max_distance)
+        logger.debug(f"界面注册表已保存: {path}, 条目数={len(values)}")
+
+    @classmethod
+    def load(cls, path: str) -> 'ScreenRegistry':
+        """从 .npz 文件加载注册表"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"界面注册表文件不存在: {path}")
+        with np.load(path, allow_pickle=False) as data:
+            registry = cls(str(data['method']), int(data['hash_size']), int(data['max_distance']))
+            for name, packed in zip(data['names'].tolist(), data['hashes']):
+                registry._add(name, int.from_bytes(packed.tobytes(), 'big'))
+        logger.debug(f"界面注册表已加载: {path}, 条目数={len(registry)}")
+        return registry
+
+    @property
+    def names(self) -> List[str]:
+        """已登记的界面名称"""
+        with self._lock:
+            return list(self._hashes)
+
+    def __len__(self) -> int:
+        return len(self._tree)
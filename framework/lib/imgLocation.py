@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgTemplate import Match, match_template
+
+# 目标框: (x, y, w, h)
+Box = Tuple[int, int, int, int]
+
+
+class LocationStore:
+    """记录每个模板在每种屏幕分辨率下最近一次出现的位置
+
+    大多数界面元素每次运行都出现在相同坐标，查找时先只在记录的位置做一次模板大小的 NCC 校验，
+    未命中再在记录位置附近的区域内搜索，最后才全图搜索。记录可保存为 JSON 文件，下次运行时加载。
+    """
+
+    def __init__(self, path: Optional[str] = None, pad: int = 2, margin: float = 1.0):
+        """
+        Args:
+            path: 保存位置记录的 JSON 文件路径，None 时只保存在内存中
+            pad: 记录位置校验时允许的偏移(像素)
+            margin: 区域搜索时在记录框四周扩展的距离，相对于框的长边
+        """
+        self.path = path
+        self.pad = pad
+        self.margin = margin
+        self._boxes: Dict[str, Box] = {}
+        self._lock = threading.Lock()
+        # 统计: 记录位置命中、附近区域命中、全图搜索的次数
+        self.hits = 0
+        self.roi_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(template_key: str, resolution: Tuple[int, int]) -> str:
+        return f"{template_key}@{resolution[0]}x{resolution[1]}"
+
+    def get(self, key: str) -> Optional[Box]:
+        return self._boxes.get(key)
+
+    def put(self, key: str, box: Box) -> None:
+        with self._lock:
+            self._boxes[key] = tuple(int(v) for v in box)
+
+    def record(self, key: str, box: Box, kind: str) -> None:
+        """记录查找结果并累加对应的统计: 'hits'、'roi_hits' 或 'misses'"""
+        with self._lock:
+            if box is not None:
+                self._boxes[key] = tuple(int(v) for v in box)
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._boxes.pop(key, None)
+
+    def clear(self) -> None:
+        """清空记录和统计"""
+        with self._lock:
+            self._boxes.clear()
+            self.hits = self.roi_hits = self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'roi_hits': self.roi_hits, 'misses': self.misses}
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    @staticmethod
+    def _window(scene_gray: np.ndarray, box: Box, extend: int, bounds: Optional[Box]) -> Box:
+        """记录框向四周扩展 extend 像素后的区域 (x0, y0, x1, y1)，裁剪到背景和 bounds 范围内"""
+        x, y, w, h = box
+        bx, by, bw, bh = bounds if bounds is not None else (0, 0, scene_gray.shape[1], scene_gray.shape[0])
+        bx1, by1 = min(scene_gray.shape[1], bx + bw), min(scene_gray.shape[0], by + bh)
+        return max(bx, x - extend), max(by, y - extend), min(bx1, x + w + extend), min(by1, y + h + extend)
+
+    def verify(self, scene_gray: np.ndarray, template_gray: np.ndarray, box: Box,
+               bounds: Optional[Box] = None) -> Tuple[int, int, float]:
+        """在记录的位置附近 pad 像素范围内计算模板的匹配得分
+
+        Args:
+            bounds: 限定的搜索区域 (x, y, w, h)，匹配位置不会超出该区域
+
+        Returns:
+            (x, y, score)，区域超出背景时得分为 -1
+        """
+        x, y, w, h = box
+        if template_gray.shape[:2] != (h, w):
+            template_gray = cv2.resize(template_gray, (w, h), interpolation=cv2.INTER_AREA)
+        x0, y0, x1, y1 = self._window(scene_gray, box, self.pad, bounds)
+        if x1 - x0 < w or y1 - y0 < h or float(template_gray.std()) == 0.0:
+            return x, y, -1.0
+        result = cv2.matchTemplate(scene_gray[y0:y1, x0:x1], template_gray, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(result)
+        return x0 + loc[0], y0 + loc[1], float(score)
+
+    def search_near(self, scene_gray: np.ndarray, template_gray: np.ndarray, box: Box,
+                    threshold: float, scales, bounds: Optional[Box] = None) -> Optional[Match]:
+        """在记录框周围扩展后的区域内做模板匹配，bounds 不为 None 时扩展区域不超出 bounds"""
+        x, y, w, h = box
+        x0, y0, x1, y1 = self._window(scene_gray, box, int(max(w, h) * self.margin), bounds)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        matches = match_template(scene_gray[y0:y1, x0:x1], template_gray, threshold, scales, max_results=1)
+        if not len(matches):
+            return None
+        mx, my, mw, mh, score = matches[0].tolist()
+        return int(mx) + x0, int(my) + y0, int(mw), int(mh), score
+
+    def save(self, path: Optional[str] = None) -> None:
+        """将位置记录保存为 JSON 文件"""
+        path = path or self.path
+        if not path:
+            raise ValueError("未指定位置记录文件路径")
+        with self._lock:
+            data = {key: list(box) for key, box in self._boxes.items()}
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        logger.debug(f"位置记录已保存: {path}, 条目数={len(data)}")
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'LocationStore':
+        """从 JSON 文件加载位置记录，文件不存在时返回空记录"""
+        store = cls(path, **kwargs)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for key, box in json.load(f).items():
+                        store._boxes[key] = tuple(int(v) for v in box)
+            except (OSError, ValueError) as e:
+                logger.debug(f"位置记录读取失败: {e}")
+        logger.debug(f"位置记录已加载: {path}, 条目数={len(store)}")
+        return store
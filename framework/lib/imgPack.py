@@ -0,0 +1,198 @@
+"""预编译模板包
+
+把一组模板的灰度图、金字塔、各特征后端的关键点和描述符以及感知哈希预先计算好，
+写入单个二进制文件。运行时用 np.memmap 打开，所有数组都是文件映射上的只读视图，
+打开包的耗时与模板数量无关，多个进程打开同一个包时共享操作系统的页缓存。
+
+文件布局:
+    8 字节魔数 | 8 字节小端整数(头部长度) | UTF-8 JSON 头部 | 填充 | 数据区
+头部记录每个模板的各数组在数据区中的偏移、类型和形状，每个数组按 64 字节对齐。
+
+用法:
+    python -m framework.lib.imgPack <模板目录> <输出文件> [--backends sift,orb] [--levels 3]
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgCache import TemplateFeatures, keypoints_to_array, template_key
+from .imgFeature import FeatureBackend, get_backend
+from .imgFrame import Frame, ImageInput, decode_image
+from .imgHash import phash
+
+MAGIC = b'WTPACK01'
+_ALIGN = 64
+
+
+class PackedTemplate(Frame):
+    """模板包中的单个模板
+
+    是 Frame 的子类，灰度图、金字塔和预计算的特征直接作为派生视图放入缓存，
+    可以像路径或 ndarray 一样传给 ImageProcessor 的任意模板参数。
+    """
+
+    def __init__(self, name: str, arrays: Dict[str, np.ndarray], meta: dict):
+        gray = arrays['gray']
+        # 以映射的灰度图作为源图像，Frame(packed) 等重新包装后仍能解码
+        super().__init__(gray)
+        self.name = name
+        self.phash = int(meta['phash'], 16)
+        self._views['gray'] = gray
+        self._views['template_key'] = meta['key']
+        self._views['pyramid'] = [gray] + [arrays[f'level{i}'] for i in range(1, meta['levels'] + 1)]
+        for key in meta['backends']:
+            self._views[('template', key)] = TemplateFeatures(gray, arrays[f'{key}/keypoints'],
+                                                              arrays.get(f'{key}/descriptors'))
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """模板包只保存灰度图，彩色图由灰度图转换得到"""
+        return self.cached('bgr', lambda: cv2.cvtColor(self.gray, cv2.COLOR_GRAY2BGR))
+
+    def __repr__(self) -> str:
+        return f"PackedTemplate({self.name!r}, shape={self.gray.shape})"
+
+
+class TemplatePack:
+    """以内存映射方式打开的模板包"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 模板包文件路径
+
+        Raises:
+            FileNotFoundError: 当文件不存在时抛出
+            ValueError: 当文件格式不正确时抛出
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"模板包不存在: {path}")
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, length = f.read(8), struct.unpack('<Q', f.read(8))[0]
+            if magic != MAGIC:
+                raise ValueError(f"不是有效的模板包: {path}")
+            header = json.loads(f.read(length).decode('utf-8'))
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        self._base = _aligned(16 + length)
+        self._meta: Dict[str, dict] = header['templates']
+        self._templates: Dict[str, PackedTemplate] = {}
+        logger.debug(f"打开模板包: {path}, 模板数={len(self._meta)}")
+
+    def _array(self, entry) -> np.ndarray:
+        offset, dtype, shape = entry
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape)) * dtype.itemsize
+        start = self._base + offset
+        return self._data[start:start + count].view(dtype).reshape(shape)
+
+    def __getitem__(self, name: str) -> PackedTemplate:
+        template = self._templates.get(name)
+        if template is None:
+            meta = self._meta[name]
+            arrays = {key: self._array(entry) for key, entry in meta['arrays'].items()}
+            template = self._templates[name] = PackedTemplate(name, arrays, meta)
+        return template
+
+    def get(self, name: str, default=None) -> Optional[PackedTemplate]:
+        return self[name] if name in self._meta else default
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._meta)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._meta
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __iter__(self):
+        return iter(self._meta)
+
+    def __repr__(self) -> str:
+        return f"TemplatePack({self.path!r}, templates={len(self)})"
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def build_pack(templates: Union[str, Sequence[str], Dict[str, ImageInput]], path: str,
+               backends: Iterable[Union[str, FeatureBackend]] = ('sift',), levels: int = 3,
+               hash_size: int = 8) -> int:
+    """预计算模板数据并写入模板包
+
+    Args:
+        templates: 模板目录、路径列表或 {名称: 图像}；目录和路径以不含扩展名的文件名作为名称
+        path: 输出文件路径
+        backends: 需要预计算特征的后端
+        levels: 预计算的金字塔层数(不含原图)
+        hash_size: 感知哈希边长
+
+    Returns:
+        写入的模板数
+    """
+    if isinstance(templates, str):
+        from .imgBatch import list_images
+        templates = list_images(templates)
+    if not isinstance(templates, dict):
+        templates = {os.path.splitext(os.path.basename(p))[0]: p for p in templates}
+    backends = [get_backend(backend) for backend in backends]
+
+    meta, blobs, offset = {}, [], 0
+    for name, image in templates.items():
+        gray = np.ascontiguousarray(decode_image(image, cv2.IMREAD_GRAYSCALE))
+        arrays = {'gray': gray}
+        pyramid = gray
+        for level in range(1, levels + 1):
+            pyramid = cv2.pyrDown(pyramid)
+            arrays[f'level{level}'] = pyramid
+        for backend in backends:
+            keypoints, descriptors = backend.extract(gray)
+            arrays[f'{backend.key}/keypoints'] = keypoints_to_array(keypoints)
+            if descriptors is not None:
+                arrays[f'{backend.key}/descriptors'] = descriptors
+
+        entries = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            entries[key] = [offset, array.dtype.str, list(array.shape)]
+            blobs.append((offset, array))
+            offset = _aligned(offset + array.nbytes)
+        meta[name] = {'arrays': entries, 'levels': levels, 'backends': [b.key for b in backends],
+                      'key': template_key(gray), 'phash': f"{phash(gray, hash_size):x}"}
+        logger.debug(f"模板 {name}: 尺寸={gray.shape[::-1]}")
+
+    header = json.dumps({'templates': meta}, ensure_ascii=False).encode('utf-8')
+    base = _aligned(16 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for blob_offset, array in blobs:
+            f.seek(base + blob_offset)
+            f.write(array.tobytes())
+    logger.debug(f"模板包已写入: {path}, 模板数={len(meta)}, 大小={base + offset} 字节")
+    return len(meta)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="构建预编译模板包")
+    parser.add_argument('templates', help="模板目录")
+    parser.add_argument('output', help="输出的模板包文件")
+    parser.add_argument('--backends', default='sift', help="逗号分隔的特征后端，如 sift,orb")
+    parser.add_argument('--levels', type=int, default=3, help="金字塔层数")
+    args = parser.parse_args(argv)
+    count = build_pack(args.templates, args.output, args.backends.split(','), args.levels)
+    print(f"已写入 {count} 个模板: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# 分辨率: (width, height)
+Resolution = Tuple[int, int]
+# 分辨率或已登记的配置名称
+ResolutionSpec = Union[Resolution, str]
+
+
+class ResolutionProfiles:
+    """分辨率配置
+
+    记录每个模板截取时的屏幕分辨率(可按模板或按目录登记)。在其他分辨率的设备上匹配时，
+    模板按两种分辨率的比例缩放一次并缓存，之后即可用单一尺度的模板匹配，
+    不必依赖尺度不变的 SIFT 或多尺度搜索来适配已知的缩放比例。
+    坐标按各轴比例在不同分辨率之间换算。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: 缩放后模板缓存的最大条目数
+        """
+        self.profiles: Dict[str, Resolution] = {}
+        self._templates: Dict[str, Resolution] = {}
+        self._directories: Dict[str, Resolution] = {}
+        self._scaled: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def add_profile(self, name: str, resolution: Resolution) -> None:
+        """登记命名的设备分辨率，如 add_profile('phone', (1280, 720))"""
+        self.profiles[name] = (int(resolution[0]), int(resolution[1]))
+
+    def resolve(self, resolution: ResolutionSpec) -> Resolution:
+        """将配置名称或 (width, height) 转换为分辨率
+
+        Raises:
+            ValueError: 当配置名称未登记时抛出
+        """
+        if isinstance(resolution, str):
+            if resolution not in self.profiles:
+                raise ValueError(f"未登记的分辨率配置: {resolution}")
+            return self.profiles[resolution]
+        return int(resolution[0]), int(resolution[1])
+
+    def set_template_resolution(self, key: str, resolution: ResolutionSpec) -> None:
+        """登记模板的截取分辨率
+
+        Args:
+            key: 模板路径、模板目录(对目录下的所有模板生效)或 ImageProcessor._template_key 生成的标识
+            resolution: 截取时的屏幕分辨率或配置名称
+        """
+        resolution = self.resolve(resolution)
+        with self._lock:
+            if os.path.isdir(key):
+                self._directories[os.path.abspath(key)] = resolution
+            else:
+                self._templates[os.path.abspath(key) if os.path.exists(key) else key] = resolution
+            self._scaled.clear()
+
+    def resolution_of(self, key: str) -> Optional[Resolution]:
+        """查询模板的截取分辨率，模板未登记时使用最近一级已登记目录的分辨率"""
+        if key in self._templates:
+            return self._templates[key]
+        directory = os.path.dirname(key)
+        while directory:
+            if directory in self._directories:
+                return self._directories[directory]
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        return None
+
+    @staticmethod
+    def scale(source: Resolution, target: Resolution) -> float:
+        """模板从 source 分辨率到 target 分辨率的缩放比例
+
+        宽高比相同时两轴比例一致；不同时取较小的比例，使缩放后的模板不超过界面中的实际尺寸。
+        """
+        return min(target[0] / source[0], target[1] / source[1])
+
+    def convert_point(self, point: Tuple[float, float], source: ResolutionSpec,
+                      target: ResolutionSpec) -> Tuple[int, int]:
+        """将坐标从 source 分辨率换算到 target 分辨率"""
+        source, target = self.resolve(source), self.resolve(target)
+        return (int(round(point[0] * target[0] / source[0])),
+                int(round(point[1] * target[1] / source[1])))
+
+    def convert_rect(self, rect: Tuple[int, int, int, int], source: ResolutionSpec,
+                     target: ResolutionSpec) -> Tuple[int, int, int, int]:
+        """将 (x, y, w, h) 矩形从 source 分辨率换算到 target 分辨率"""
+        x0, y0 = self.convert_point(rect[:2], source, target)
+        x1, y1 = self.convert_point((rect[0] + rect[2], rect[1] + rect[3]), source, target)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def scaled_template(self, key: str, gray: np.ndarray, target: Resolution) -> np.ndarray:
+        """按截取分辨率和目标分辨率缩放模板，每个模板在每种目标分辨率下只缩放一次
+
+        Returns:
+            缩放后的模板；模板未登记分辨率或比例为 1 时返回原模板
+        """
+        source = self.resolution_of(key)
+        if source is None:
+            return gray
+        factor = self.scale(source, target)
+        if abs(factor - 1.0) < 1e-3:
+            return gray
+        # 模板文件被替换为不同尺寸时缓存自然失效
+        cache_key = (key, tuple(target), gray.shape)
+        with self._lock:
+            scaled = self._scaled.get(cache_key)
+            if scaled is not None:
+                self._scaled.move_to_end(cache_key)
+                return scaled
+        size = (max(1, int(round(gray.shape[1] * factor))), max(1, int(round(gray.shape[0] * factor))))
+        scaled = cv2.resize(gray, size, interpolation=cv2.INTER_AREA if factor < 1 else cv2.INTER_LINEAR)
+        scaled.setflags(write=False)
+        with self._lock:
+            self._scaled[cache_key] = scaled
+            while len(self._scaled) > self.max_entries:
+                self._scaled.popitem(last=False)
+        logger.debug(f"模板按分辨率缩放: {source} -> {tuple(target)}, 比例={factor:.3f}")
+        return scaled
+
+    @property
+    def enabled(self) -> bool:
+        """是否登记了任何模板的截取分辨率"""
+        return bool(self._templates or self._directories)
+
+    @property
+    def allowed_sizes(self) -> List[Resolution]:
+        """所有已登记的分辨率"""
+        return sorted(set(self.profiles.values()) | set(self._templates.values()) | set(self._directories.values()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.profiles.clear()
+            self._templates.clear()
+            self._directories.clear()
+            self._scaled.clear()
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgFrame import Frame, ImageInput
+
+# 相似度结果以 (N, 5) 的 float32 数组表示，每行为 (参考图下标, 综合得分, 直方图, NCC, SSIM)
+SIMILARITY_COLUMNS = ('index', 'score', 'hist', 'ncc', 'ssim')
+
+# compare_image_v3 计算多通道直方图时使用的缩放尺寸
+HIST_SIZE = (256, 256)
+
+# SSIM 常数，像素值范围为 0~255
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def _centered(rows: np.ndarray) -> np.ndarray:
+    """每行减去均值并除以范数，之后两行的点积即为相关系数"""
+    rows = rows - rows.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(rows, axis=-1, keepdims=True)
+    return np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 0)
+
+
+class SimilarityComparator:
+    """将一张候选图与多张参考图批量比较
+
+    参考图的直方图、灰度缩略图以及 SSIM 所需的分块均值和方差在创建时计算一次并堆叠为矩阵，
+    比较时只计算候选图自身的特征，再用一次矩阵乘法和几次逐元素运算得到与所有参考图的得分。
+
+    - hist: 与 compare_image_v3 相同的单通道直方图和三通道直方图相关系数的平均值
+    - ncc: 灰度缩略图的归一化互相关
+    - ssim: 灰度缩略图按 block x block 分块计算的平均结构相似度
+    """
+
+    def __init__(self, references: Union[Dict[str, ImageInput], Sequence[ImageInput]],
+                 thumb_size: Tuple[int, int] = (64, 64), block: int = 8,
+                 weights: Tuple[float, float, float] = (1.0, 1.0, 1.0)):
+        """
+        Args:
+            references: 参考图列表，或 {名称: 参考图}
+            thumb_size: NCC 和 SSIM 使用的灰度缩略图尺寸 (width, height)，需能被 block 整除
+            block: SSIM 的分块边长
+            weights: 综合得分中 hist、ncc、ssim 的权重
+        """
+        items = list(references.items()) if isinstance(references, dict) else list(enumerate(references))
+        if not items:
+            raise ValueError("至少需要一张参考图")
+        if thumb_size[0] % block or thumb_size[1] % block:
+            raise ValueError(f"缩略图尺寸 {thumb_size} 需能被分块边长 {block} 整除")
+        self.names = [name for name, _ in items]
+        self.thumb_size = tuple(thumb_size)
+        self.block = block
+        self.weights = np.float32(weights) / np.float32(sum(weights))
+
+        features = [self._features(Frame.of(image)) for _, image in items]
+        self._hist = np.stack([f[0] for f in features])          # (N, 256)
+        self._hist3 = np.stack([f[1] for f in features])         # (N, 3, 256)
+        self._thumb = np.stack([f[2] for f in features])         # (N, P)
+        self._means = np.stack([f[3] for f in features])         # (N, B)
+        self._vars = np.stack([f[4] for f in features])          # (N, B)
+        self._blocks = np.stack([f[5] for f in features])        # (N, B, block*block)
+        logger.debug(f"相似度比较器: 参考图数={len(self.names)}")
+
+    def _features(self, frame: Frame):
+        """计算单张图像的比较特征"""
+        hist = _centered(frame.hist(0).ravel().astype(np.float32))
+        hist3 = _centered(np.stack([frame.hist(c, size=HIST_SIZE).ravel() for c in range(3)]).astype(np.float32))
+        thumb = frame.resized(self.thumb_size, cv2.INTER_AREA, gray=True).astype(np.float32)
+        h, w = thumb.shape
+        b = self.block
+        blocks = thumb.reshape(h // b, b, w // b, b).swapaxes(1, 2).reshape(-1, b * b)
+        means = blocks.mean(axis=1)
+        centered_blocks = blocks - means[:, None]
+        variances = (centered_blocks ** 2).mean(axis=1)
+        return hist, hist3, _centered(thumb.ravel()), means, variances, centered_blocks
+
+    def compare(self, image: ImageInput) -> np.ndarray:
+        """计算候选图与所有参考图的相似度
+
+        Args:
+            image: 候选图，传入 Frame 时复用其缓存的直方图和缩略图
+
+        Returns:
+            (N, 5) float32 数组，列见 SIMILARITY_COLUMNS，按综合得分降序排列
+        """
+        hist, hist3, thumb, means, variances, blocks = self._features(Frame.of(image))
+
+        single = self._hist @ hist
+        multi = np.einsum('ncb,cb->n', self._hist3, hist3) / 3
+        hist_score = (single + multi) / 2
+        ncc = self._thumb @ thumb
+        # 分块 SSIM: 协方差为去均值后分块像素乘积的平均值
+        covariance = np.einsum('nkp,kp->nk', self._blocks, blocks) / blocks.shape[1]
+        ssim = (((2 * self._means * means + _C1) * (2 * covariance + _C2))
+                / ((self._means ** 2 + means ** 2 + _C1) * (self._vars + variances + _C2))).mean(axis=1)
+
+        metrics = np.stack([hist_score, ncc, ssim], axis=1).astype(np.float32)
+        result = np.empty((len(self.names), 5), dtype=np.float32)
+        result[:, 0] = np.arange(len(self.names))
+        result[:, 1] = metrics @ self.weights
+        result[:, 2:] = metrics
+        return result[np.argsort(-result[:, 1], kind='stable')]
+
+    def best(self, image: ImageInput, threshold: float = 0.0) -> Optional[Tuple[object, float]]:
+        """返回最相似的参考图名称和综合得分，得分低于 threshold 时返回 None"""
+        ranked = self.compare(image)
+        index, score = int(ranked[0, 0]), float(ranked[0, 1])
+        if score < threshold:
+            logger.debug(f"没有足够相似的参考图: 最高得分={score:.3f}")
+            return None
+        return self.names[index], score
+
+    def ranked_names(self, image: ImageInput) -> List[Tuple[object, float]]:
+        """按综合得分降序返回 [(名称, 得分), ...]"""
+        return [(self.names[int(i)], float(s)) for i, s in self.compare(image)[:, :2]]
+
+    def __len__(self) -> int:
+        return len(self.names)
@@ -0,0 +1,186 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# 单个匹配结果: (x, y, w, h, score)，坐标为全分辨率背景图像中的左上角和尺寸
+Match = Tuple[int, int, int, int, float]
+# 多个匹配结果以 (N, 5) 的 float32 数组表示，每行为 (x, y, w, h, score)
+MATCH_COLUMNS = ('x', 'y', 'w', 'h', 'score')
+
+
+def empty_matches() -> np.ndarray:
+    """空的匹配结果数组"""
+    return np.empty((0, 5), dtype=np.float32)
+
+
+def build_pyramid(gray: np.ndarray, levels: int) -> List[np.ndarray]:
+    """构建图像金字塔，第 0 层为原图，每层尺寸减半"""
+    pyramid = [gray]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def _pick_level(template_shape: Tuple[int, int], scene_shape: Tuple[int, int],
+                min_size: int, max_level: int) -> int:
+    """选择粗匹配层级: 缩小后模板的短边不小于 min_size，且背景仍大于模板"""
+    level = 0
+    th, tw = template_shape
+    sh, sw = scene_shape
+    while (level < max_level and min(th, tw) >> (level + 1) >= min_size
+           and min(sh - th, sw - tw) >> (level + 1) > 0):
+        level += 1
+    return level
+
+
+def find_peaks(result: np.ndarray, threshold: float, radius: Tuple[int, int],
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """在得分图中查找局部极大值
+
+    用膨胀得到每个像素邻域内的最大值，与原图相等且不低于阈值的位置即为峰值，
+    整个过程在 OpenCV/NumPy 中完成，不逐像素循环。
+
+    Args:
+        result: matchTemplate 输出的得分图
+        threshold: 最低得分
+        radius: 邻域半径 (rx, ry)，通常取模板尺寸的一半
+        limit: 最多返回的峰值数，None 表示不限制
+
+    Returns:
+        按得分降序排列的 (xs, ys, scores)
+    """
+    kernel = np.ones((2 * radius[1] + 1, 2 * radius[0] + 1), np.uint8)
+    dilated = cv2.dilate(result, kernel)
+    ys, xs = np.nonzero((result >= dilated) & (result >= threshold))
+    scores = result[ys, xs]
+    order = np.argsort(-scores, kind='stable')[:limit]
+    return xs[order], ys[order], scores[order]
+
+
+def non_max_suppression(boxes: np.ndarray, iou_threshold: float = 0.3,
+                        max_results: Optional[int] = None) -> np.ndarray:
+    """对匹配框做非极大值抑制
+
+    按得分从高到低依次保留匹配框，并用向量化的交并比计算一次性剔除与其重叠过多的其余框。
+
+    Args:
+        boxes: (N, 5) 数组，每行为 (x, y, w, h, score)
+        iou_threshold: 交并比超过该值的框视为同一目标
+        max_results: 最多保留的框数，None 表示不限制
+
+    Returns:
+        保留的匹配框，按得分降序排列
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 5)
+    if len(boxes) == 0:
+        return empty_matches()
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(-boxes[:, 4], kind='stable')
+    keep = []
+    while order.size and (max_results is None or len(keep) < max_results):
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return boxes[keep]
+
+
+def _refine(scene: np.ndarray, template: np.ndarray, x: int, y: int, pad: int) -> Tuple[int, int, float]:
+    """在全分辨率背景中以 (x, y) 为中心的小窗口内精确匹配"""
+    th, tw = template.shape[:2]
+    sh, sw = scene.shape[:2]
+    x0, y0 = max(0, x - pad), max(0, y - pad)
+    x1, y1 = min(sw, x + tw + pad), min(sh, y + th + pad)
+    if x1 - x0 < tw or y1 - y0 < th:
+        return x, y, -1.0
+    result = cv2.matchTemplate(scene[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, loc = cv2.minMaxLoc(result)
+    return x0 + loc[0], y0 + loc[1], float(score)
+
+
+def match_template(scene_gray: np.ndarray, template_gray: np.ndarray, threshold: float = 0.8,
+                   scales: Sequence[float] = (1.0,), max_results: Optional[int] = None,
+                   min_size: int = 12, max_level: int = 3, coarse_margin: float = 0.25,
+                   max_candidates: int = 256, overlap: float = 0.3,
+                   scene_pyramid: Optional[Callable[[int], List[np.ndarray]]] = None,
+                   template_pyramid: Optional[Callable[[int], List[np.ndarray]]] = None) -> np.ndarray:
+    """金字塔粗到精模板匹配
+
+    先在缩小的金字塔层上对整幅背景做 TM_CCOEFF_NORMED 匹配找出候选峰值，
+    再只在全分辨率下候选位置附近的小窗口内精确匹配。
+
+    Args:
+        scene_gray: 背景灰度图
+        template_gray: 模板灰度图
+        threshold: 全分辨率下的最低匹配得分
+        scales: 模板缩放比例列表，用于适配不同设备分辨率
+        max_results: 最多返回的匹配数，None 表示不限制
+        min_size: 粗匹配层上模板短边的最小像素数
+        max_level: 金字塔最大层数
+        coarse_margin: 粗匹配阈值相对 threshold 的放宽量
+        max_candidates: 每个缩放比例保留的最大候选数
+        overlap: 交并比超过该值的匹配视为同一目标
+        scene_pyramid: 接收层数、返回背景金字塔的函数(如 Frame.pyramid)，用于复用已构建的金字塔
+        template_pyramid: 接收层数、返回模板金字塔的函数，仅用于缩放比例 1.0
+
+    Returns:
+        (N, 5) 数组，每行为 (x, y, w, h, score)，按得分降序排列
+    """
+    if float(template_gray.std()) == 0.0:
+        # 纯色模板的归一化相关系数没有意义，会在任意位置得到满分
+        logger.debug("模板为纯色图像，无法进行模板匹配")
+        return empty_matches()
+
+    sh, sw = scene_gray.shape[:2]
+    templates = []
+    for scale in scales:
+        template = template_gray if scale == 1.0 else cv2.resize(
+            template_gray, None, fx=scale, fy=scale,
+            interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+        th, tw = template.shape[:2]
+        if th > sh or tw > sw or min(th, tw) < 2:
+            logger.debug(f"缩放比例 {scale} 下模板尺寸 {tw}x{th} 不适用于背景 {sw}x{sh}")
+            continue
+        templates.append((scale, template, _pick_level((th, tw), (sh, sw), min_size, max_level)))
+
+    if not templates:
+        return empty_matches()
+
+    levels = max(level for _, _, level in templates)
+    scene_pyramid = scene_pyramid(levels) if scene_pyramid else build_pyramid(scene_gray, levels)
+    candidates: List[np.ndarray] = []
+    for scale, template, level in templates:
+        th, tw = template.shape[:2]
+        if scale == 1.0 and template_pyramid:
+            coarse_template = template_pyramid(level)[level]
+        else:
+            coarse_template = build_pyramid(template, level)[level]
+        coarse_scene = scene_pyramid[level]
+        result = cv2.matchTemplate(coarse_scene, coarse_template, cv2.TM_CCOEFF_NORMED)
+
+        ch, cw = coarse_template.shape[:2]
+        coarse_threshold = threshold if level == 0 else threshold - coarse_margin
+        xs, ys, scores = find_peaks(result, coarse_threshold, (max(1, cw // 2), max(1, ch // 2)),
+                                    max_candidates)
+        logger.debug(f"缩放比例 {scale}: 粗匹配层 {level}, 候选 {len(xs)} 个")
+
+        if level:
+            # 只在候选峰值附近的全分辨率小窗口内精确匹配
+            factor = 1 << level
+            refined = np.array([_refine(scene_gray, template, x * factor, y * factor, factor + 1)
+                                for x, y in zip(xs.tolist(), ys.tolist())], dtype=np.float32).reshape(-1, 3)
+            xs, ys, scores = refined[:, 0], refined[:, 1], refined[:, 2]
+        rows = np.empty((len(xs), 5), dtype=np.float32)
+        rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4] = xs, ys, tw, th, scores
+        candidates.append(rows[rows[:, 4] >= threshold])
+
+    # 去除指向同一目标的重复匹配
+    return non_max_suppression(np.concatenate(candidates), overlap, max_results)
@@ -1,13 +1,39 @@
 import os
+import time
 import cv2
 import numpy as np
 from matplotlib import pyplot as plt
-from typing import Tuple, List, Optional, Union
+from typing import Dict, Tuple, List, Optional, Union
 from loguru import logger
+from .imgCache import TemplateFeatureCache, TemplateFeatures, keypoints_to_array, template_key
+from .imgColor import RegionQuery, get_analyzer
+from .imgFeature import BACKENDS, FeatureBackend, get_backend
+from .imgFrame import Frame, ImageInput, RoiSpec, decode_image, describe_image as _describe, normalize_roi
+from .imgLocation import LocationStore
+from .imgPack import TemplatePack
+from .imgProfile import ResolutionProfiles, ResolutionSpec
+from .imgSimilarity import SimilarityComparator
+from .imgTemplate import Match, empty_matches, match_template, non_max_suppression
+
+# 特征后端: 预置名称('sift'、'orb'、'akaze'、'brisk'、'auto')或 FeatureBackend 实例
+BackendSpec = Union[str, FeatureBackend, None]
 
 
 class ImageProcessor:
     """图像处理工具类,提供图像操作相关功能"""
+
+    # 模板特征缓存，模板文件不变时只计算一次特征
+    template_cache = TemplateFeatureCache()
+    # 未指定 backend 时使用的特征后端
+    default_backend: Union[str, FeatureBackend] = 'sift'
+    # backend='auto' 时每个模板选出的后端
+    _auto_backends: Dict[str, FeatureBackend] = {}
+    # 模板在各分辨率下最近一次出现的位置，find_template 优先在该位置校验
+    location_store = LocationStore()
+    # 模板截取分辨率及按设备分辨率缩放后的模板缓存
+    resolution_profiles = ResolutionProfiles()
+    # 已打开的模板包，按绝对路径索引
+    template_packs: Dict[str, TemplatePack] = {}
     
     @staticmethod
     def get_image_size(image: np.ndarray) -> Tuple[int, int]:
@@ -57,6 +83,163 @@ class ImageProcessor:
             logger.debug(f"图片转换为数组失败: {e}")
             raise
 
+    @staticmethod
+    def read_image(image_input: ImageInput, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        """将各种形式的图像输入解码为OpenCV图像
+
+        文件路径和字节数据只解码一次；ndarray 直接使用，仅在通道数不符时转换；
+        PIL 图像按 RGB 读取后转换为 BGR；Frame 返回其缓存的彩色图或灰度图。
+
+        Args:
+            image_input: 文件路径、np.ndarray、编码后的图像字节、PIL图像或 Frame
+            flags: cv2.IMREAD_COLOR 返回BGR图像，cv2.IMREAD_GRAYSCALE 返回灰度图
+
+        Returns:
+            解码后的图像
+
+        Raises:
+            FileNotFoundError: 当图像文件不存在时抛出
+            ValueError: 当图像无法解码时抛出
+            TypeError: 当输入类型不受支持时抛出
+        """
+        if isinstance(image_input, Frame):
+            return image_input.gray if flags == cv2.IMREAD_GRAYSCALE else image_input.bgr
+        return decode_image(image_input, flags)
+
+    @staticmethod
+    def set_template_resolution(src_img: Union[ImageInput, str], resolution: ResolutionSpec) -> None:
+        """登记模板(或模板目录)截取时的屏幕分辨率
+
+        模板匹配(find_template 等)在其他分辨率的截图上运行时，模板按分辨率比例缩放一次并缓存，
+        以单一尺度匹配，无需传入多个 scales。
+
+        Args:
+            src_img: 模板路径、模板目录或内存中的模板
+            resolution: (width, height) 或 resolution_profiles 中登记的配置名称
+        """
+        key = src_img if isinstance(src_img, str) else ImageProcessor._template_key(src_img)
+        ImageProcessor.resolution_profiles.set_template_resolution(key, resolution)
+
+    @staticmethod
+    def load_template_pack(path: str) -> TemplatePack:
+        """打开预编译的模板包(见 imgPack.build_pack)，同一文件只打开一次
+
+        包内模板 pack['名称'] 可直接作为任意方法的模板参数，灰度图、金字塔和特征均来自文件映射，
+        不再解码图片或提取特征。
+
+        Args:
+            path: 模板包文件路径
+
+        Returns:
+            TemplatePack
+        """
+        key = os.path.abspath(path)
+        pack = ImageProcessor.template_packs.get(key)
+        if pack is None:
+            pack = ImageProcessor.template_packs[key] = TemplatePack(path)
+        return pack
+
+    @staticmethod
+    def load_locations(path: str) -> LocationStore:
+        """从 JSON 文件加载模板位置记录并作为 location_store，之后调用 location_store.save() 写回同一文件"""
+        ImageProcessor.location_store = LocationStore.load(path)
+        return ImageProcessor.location_store
+
+    @staticmethod
+    def _template_features(src_img: ImageInput, backend: FeatureBackend) -> TemplateFeatures:
+        """获取模板特征，文件路径走缓存，内存图像直接计算"""
+        if isinstance(src_img, str):
+            return ImageProcessor.template_cache.get(src_img, backend.extract, backend.key)
+
+        def compute():
+            gray = ImageProcessor.read_image(src_img, cv2.IMREAD_GRAYSCALE)
+            keypoints, descriptors = backend.extract(gray)
+            return TemplateFeatures(gray, keypoints_to_array(keypoints), descriptors)
+
+        if isinstance(src_img, Frame):
+            return src_img.cached(('template', backend.key), compute)
+        return compute()
+
+    @staticmethod
+    def _template_key(src_img: ImageInput) -> str:
+        """模板标识，路径使用绝对路径，内存图像使用像素内容的哈希"""
+        if isinstance(src_img, str):
+            return os.path.abspath(src_img)
+
+        def compute():
+            return template_key(ImageProcessor.read_image(src_img, cv2.IMREAD_GRAYSCALE))
+
+        if isinstance(src_img, Frame):
+            return src_img.cached('template_key', compute)
+        return compute()
+
+    @staticmethod
+    def _resolve_backend(backend: BackendSpec, src_img: ImageInput = None,
+                         back_img: Optional[ImageInput] = None) -> FeatureBackend:
+        """解析特征后端，'auto' 时返回该模板已选出的后端，首次使用时用当前背景进行选择"""
+        backend = ImageProcessor.default_backend if backend is None else backend
+        if not (isinstance(backend, str) and backend.lower() == 'auto'):
+            return get_backend(backend)
+        if src_img is None:
+            return get_backend('sift')
+        key = ImageProcessor._template_key(src_img)
+        selected = ImageProcessor._auto_backends.get(key)
+        if selected is None and back_img is not None:
+            selected = ImageProcessor.select_backend(src_img, back_img)
+        return selected or get_backend('sift')
+
+    @staticmethod
+    def select_backend(src_img: ImageInput, back_img: ImageInput,
+                       candidates: Optional[List[BackendSpec]] = None,
+                       min_inliers: int = 10, tolerance: float = 5.0) -> FeatureBackend:
+        """为模板选择最快且单应性稳定的特征后端，结果供 backend='auto' 复用
+
+        依次用各候选后端在给定背景中匹配模板并计时。内点数不少于 min_inliers，
+        且四角与SIFT结果的偏差不超过 tolerance 像素的后端视为稳定，从中选出耗时最短的。
+
+        Args:
+            src_img: 模板图像
+            back_img: 包含该模板的背景图像
+            candidates: 候选后端，默认为全部预置后端
+            min_inliers: 稳定单应性所需的最少RANSAC内点数
+            tolerance: 与参考结果的最大角点偏差(像素)
+
+        Returns:
+            选出的后端，没有稳定后端时返回SIFT
+        """
+        back_gray = ImageProcessor.read_image(back_img, cv2.IMREAD_GRAYSCALE)
+        template_gray = ImageProcessor.read_image(src_img, cv2.IMREAD_GRAYSCALE)
+        backends = [get_backend(b) for b in (candidates or list(BACKENDS.values()))]
+        if not any(b.name == 'sift' for b in backends):
+            backends.append(get_backend('sift'))
+
+        trials = {}
+        for backend in backends:
+            try:
+                start = time.perf_counter()
+                keypoints, descriptors = backend.extract(template_gray)
+                template = TemplateFeatures(template_gray, keypoints_to_array(keypoints), descriptors)
+                scene_pts, scene_des = ImageProcessor._scene_features(back_gray, backend)
+                if scene_des is None:
+                    raise ValueError("背景图像未检测到关键点")
+                matcher = backend.build_matcher(scene_des)
+                dst, inliers = ImageProcessor._match_template(template, scene_pts, matcher, backend)
+                trials[backend] = (time.perf_counter() - start, dst.reshape(-1, 2), inliers)
+                logger.debug(f"后端 {backend.name}: 耗时={trials[backend][0] * 1000:.1f}ms, 内点={inliers}")
+            except Exception as e:
+                logger.debug(f"后端 {backend.name} 匹配失败: {e}")
+
+        reference = next((t[1] for b, t in trials.items() if b.name == 'sift'), None)
+        stable = [
+            (elapsed, backend) for backend, (elapsed, corners, inliers) in trials.items()
+            if inliers >= min_inliers and
+            (reference is None or np.abs(corners - reference).max() <= tolerance)
+        ]
+        selected = min(stable, key=lambda t: t[0])[1] if stable else get_backend('sift')
+        ImageProcessor._auto_backends[ImageProcessor._template_key(src_img)] = selected
+        logger.debug(f"模板 {_describe(src_img)} 选用特征后端: {selected.name}")
+        return selected
+
     @staticmethod
     def check_image_orientation_and_size(img, return_orientation=False):
         """
@@ -70,8 +253,8 @@ class ImageProcessor:
         - orientation: 如果 return_orientation 为 True，则返回 'horizontal' 或 'vertical'
         - is_allowed_size: True 或 False
         """
-        # 固定的允许尺寸列表
-        allowed_sizes = [(431, 777)]
+        # 允许的尺寸列表，默认尺寸之外加上已登记的分辨率
+        allowed_sizes = {(431, 777), *ImageProcessor.resolution_profiles.allowed_sizes}
         # allowed_sizes = [(1280, 720), (1280, 800)]
 
         if img is None:
@@ -94,12 +277,111 @@ class ImageProcessor:
             return is_allowed_size
 
     @staticmethod
-    def load_and_process_images(src_img: str, back_img: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def _scene_features(back_gray: np.ndarray, backend: FeatureBackend) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """计算背景图像的特征，返回关键点坐标 (N, 2) 和描述符"""
+        keypoints, descriptors = backend.extract(back_gray)
+        return cv2.KeyPoint_convert(keypoints).reshape(-1, 2), descriptors
+
+    @staticmethod
+    def _scene_index(frame: Frame, backend: FeatureBackend) -> Tuple[np.ndarray, cv2.DescriptorMatcher]:
+        """获取背景帧的特征点坐标和已构建索引的匹配器，同一帧同一后端只计算一次
+
+        Raises:
+            ValueError: 当背景图像未检测到关键点时抛出
+        """
+        def compute():
+            scene_pts, scene_des = ImageProcessor._scene_features(frame.gray, backend)
+            matcher = backend.build_matcher(scene_des) if scene_des is not None else None
+            logger.debug(f"背景特征: 后端={backend.name}, 特征点={len(scene_pts)}")
+            return scene_pts, matcher
+
+        scene_pts, matcher = frame.cached(('scene', backend.key, backend.matcher), compute)
+        if matcher is None:
+            raise ValueError("未检测到足够的关键点，请检查输入图像。")
+        return scene_pts, matcher
+
+    @staticmethod
+    def _match_template(template: TemplateFeatures, scene_pts: np.ndarray,
+                        matcher: cv2.DescriptorMatcher, backend: FeatureBackend) -> Tuple[np.ndarray, int]:
+        """将模板特征与已构建索引的背景特征匹配，计算模板四角在背景中的位置
+
+        Returns:
+            (四角坐标数组 (4, 1, 2), RANSAC内点数)
+
+        Raises:
+            ValueError: 当匹配点不足或无法计算单应性矩阵时抛出
+        """
+        if template.descriptors is None:
+            raise ValueError("未检测到足够的关键点，请检查输入图像。")
+
+        matches = matcher.knnMatch(template.descriptors, k=2)
+        good_matches = [m[0] for m in matches if len(m) == 2 and m[0].distance < backend.ratio * m[1].distance]
+        if len(good_matches) < 4:
+            raise ValueError("未找到足够的匹配点，请检查输入图像。")
+
+        logger.debug(f"找到有效匹配点: {len(good_matches)}")
+
+        # 计算单应性矩阵
+        query_idx = np.array([m.queryIdx for m in good_matches])
+        train_idx = np.array([m.trainIdx for m in good_matches])
+        src_pts = template.points[query_idx].reshape(-1, 1, 2)
+        dst_pts = scene_pts[train_idx].reshape(-1, 1, 2)
+        M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, backend.ransac_thresh)
+        if M is None:
+            raise ValueError("无法计算单应性矩阵，请检查输入图像。")
+
+        # 计算目标图像的四个角点在背景图像中的位置
+        h, w = template.gray.shape
+        pts = np.float32([[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]).reshape(-1, 1, 2)
+        dst = cv2.perspectiveTransform(pts, M)
+        return dst, int(mask.sum())
+
+    @staticmethod
+    def _regions(back_img: ImageInput, roi: RoiSpec = None) -> List[Tuple[Frame, np.ndarray]]:
+        """按搜索区域裁剪背景图像(NumPy 视图，不复制像素)，roi 为 None 时返回整幅图像
+
+        Returns:
+            [(子帧, 子帧左上角在背景图像中的坐标), ...]
+
+        Raises:
+            ValueError: 当搜索区域与背景图像没有交集时抛出
+        """
+        frame = Frame.of(back_img)
+        if roi is None:
+            return [(frame, np.zeros(2, np.float32))]
+        rects = normalize_roi(roi, frame.size)
+        if not rects:
+            raise ValueError(f"搜索区域 {roi} 与背景图像没有交集")
+        return [(frame.crop(rect), np.float32(rect[:2])) for rect in rects]
+
+    @staticmethod
+    def _locate(src_img: ImageInput, back_img: ImageInput, backend: BackendSpec = None,
+                roi: RoiSpec = None) -> np.ndarray:
+        """在背景图像(或各搜索区域)中查找模板，返回原图坐标下的四角坐标 (4, 1, 2)
+
+        多个搜索区域时按顺序查找，返回第一个找到的结果。
+
+        Raises:
+            ValueError: 当所有区域都未找到目标时抛出最后一个区域的错误
+        """
+        error = None
+        for region, offset in ImageProcessor._regions(back_img, roi):
+            try:
+                _, _, dst = ImageProcessor.load_and_process_images(src_img, region, backend)
+                return dst + offset
+            except Exception as e:
+                error = e
+        raise error
+
+    @staticmethod
+    def load_and_process_images(src_img: ImageInput, back_img: ImageInput,
+                                backend: BackendSpec = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """加载和预处理图像，检测特征点并计算单应性矩阵
         
         Args:
-            src_img: 目标图像路径
-            back_img: 背景图像路径
+            src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+            back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
+            backend: 特征后端，默认使用 ImageProcessor.default_backend
             
         Returns:
             包含处理后的图像、特征点和描述符的元组
@@ -110,55 +392,32 @@ class ImageProcessor:
         """
         try:
             # 检查文件是否存在
-            if not os.path.exists(src_img):
+            if isinstance(src_img, str) and not os.path.exists(src_img):
                 raise FileNotFoundError(f"目标图像文件不存在: {src_img}")
-            if not os.path.exists(back_img):
+            if isinstance(back_img, str) and not os.path.exists(back_img):
                 raise FileNotFoundError(f"背景图像文件不存在: {back_img}")
             
-            logger.debug(f"开始处理图像: src={src_img}, back={back_img}")
+            logger.debug(f"开始处理图像: src={_describe(src_img)}, back={_describe(back_img)}")
             
-            # 读取图像并转换为灰度图
-            img1 = cv2.imread(src_img, 0)
-            img2 = cv2.imread(back_img, 0)
-            if img1 is None or img2 is None:
-                raise ValueError("无法读取图像，请检查图像路径是否正确。")
+            # 模板特征从缓存读取，背景特征在同一 Frame 内只计算一次
+            back = Frame.of(back_img)
+            img2 = back.gray
+            backend = ImageProcessor._resolve_backend(backend, src_img, back)
+            template = ImageProcessor._template_features(src_img, backend)
+            img1 = template.gray
             
-            logger.debug("成功读取图像")
+            logger.debug(f"成功读取图像, 特征后端: {backend.name}")
 
-            # 使用SIFT检测关键点和描述符
-            sift = cv2.SIFT_create()
-            kp1, des1 = sift.detectAndCompute(img1, None)
-            kp2, des2 = sift.detectAndCompute(img2, None)
-            if des1 is None or des2 is None:
+            # 检测关键点和描述符
+            scene_pts, matcher = ImageProcessor._scene_index(back, backend)
+            if template.descriptors is None:
                 raise ValueError("未检测到足够的关键点，请检查输入图像。")
                 
-            logger.debug(f"检测到特征点: kp1={len(kp1)}, kp2={len(kp2)}")
-
-            # 使用FLANN匹配器进行匹配
-            index_params = dict(algorithm=1, trees=5)
-            search_params = dict(checks=50)
-            flann = cv2.FlannBasedMatcher(index_params, search_params)
-            matches = flann.knnMatch(des1, des2, k=2)
-            good_matches = [m for m, n in matches if m.distance < 0.7 * n.distance]
-            if not good_matches:
-                raise ValueError("未找到足够的匹配点，请检查输入图像。")
-                
-            logger.debug(f"找到有效匹配点: {len(good_matches)}")
-
-            # 计算单应性矩阵
-            src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-            M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
-            if M is None:
-                raise ValueError("无法计算单应性矩阵，请检查输入图像。")
-                
-            logger.debug("成功计算单应性矩阵")
+            logger.debug(f"检测到特征点: kp1={len(template.keypoints)}, kp2={len(scene_pts)}")
+
+            # 特征匹配并计算单应性矩阵
+            dst, _ = ImageProcessor._match_template(template, scene_pts, matcher, backend)
 
-            # 计算目标图像的四个角点在背景图像中的位置
-            h, w = img1.shape
-            pts = np.float32([[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]).reshape(-1, 1, 2)
-            dst = cv2.perspectiveTransform(pts, M)
-            
             logger.debug("完成图像处理")
             return img1, img2, dst
             
@@ -167,11 +426,84 @@ class ImageProcessor:
             raise
 
     @staticmethod
-    def visualize_results(back_img: str, corners: List[Tuple[int, int]], show: bool = False, scale_factor: float = 0.8) -> None:
+    def locate_many(templates: Union[Dict[str, ImageInput], List[ImageInput]],
+                    frame: ImageInput,
+                    backend: BackendSpec = None,
+                    roi: RoiSpec = None) -> Union[Dict[str, Optional[dict]], List[Optional[dict]]]:
+        """在同一张截图中批量查找多个模板
+
+        背景图像只解码一次，每种特征后端只提取一次背景特征并构建一次匹配器索引(缓存在 Frame 中)，
+        每个模板(路径形式时走特征缓存)仅需与该索引匹配。
+
+        Args:
+            templates: 模板列表，或 {名称: 模板} 字典
+            frame: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
+            backend: 特征后端，默认使用 ImageProcessor.default_backend；'auto' 时按模板分别选择
+            roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表；多个区域时返回第一个找到的结果
+
+        Returns:
+            与 templates 结构对应的结果(坐标均为原图坐标)，每项为
+            {'corners': 四角坐标, 'center': [x, y], 'inliers': 内点数}，未找到时为 None
+        """
+        named = isinstance(templates, dict)
+        items = list(templates.items()) if named else list(enumerate(templates))
+        results = {key: None for key, _ in items}
+
+        try:
+            regions = ImageProcessor._regions(frame, roi)
+            for region, _ in regions:
+                region.gray
+        except Exception as e:
+            logger.debug(f"批量匹配失败: {e}")
+            return results if named else list(results.values())
+
+        # 背景特征和匹配器按后端缓存在 Frame 中
+        logger.debug(f"批量匹配: 模板数={len(items)}")
+        for key, src_img in items:
+            for region, offset in regions:
+                try:
+                    selected = ImageProcessor._resolve_backend(backend, src_img, region)
+                    scene_pts, matcher = ImageProcessor._scene_index(region, selected)
+                    template = ImageProcessor._template_features(src_img, selected)
+                    dst, inliers = ImageProcessor._match_template(template, scene_pts, matcher, selected)
+                    dst = dst + offset
+                    x, y, w, h = cv2.boundingRect(dst)
+                    results[key] = {
+                        'corners': [(int(px), int(py)) for px, py in dst.reshape(-1, 2)],
+                        'center': [int(x + w / 2), int(y + h / 2)],
+                        'inliers': inliers,
+                    }
+                    break
+                except Exception as e:
+                    logger.debug(f"模板匹配失败: {_describe(src_img)}, {e}")
+
+        return results if named else list(results.values())
+
+    @staticmethod
+    def process_images(src_dir: str, back_img: str, mode: str = 'center', workers: Optional[int] = None,
+                       backend: BackendSpec = None) -> Dict[str, object]:
+        """在多个进程中用目录下的所有模板匹配同一张背景图像
+
+        Args:
+            src_dir: 模板目录或模板文件路径
+            back_img: 背景图像路径
+            mode: 'center'、'corners' 或 'template'，对应 get_center_location、get_corners 和 find_template
+            workers: 进程数，None 时使用CPU核数
+            backend: 特征后端
+
+        Returns:
+            {模板路径: 匹配结果}，未找到时结果为 None
+        """
+        from .imgBatch import batch_match
+        return {item.template: item.result
+                for item in batch_match(src_dir, back_img, mode, workers, backend)}
+
+    @staticmethod
+    def visualize_results(back_img: ImageInput, corners: List[Tuple[int, int]], show: bool = False, scale_factor: float = 0.8) -> None:
         """可视化匹配结果
         
         Args:
-            back_img: 背景图像路径
+            back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
             corners: 目标图像的四角坐标
             show: 是否显示匹配结果
             scale_factor: 缩放因子
@@ -179,7 +511,7 @@ class ImageProcessor:
         if not show:
             return
             
-        img3 = cv2.imread(back_img)
+        img3 = ImageProcessor.read_image(back_img)
         new_width = int(img3.shape[1] * scale_factor)
         new_height = int(img3.shape[0] * scale_factor)
         img3 = cv2.resize(img3, (new_width, new_height))
@@ -199,20 +531,25 @@ class ImageProcessor:
         cv2.destroyAllWindows()
 
     @staticmethod
-    def get_corners(src_img: str, back_img: str, show: bool = False) -> Optional[List[Tuple[int, int]]]:
+    def get_corners(src_img: ImageInput, back_img: ImageInput, show: bool = False,
+                    backend: BackendSpec = None, roi: RoiSpec = None) -> Optional[List[Tuple[int, int]]]:
         """在背景图像中查找目标图像的四角坐标
         
         Args:
-            src_img: 目标图像路径
-            back_img: 背景图像路径
+            src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+            back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
             show: 是否显示匹配结果
+            backend: 特征后端，默认使用 ImageProcessor.default_backend
+            roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表，None 时搜索整幅图像
             
         Returns:
-            目标图像在背景中的四角坐标,如果失败返回None
+            目标图像在背景中的四角坐标(原图坐标),如果失败返回None
         """
         try:
-            logger.debug(f"开始获取角点: src={src_img}, back={back_img}")
-            _, _, dst = ImageProcessor.load_and_process_images(src_img, back_img)
+            logger.debug(f"开始获取角点: src={_describe(src_img)}, back={_describe(back_img)}")
+            # 匹配和可视化共用同一帧的解码结果
+            back_img = Frame.of(back_img)
+            dst = ImageProcessor._locate(src_img, back_img, backend, roi)
             corners = [(int(x), int(y)) for x, y in dst.reshape(-1, 2)]
             if show:
                 ImageProcessor.visualize_results(back_img, corners, show)
@@ -223,17 +560,20 @@ class ImageProcessor:
             return None
 
     @staticmethod
-    def get_center_location(src_img, back_img, show=False):
+    def get_center_location(src_img, back_img, show=False, backend=None, roi=None):
         """
         使用SIFT算法在背景图像中查找目标图像，并返回目标图像的中心点坐标。
 
-        :param src_img: 目标图像路径
-        :param back_img: 背景图像路径
+        :param src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+        :param back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
         :param show: 是否显示匹配结果，1 表示显示
+        :param backend: 特征后端，默认使用 ImageProcessor.default_backend
+        :param roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表，None 时搜索整幅图像
         :return: 目标图像在背景图像中的中心点坐标 (x, y)
         """
         try:
-            _, _, dst = ImageProcessor.load_and_process_images(src_img, back_img)
+            back_img = Frame.of(back_img)
+            dst = ImageProcessor._locate(src_img, back_img, backend, roi)
             x, y, w, h = cv2.boundingRect(dst)
             center_x = x + w / 2
             center_y = y + h / 2
@@ -246,18 +586,21 @@ class ImageProcessor:
             return None
 
     @staticmethod
-    def capture_target_image_v1(src_img, back_img, show=False):
+    def capture_target_image_v1(src_img, back_img, show=False, backend=None, roi=None):
         '''
         使用SIFT和基于FLANN的匹配从背景图像中捕获目标图像。
 
-        :param src_img: 目标图像的路径。
-        :param back_img: 背景图像的路径。
+        :param src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame。
+        :param back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame。
         :param show: 如果为True，则显示目标图像和匹配区域。
+        :param backend: 特征后端，默认使用 ImageProcessor.default_backend。
+        :param roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表，None 时搜索整幅图像。
         :return: 背景图像中目标图像的匹配区域。
         '''
         try:
-            img2_colour = cv2.imread(back_img)
-            _, _, dst = ImageProcessor.load_and_process_images(src_img, back_img)
+            back = Frame.of(back_img)
+            img2_colour = back.bgr
+            dst = ImageProcessor._locate(src_img, back, backend, roi)
             rect = cv2.minAreaRect(dst)
             box = cv2.boxPoints(rect)
             box = np.int32(box)
@@ -271,9 +614,10 @@ class ImageProcessor:
             img3 = img2_colour[min_y:max_y, min_x:max_x]
 
             if show:
-                cv2.imshow("Target Image", cv2.imread(src_img))
+                src_colour = ImageProcessor.read_image(src_img)
+                cv2.imshow("Target Image", src_colour)
                 cv2.imshow("Matched Region", img3)
-                print(f"Target Image Size: {cv2.imread(src_img).shape}")
+                print(f"Target Image Size: {src_colour.shape}")
                 print(f"Matched Region Size: {img3.shape}")
                 cv2.waitKey(0)
 
@@ -288,36 +632,27 @@ class ImageProcessor:
             print(f"未知错误: {e}")
 
     @staticmethod
-    def mark_target(src_img, back_img):
+    def mark_target(src_img, back_img, threshold=0.8, show=True, scales=(1.0,), roi=None):
+        """
+        使用模板匹配在背景图像中标记所有目标位置。
+
+        :param src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+        :param back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
+        :param threshold: 匹配得分阈值
+        :param show: 是否用 matplotlib 显示标记结果，无界面环境下传 False
+        :param scales: 模板缩放比例列表
+        :param roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表，None 时搜索整幅图像
+        :return: (N, 5) 匹配数组，每行为 (x, y, w, h, score)，失败时返回空数组
+        """
         try:
-            # 读取图像
-            img1 = cv2.imread(src_img)
-            img2 = cv2.imread(back_img)
-
-            if img1 is None:
-                raise FileNotFoundError(f"目标图像文件 '{src_img}' 不存在或无法读取。")
-            if img2 is None:
-                raise FileNotFoundError(f"背景图像文件 '{back_img}' 不存在或无法读取。")
-
-            # 转换为灰度图像
-            img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
+            matches = ImageProcessor.find_all_templates(src_img, back_img, threshold, scales, roi=roi)
+            if not show:
+                return matches
 
-            # 使用模板匹配
-            result = cv2.matchTemplate(img2_gray, img1_gray, cv2.TM_CCOEFF_NORMED)
-
-            # 设置阈值
-            threshold = 0.8
-
-            # 找到匹配位置
-            loc = np.where(result >= threshold)
-
-            # 在背景图像上绘制矩形框
-            for pt in zip(*loc[::-1]):
-                cv2.rectangle(
-                    img2, pt,
-                    (pt[0] + img1_gray.shape[1], pt[1] + img1_gray.shape[0]),
-                    (0, 0, 255), 2)
+            # 在背景图像上绘制矩形框，复制一份避免修改调用方的数组
+            img2 = ImageProcessor.read_image(back_img).copy()
+            for x, y, w, h in matches[:, :4].astype(int).tolist():
+                cv2.rectangle(img2, (x, y), (x + w, y + h), (0, 0, 255), 2)
 
             # 显示结果
             plt.figure(figsize=(10, 10))
@@ -325,6 +660,7 @@ class ImageProcessor:
             plt.title('Detected Matches')
             plt.axis('off')
             plt.show()
+            return matches
 
         except FileNotFoundError as e:
             print(f"文件错误: {e}")
@@ -334,6 +670,133 @@ class ImageProcessor:
             print(f"值错误: {e}")
         except Exception as e:
             print(f"未知错误: {e}")
+        return empty_matches()
+
+    @staticmethod
+    def _template_gray(src_img: ImageInput, resolution: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """获取模板灰度图，路径形式的模板走缓存避免重复解码
+
+        Args:
+            src_img: 模板
+            resolution: 背景图像的分辨率，模板登记了截取分辨率时按比例缩放到该分辨率
+        """
+        if isinstance(src_img, str):
+            gray = ImageProcessor.template_cache.get(src_img, lambda gray: ([], None), 'gray').gray
+        else:
+            gray = ImageProcessor.read_image(src_img, cv2.IMREAD_GRAYSCALE)
+        profiles = ImageProcessor.resolution_profiles
+        if resolution is None or not profiles.enabled:
+            return gray
+        return profiles.scaled_template(ImageProcessor._template_key(src_img), gray, resolution)
+
+    @staticmethod
+    def find_template(src_img: ImageInput, back_img: ImageInput, threshold: float = 0.8,
+                      scales: Tuple[float, ...] = (1.0,), use_location: bool = True,
+                      roi: RoiSpec = None) -> Optional[Match]:
+        """使用金字塔粗到精模板匹配查找得分最高的目标位置，不显示任何窗口
+
+        use_location 为 True 时先在 location_store 记录的上次位置校验模板(只计算模板大小的区域)，
+        未命中再在上次位置附近搜索，仍未命中才全图搜索，找到后更新记录。
+
+        Args:
+            src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+            back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
+            threshold: 匹配得分阈值
+            scales: 模板缩放比例列表，用于适配不同设备分辨率
+            use_location: 是否使用并更新模板的位置记录
+            roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表；记录的位置不在搜索区域内时不使用
+
+        Returns:
+            (x, y, w, h, score)，坐标为原图坐标，未找到时返回 None
+        """
+        scene = Frame.of(back_img)
+        store = key = None
+        if use_location:
+            try:
+                store = ImageProcessor.location_store
+                key = store.key(ImageProcessor._template_key(src_img), scene.size)
+                box = store.get(key)
+                bounds = None
+                if box is not None and roi is not None:
+                    # 校验和附近搜索都限定在包含记录框的搜索区域内
+                    bounds = next((rect for rect in normalize_roi(roi, scene.size)
+                                   if rect[0] <= box[0] and rect[1] <= box[1] and box[0] + box[2] <= rect[0] + rect[2]
+                                   and box[1] + box[3] <= rect[1] + rect[3]), None)
+                    if bounds is None:
+                        box = None
+                if box is not None:
+                    template = ImageProcessor._template_gray(src_img, scene.size)
+                    x, y, score = store.verify(scene.gray, template, box, bounds)
+                    if score >= threshold:
+                        store.record(key, (x, y) + box[2:], 'hits')
+                        logger.debug(f"记录位置命中: src={_describe(src_img)}, 得分={score:.3f}")
+                        return x, y, box[2], box[3], score
+                    match = store.search_near(scene.gray, template, box, threshold, scales, bounds)
+                    if match is not None:
+                        store.record(key, match[:4], 'roi_hits')
+                        logger.debug(f"记录位置附近命中: src={_describe(src_img)}, 位置={match[:4]}")
+                        return match
+            except Exception as e:
+                logger.debug(f"位置记录校验失败: {e}")
+
+        matches = ImageProcessor.find_all_templates(src_img, scene, threshold, scales, max_results=1, roi=roi)
+        match = None
+        if len(matches):
+            x, y, w, h, score = matches[0].tolist()
+            match = int(x), int(y), int(w), int(h), score
+        if store is not None and key is not None:
+            store.record(key, match and match[:4], 'misses')
+        return match
+
+    @staticmethod
+    def find_all_templates(src_img: ImageInput, back_img: ImageInput, threshold: float = 0.8,
+                           scales: Tuple[float, ...] = (1.0,), max_results: Optional[int] = None,
+                           roi: RoiSpec = None) -> np.ndarray:
+        """使用金字塔粗到精模板匹配查找所有目标位置，不显示任何窗口
+
+        重复出现的图标(列表项、背包格子等)经峰值检测和非极大值抑制后每个实例只保留一个结果。
+
+        Args:
+            src_img: 目标图像，路径、ndarray、图像字节、PIL图像或 Frame
+            back_img: 背景图像，路径、ndarray、图像字节、PIL图像或 Frame
+            threshold: 匹配得分阈值
+            scales: 模板缩放比例列表，用于适配不同设备分辨率
+            max_results: 最多返回的匹配数，None 表示不限制
+            roi: 搜索区域，(x, y, w, h)、四角坐标或它们的列表，None 时搜索整幅图像
+
+        Returns:
+            (N, 5) float32 数组，每行为 (x, y, w, h, score)，坐标为原图坐标，按得分降序排列；失败时返回空数组
+        """
+        try:
+            # 模板登记了截取分辨率时按背景分辨率缩放
+            source = ImageProcessor._template_gray(src_img)
+            template = ImageProcessor._template_gray(src_img, Frame.of(back_img).size)
+            # Frame 形式的模板(包括模板包中的模板)复用其金字塔，缩放后的模板除外
+            template_pyramid = src_img.pyramid if isinstance(src_img, Frame) and template is source else None
+            found = []
+            for region, offset in ImageProcessor._regions(back_img, roi):
+                region_matches = match_template(region.gray, template, threshold, scales, max_results,
+                                                scene_pyramid=region.pyramid, template_pyramid=template_pyramid)
+                region_matches[:, :2] += offset
+                found.append(region_matches)
+            # 多个搜索区域可能重叠，合并后再做一次非极大值抑制
+            matches = found[0] if len(found) == 1 else non_max_suppression(np.concatenate(found), 0.3, max_results)
+            logger.debug(f"模板匹配: src={_describe(src_img)}, 匹配数={len(matches)}")
+            return matches
+        except Exception as e:
+            logger.debug(f"模板匹配失败: {e}")
+            return empty_matches()
+
+    @staticmethod
+    def find_template_centers(src_img: ImageInput, back_img: ImageInput, threshold: float = 0.8,
+                              scales: Tuple[float, ...] = (1.0,), roi: RoiSpec = None) -> np.ndarray:
+        """查找所有目标实例的中心点，用于计数或逐个点击
+
+        Returns:
+            (N, 2) int32 数组，每行为 (x, y)，按匹配得分降序排列
+        """
+        matches = ImageProcessor.find_all_templates(src_img, back_img, threshold, scales, roi=roi)
+        return (matches[:, :2] + matches[:, 2:4] / 2).astype(np.int32)
 
     @staticmethod
     def save_target_capture(src_img, back_img, name='target'):
@@ -372,14 +835,15 @@ class ImageProcessor:
             return ""
 
     @staticmethod
-    def compare_image_v3(source_image_path, back_image_path, show=False):
+    def compare_image_v3(source_image_path, back_image_path, show=False, backend=None):
         """
            检查给定的源图像与从背景图像中提取的目标图像是否相似。v2版本更加严格。
 
            参数:
-               source_image_path (str): 源图像的文件路径。
-               back_image_path (str): 背景图像的文件路径，从中将提取目标图像。
+               source_image_path (str | bytes | np.ndarray | PIL.Image | Frame): 源图像。
+               back_image_path (str | bytes | np.ndarray | PIL.Image | Frame): 背景图像，从中将提取目标图像。
                show (bool, optional): 是否显示源图像和目标图像。默认为 False。
+               backend (str | FeatureBackend, optional): 特征后端，默认使用 ImageProcessor.default_backend。
 
            返回:
                bool: 如果源图像和目标图像之间的相似度满足条件则返回 True，否则返回 False。
@@ -389,27 +853,21 @@ class ImageProcessor:
                Exception: 当发生其他错误时抛出。
            """
         try:
-            # 读取源图像和目标图像
-            source_image = cv2.imread(source_image_path)
-            target_image = ImageProcessor.capture_target_image_v1(source_image_path,
-                                                   back_image_path)
+            # 源图像和背景图像各解码一次，派生视图缓存在 Frame 中
+            source = Frame.of(source_image_path)
+            back = Frame.of(back_image_path)
+            source_image = source.bgr
+            # 路径形式的模板保留路径，以便命中模板特征缓存
+            template = source_image_path if isinstance(source_image_path, str) else source
+            target_image = ImageProcessor.capture_target_image_v1(template, back, backend=backend)
 
             if source_image is None or target_image is None:
                 raise ValueError("无法读取指定路径的图像")
+            target = Frame(target_image)
 
-            # 计算并归一化单通道直方图
-            source_hist = cv2.calcHist([source_image], [0], None, [256], [0, 256])
-            target_hist = cv2.calcHist([target_image], [0], None, [256], [0, 256])
-            cv2.normalize(source_hist,
-                          source_hist,
-                          alpha=0,
-                          beta=1,
-                          norm_type=cv2.NORM_MINMAX)
-            cv2.normalize(target_hist,
-                          target_hist,
-                          alpha=0,
-                          beta=1,
-                          norm_type=cv2.NORM_MINMAX)
+            # 计算并归一化单通道直方图，源图像的直方图缓存在 Frame 中，归一化到新数组
+            source_hist = cv2.normalize(source.hist(0), None, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
+            target_hist = cv2.normalize(target.hist(0), None, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
 
             # 使用 OpenCV 内置的比较直方图函数
             single_channel_similarity = cv2.compareHist(source_hist, target_hist,
@@ -417,14 +875,11 @@ class ImageProcessor:
 
             # 计算多通道直方图相似度
             resized_size = (256, 256)
-            source_resized = cv2.resize(source_image, resized_size)
-            target_resized = cv2.resize(target_image, resized_size)
             multi_channel_similarity = sum(
                 cv2.compareHist(
-                    cv2.calcHist([s_channel], [0], None, [256], [0, 256]),
-                    cv2.calcHist([t_channel], [0], None, [256], [0, 256]),
-                    cv2.HISTCMP_CORREL) for s_channel, t_channel in zip(
-                        cv2.split(source_resized), cv2.split(target_resized))) / 3
+                    source.hist(channel, size=resized_size),
+                    target.hist(channel, size=resized_size),
+                    cv2.HISTCMP_CORREL) for channel in range(3)) / 3
 
             # 显示图片
             if show:
@@ -444,51 +899,63 @@ class ImageProcessor:
             return False
 
     @staticmethod
-    def compare_image_colors(image_path1: str, image_path2: str, color: List[List[int]], threshold: float) -> bool:
+    def rank_similar(image: ImageInput, references: Union[SimilarityComparator, Dict[str, ImageInput], List[ImageInput]],
+                     roi: RoiSpec = None) -> np.ndarray:
+        """将一张图像与多张参考图批量比较，按相似度排序
+
+        需要反复判断截图属于哪种参考状态时，应创建一次 SimilarityComparator 并重复传入，
+        参考图的直方图、缩略图和 SSIM 统计量只计算一次。
+
+        Args:
+            image: 候选图像，路径、ndarray、图像字节、PIL图像或 Frame
+            references: SimilarityComparator，或参考图列表/字典(每次调用临时创建比较器)
+            roi: 只比较候选图像中的该区域，多个区域时取其外接矩形
+
+        Returns:
+            (N, 5) float32 数组，每行为 (参考图下标, 综合得分, 直方图, NCC, SSIM)，按综合得分降序排列；
+            出错时返回空数组
+        """
+        try:
+            comparator = references if isinstance(references, SimilarityComparator) else SimilarityComparator(references)
+            frame = Frame.of(image)
+            if roi is not None:
+                rects = normalize_roi(roi, frame.size)
+                if not rects:
+                    raise ValueError(f"搜索区域无效: {roi}")
+                x0, y0 = min(r[0] for r in rects), min(r[1] for r in rects)
+                x1, y1 = max(r[0] + r[2] for r in rects), max(r[1] + r[3] for r in rects)
+                frame = frame.crop((x0, y0, x1 - x0, y1 - y0))
+            result = comparator.compare(frame)
+            logger.debug(f"最相似的参考图: {comparator.names[int(result[0, 0])]}, 得分={result[0, 1]:.3f}")
+            return result
+        except Exception as e:
+            logger.debug(f"相似度比较失败: {e}")
+            return np.empty((0, 5), dtype=np.float32)
+
+    @staticmethod
+    def compare_image_colors(image_path1: ImageInput, image_path2: ImageInput, color: List[List[int]], threshold: float) -> bool:
         """比较两张图片中指定颜色区域的相似度
         
         Args:
-            image_path1: 第一张图片路径
-            image_path2: 第二张图片路径  
+            image_path1: 第一张图片，路径、ndarray、图像字节、PIL图像或 Frame
+            image_path2: 第二张图片，路径、ndarray、图像字节、PIL图像或 Frame
             color: HSV颜色范围
             threshold: 相似度阈值
             
         Returns:
             如果相似度大于阈值返回True,否则返回False
         """
-        def process_image(image_path: str, color: List[List[int]], kernel: np.ndarray) -> float:
-            try:
-                image = cv2.imread(image_path)
-                if image is None:
-                    raise ValueError(f"无法读取图片: {image_path}")
-                
-                logger.debug(f"处理图片: {image_path}")
-                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-                lower = np.array(color[0])
-                upper = np.array(color[1])
-                mask = cv2.inRange(hsv, lower, upper)
-                blurred_mask = cv2.GaussianBlur(mask, (5, 5), 0)
-                opening = cv2.morphologyEx(blurred_mask, cv2.MORPH_OPEN, kernel)
-                closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel)
-                contours, _ = cv2.findContours(closing, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-                
-                if not contours:
-                    logger.debug("未找到轮廓")
-                    return 0
-                    
-                area = cv2.contourArea(max(contours, key=cv2.contourArea))
-                logger.debug(f"计算区域面积: {area}")
-                return area
-                
-            except Exception as e:
-                logger.debug(f"图片处理失败: {e}")
-                raise
+        def process_image(image_path: ImageInput) -> float:
+            logger.debug(f"处理图片: {_describe(image_path)}")
+            area = analyzer.analyze(image_path, blobs=True)[0].blob_area
+            logger.debug(f"计算区域面积: {area}")
+            return area
 
         try:
             logger.debug("开始比较图片颜色")
-            kernel = np.ones((5, 5), np.uint8)
-            area1 = process_image(image_path1, color, kernel)
-            area2 = process_image(image_path2, color, kernel)
+            analyzer = get_analyzer([color])
+            area1 = process_image(image_path1)
+            area2 = process_image(image_path2)
             
             area_diff = abs(area1 - area2)
             max_area = max(area1, area2)
@@ -506,57 +973,80 @@ class ImageProcessor:
         """
         判断图片的主要颜色是否在给定的颜色范围内。
 
-        :param image_path: 图片文件路径
+        :param image_path: 图片，路径、ndarray、图像字节、PIL图像或 Frame
         :param color_range: 颜色范围，格式为 [[H_min, S_min, V_min], [H_max, S_max, V_max]]
         :return: 如果主要颜色在范围内返回 True，否则返回 False
+        :raises ValueError: 图片无法读取时抛出
         """
-        # 读取图片
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError("无法读取图片，请检查路径是否正确")
-
-        # 将图片从 BGR 转换为 HSV
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-        # 定义颜色范围
-        lower_bound = np.array(color_range[0])
-        upper_bound = np.array(color_range[1])
-
-        # 创建掩码
-        mask = cv2.inRange(hsv_image, lower_bound, upper_bound)
-
-        # 计算掩码中的像素数
-        total_pixels = image.shape[0] * image.shape[1]
-        masked_pixels = cv2.countNonZero(mask)
-        print(f'颜色占比:{masked_pixels / total_pixels}')
+        # 查找表一次遍历得到掩码，Frame 输入时复用已缓存的 HSV 图
+        try:
+            ratio = get_analyzer([color_range]).analyze(image_path)[0].ratio
+        except FileNotFoundError as e:
+            # 与原实现一致，无法读取的图片统一抛出 ValueError
+            raise ValueError("无法读取图片，请检查路径是否正确") from e
+        print(f'颜色占比:{ratio}')
         # 判断主要颜色是否在范围内
-        if masked_pixels / total_pixels > rate:
+        if ratio > rate:
             return True
         else:
             return False
 
+    @staticmethod
+    def analyze_colors(image_input: ImageInput, color_ranges: Union[Dict[str, List[List[int]]], List[List[List[int]]]],
+                       step: int = 1, blobs: bool = False, wrap_hue: bool = False) -> Dict:
+        """一次遍历统计多个HSV颜色范围的占比和最大色块面积
+
+        多个状态指示颜色需要同时判断时，用它代替多次调用 colors_exists。
+
+        Args:
+            image_input: 图片，路径、ndarray、图像字节、PIL图像或 Frame
+            color_ranges: {名称: 颜色范围} 或颜色范围列表，每个范围格式为 [[H_min, S_min, V_min], [H_max, S_max, V_max]]
+            step: 抽样步长，大于 1 时在抽样后的图像上统计，速度更快
+            blobs: 是否同时计算去噪后的最大色块面积
+            wrap_hue: H_min 大于 H_max 时是否按跨越 0 度的色相区间(如红色 [170, 10])统计，
+                默认与 cv2.inRange 一致，此类范围不匹配任何像素
+
+        Returns:
+            {名称: ColorStats(ratio, pixels, blob_area)}，列表输入时以下标作为名称
+        """
+        return get_analyzer(color_ranges, wrap_hue).analyze(image_input, step, blobs)
+
+    @staticmethod
+    def region_query(image_input: ImageInput, color_ranges: Union[Dict[str, List[List[int]]], List[List[List[int]]], None] = None,
+                     step: int = 1, wrap_hue: bool = False) -> RegionQuery:
+        """创建区域查询对象，用于同一帧上大量矩形区域的颜色占比和亮度检查
+
+        颜色掩码和灰度图的积分图在首次查询时计算并缓存在 Frame 上，之后每个区域的查询为常数时间。
+
+        Args:
+            image_input: 图片，路径、ndarray、图像字节、PIL图像或 Frame
+            color_ranges: {名称: 颜色范围} 或颜色范围列表，None 时只查询亮度
+            step: 颜色掩码的抽样步长
+            wrap_hue: H_min 大于 H_max 时是否按跨越 0 度的色相区间处理
+
+        Returns:
+            RegionQuery，如 query.color_ratio('lit', (x, y, w, h))、query.brightness((x, y, w, h))
+        """
+        return RegionQuery(Frame.of(image_input), color_ranges, step, wrap_hue)
+
     @staticmethod
     def crop_image_by_corners(image_input, corners):
         """
         根据四角坐标裁剪图片。
 
         参数:
-            image_input (str or numpy.ndarray): 图片文件路径或已加载的OpenCV图像。
+            image_input (str | bytes | numpy.ndarray | PIL.Image | Frame): 图片文件路径、已加载的OpenCV图像、图像字节、PIL图像或 Frame。
             corners (list of tuples): 四个角的坐标 [(x1, y1), (x2, y2), (x3, y3), (x4, x4)]。
 
         返回:
-            numpy.ndarray: 裁剪后的图片。
+            numpy.ndarray: 裁剪后的图片，输入为ndarray时返回其视图。
         """
         try:
-            # 检查输入是文件路径还是已加载的图像
-            if isinstance(image_input, str):
-                img = cv2.imread(image_input)
-                if img is None:
-                    raise ValueError("无法读取图片，请检查路径是否正确")
-            elif isinstance(image_input, np.ndarray):
+            # ndarray 原样裁剪(保留通道数)，其它输入先解码
+            if isinstance(image_input, np.ndarray):
                 img = image_input
             else:
-                raise TypeError("image_input 必须是字符串路径或numpy.ndarray类型的图像")
+                img = ImageProcessor.read_image(image_input)
 
             # 获取四角坐标
             x1, y1 = corners[0]
@@ -599,7 +1089,7 @@ if __name__ == '__main__':
     # -----------------------------------------------------------------
     # capture_target_image_v1(src, back,1)
     # -----------------------------------------------------------------
-    # xy =process_images(dir, back, 'center',1)
+    # xy = ImageProcessor.process_images(dir, back, 'center')
     # print(xy)
     # -----------------------------------------------------------------
     # color=[[0, 71, 78],[39, 255, 255]]
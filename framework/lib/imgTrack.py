@@ -0,0 +1,182 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .imgFrame import Frame, ImageInput
+from .imgTool import BackendSpec, ImageProcessor
+
+
+def _template_corners(width: int, height: int) -> np.ndarray:
+    """模板四角坐标，顺序与 ImageProcessor._match_template 一致"""
+    return np.float32([[0, 0], [0, height - 1], [width - 1, height - 1], [width - 1, 0]]).reshape(-1, 1, 2)
+
+
+class TemplateTracker:
+    """逐帧跟踪已定位的模板
+
+    首帧用 ImageProcessor.load_and_process_images 做完整的特征匹配，之后每帧:
+    1. 用金字塔 LK 光流跟踪上一帧目标区域内的角点，前后向误差过大的点丢弃；
+    2. 由跟踪成功的点估计相似变换，更新模板到当前帧的单应性矩阵；
+    3. 按新的单应性矩阵把当前帧中的目标区域反投影回模板坐标系，与模板做一次 NCC 校验。
+    光流点不足或 NCC 低于阈值时才退回完整的特征匹配，目标基本不动或平移时每帧只需
+    计算模板大小范围内的光流和一次模板大小的相关系数。
+    """
+
+    def __init__(self, template: ImageInput, backend: BackendSpec = None, ncc_threshold: float = 0.8,
+                 min_points: int = 6, max_points: int = 100, fb_error: float = 1.0,
+                 win_size: int = 21, max_level: int = 3):
+        """
+        Args:
+            template: 模板图像
+            backend: 重新检测时使用的特征后端
+            ncc_threshold: 跟踪结果的最低归一化相关系数，低于该值时重新检测
+            min_points: 估计运动所需的最少光流点数
+            max_points: 目标区域内最多跟踪的角点数
+            fb_error: 前后向光流误差上限(像素)
+            win_size: LK 光流窗口大小
+            max_level: LK 光流金字塔层数
+        """
+        self.template = template
+        self.template_gray = ImageProcessor.read_image(template, cv2.IMREAD_GRAYSCALE)
+        self.backend = backend
+        self.ncc_threshold = ncc_threshold
+        self.min_points = min_points
+        self.max_points = max_points
+        self.fb_error = fb_error
+        self.lk_params = dict(winSize=(win_size, win_size), maxLevel=max_level,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.homography: Optional[np.ndarray] = None
+        self.score = 0.0
+        self._prev_gray: Optional[np.ndarray] = None
+        self._points: Optional[np.ndarray] = None
+        # 统计: 跟踪成功、重新检测成功、丢失的帧数
+        self.tracked = 0
+        self.redetected = 0
+        self.lost = 0
+
+    @property
+    def corners(self) -> Optional[np.ndarray]:
+        """模板四角在最近一帧中的位置 (4, 1, 2)，未定位时为 None"""
+        if self.homography is None:
+            return None
+        h, w = self.template_gray.shape[:2]
+        return cv2.perspectiveTransform(_template_corners(w, h), self.homography)
+
+    @property
+    def center(self) -> Optional[tuple]:
+        """目标在最近一帧中的中心点 (x, y)"""
+        corners = self.corners
+        if corners is None:
+            return None
+        x, y, w, h = cv2.boundingRect(corners)
+        return int(x + w / 2), int(y + h / 2)
+
+    def reset(self) -> None:
+        """丢弃跟踪状态，下一帧重新做完整检测"""
+        self.homography = None
+        self._prev_gray = None
+        self._points = None
+
+    def update(self, image: ImageInput) -> Optional[np.ndarray]:
+        """在新的一帧中更新目标位置
+
+        Args:
+            image: 当前帧，传入 Frame 时重新检测可复用其特征缓存
+
+        Returns:
+            模板四角坐标 (4, 1, 2)，目标丢失时返回 None
+        """
+        frame = Frame.of(image)
+        gray = frame.gray
+        if self.homography is not None and self._track(gray):
+            self.tracked += 1
+        elif self._detect(frame):
+            self.redetected += 1
+        else:
+            self.lost += 1
+            self.reset()
+            return None
+        self._prev_gray = gray
+        self._points = self._select_points(gray)
+        return self.corners
+
+    def _detect(self, frame: Frame) -> bool:
+        """完整的特征匹配"""
+        try:
+            _, _, dst = ImageProcessor.load_and_process_images(self.template, frame, self.backend)
+        except Exception as e:
+            logger.debug(f"重新检测失败: {e}")
+            return False
+        h, w = self.template_gray.shape[:2]
+        homography = cv2.getPerspectiveTransform(_template_corners(w, h), np.float32(dst))
+        score = self._verify(frame.gray, homography)
+        if score < self.ncc_threshold:
+            logger.debug(f"重新检测结果校验失败: NCC={score:.3f}")
+            return False
+        self.homography, self.score = homography, score
+        logger.debug(f"重新检测成功: NCC={score:.3f}")
+        return True
+
+    def _region(self, shape, margin: int):
+        """上一帧目标外接矩形向外扩展 margin 后与图像的交集 (x0, y0, x1, y1)"""
+        x, y, w, h = cv2.boundingRect(np.int32(self.corners.reshape(-1, 2)))
+        x0, y0 = max(0, x - margin), max(0, y - margin)
+        x1, y1 = min(shape[1], x + w + margin), min(shape[0], y + h + margin)
+        return x0, y0, x1, y1
+
+    def _track(self, gray: np.ndarray) -> bool:
+        """用光流估计目标运动并校验"""
+        if self._points is None or len(self._points) < self.min_points:
+            return False
+        # 光流只在目标附近的区域内计算，避免为整帧构建金字塔
+        th, tw = self.template_gray.shape[:2]
+        x0, y0, x1, y1 = self._region(gray.shape, max(th, tw) // 2 + self.lk_params['winSize'][0])
+        if x1 <= x0 or y1 <= y0:
+            return False
+        prev, curr = self._prev_gray[y0:y1, x0:x1], gray[y0:y1, x0:x1]
+        start = self._points - np.float32([x0, y0])
+        points, status, _ = cv2.calcOpticalFlowPyrLK(prev, curr, start, None, **self.lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(curr, prev, points, None, **self.lk_params)
+        points += np.float32([x0, y0])
+        error = np.linalg.norm((back - start).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.fb_error)
+        if good.sum() < self.min_points:
+            logger.debug(f"光流跟踪点不足: {int(good.sum())}")
+            return False
+
+        motion, inliers = cv2.estimateAffinePartial2D(self._points[good], points[good], method=cv2.RANSAC,
+                                                      ransacReprojThreshold=3.0)
+        if motion is None or inliers.sum() < self.min_points:
+            logger.debug("无法估计目标运动")
+            return False
+        homography = np.vstack([motion, [0, 0, 1]]) @ self.homography
+        score = self._verify(gray, homography)
+        if score < self.ncc_threshold:
+            logger.debug(f"跟踪结果校验失败: NCC={score:.3f}")
+            return False
+        self.homography, self.score = homography, score
+        return True
+
+    def _verify(self, gray: np.ndarray, homography: np.ndarray) -> float:
+        """把当前帧中的目标区域反投影到模板坐标系，计算与模板的归一化相关系数"""
+        h, w = self.template_gray.shape[:2]
+        warped = cv2.warpPerspective(gray, homography, (w, h), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP)
+        if float(warped.std()) == 0.0 or float(self.template_gray.std()) == 0.0:
+            return 0.0
+        return float(cv2.matchTemplate(warped, self.template_gray, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+    def _select_points(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """在当前目标区域内选取用于光流跟踪的角点"""
+        x0, y0, x1, y1 = self._region(gray.shape, 0)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillConvexPoly(mask, np.int32(self.corners.reshape(-1, 2) - [x0, y0]), 255)
+        points = cv2.goodFeaturesToTrack(gray[y0:y1, x0:x1], self.max_points, 0.01, 5, mask=mask)
+        return None if points is None else points + np.float32([x0, y0])
+
+    def __repr__(self) -> str:
+        return (f"TemplateTracker(tracked={self.tracked}, redetected={self.redetected}, "
+                f"lost={self.lost}, score={self.score:.3f})")
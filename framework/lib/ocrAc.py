@@ -1,5 +1,9 @@
-from typing import List, Set, Tuple, Optional, Union
+from typing import Dict, Iterable, List, Set, Tuple, Optional, Union
+import numpy as np
+from PIL import Image
 from loguru import logger
+from .imgChange import FrameChange
+from .imgFrame import Frame, ImageInput, RoiSpec, describe_image, normalize_roi
 from .imgTool import ImageProcessor
 from .paddlTool import PaddleOCRTool
 
@@ -14,16 +18,18 @@ class OcrActions:
     - 批量文本提取和匹配
     """
 
-    def __init__(self, region_of_interest: Optional[List[List[int]]] = None):
+    def __init__(self, region_of_interest: Optional[List[List[int]]] = None, **ocr_config):
         """
         初始化OCR操作对象
         
         Args:
             region_of_interest: 感兴趣区域的坐标点列表，格式为[[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
+            ocr_config: 传给 PaddleOCRTool 的模型配置或 service=OcrService，相同配置的 OcrActions 共用一个引擎
         """
         self.region_of_interest = region_of_interest
         self.image_processor = ImageProcessor()
-        self.paddle_ocr = PaddleOCRTool()  # 初始化 PaddleOCR 工具类实例
+        # 不加载模型，引擎在首次识别时加载并在进程内共享
+        self.paddle_ocr = PaddleOCRTool(**ocr_config)
 
     def set_region_of_interest(self, point):
         """
@@ -34,15 +40,27 @@ class OcrActions:
         """
         self.region_of_interest = point
 
-    def _crop_image(self, image_input: Union[str, bytes]) -> Union[str, bytes]:
+    def region_changed(self, change: FrameChange) -> bool:
         """
-        根据ROI裁剪图像
+        检查感兴趣区域内的画面是否发生变化，未变化时可跳过OCR并沿用上一次的结果
         
         Args:
-            image_input: 输入图像路径或图像字节数据
+            change: ChangeDetector.update 返回的帧差异
             
         Returns:
-            裁剪后的图像数据
+            bool: ROI(未设置时为整幅图像)与变化区域是否相交
+        """
+        return change.intersects(self.region_of_interest)
+
+    def _crop_image(self, image_input: ImageInput) -> ImageInput:
+        """
+        根据ROI裁剪图像，图像只解码一次，裁剪结果是解码后数组的视图
+        
+        Args:
+            image_input: 图像路径、图像字节、np.ndarray、PIL图像或 Frame
+            
+        Returns:
+            裁剪后的图像数据，未设置ROI时原样返回
         """
         try:
             if self.region_of_interest:
@@ -52,18 +70,23 @@ class OcrActions:
             logger.error(f"图像裁剪失败: {e}")
             return image_input
 
-    def _validate_input(self, image_input: Union[str, bytes], text: Union[str, List[str]]) -> bool:
+    @staticmethod
+    def _is_image_input(image_input) -> bool:
+        """是否为支持的图像输入类型"""
+        return isinstance(image_input, (str, bytes, bytearray, np.ndarray, Image.Image, Frame))
+
+    def _validate_input(self, image_input: ImageInput, text: Union[str, List[str]]) -> bool:
         """
         验证输入参数的有效性
         
         Args:
-            image_input: 输入图像
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像(如窗口截图)或 Frame
             text: 待搜索的文本或文本列表
             
         Returns:
             bool: 输入是否有效
         """
-        if not isinstance(image_input, (str, bytes)):
+        if not self._is_image_input(image_input):
             logger.error(f"无效的图像输入类型: {type(image_input)}")
             return False
             
@@ -73,12 +96,12 @@ class OcrActions:
             return all(isinstance(t, str) for t in text)
         return False
 
-    def ocr_search_text(self, image_input: Union[str, bytes], search_text: str) -> Optional[Tuple]:
+    def ocr_search_text(self, image_input: ImageInput, search_text: str) -> Optional[Tuple]:
         """
         在图像中搜索指定文本
         
         Args:
-            image_input: 输入图像
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像(如窗口截图)或 Frame
             search_text: 要搜索的文本
             
         Returns:
@@ -91,20 +114,20 @@ class OcrActions:
             cropped_image = self._crop_image(image_input)
             return self.paddle_ocr.filter_and_select_text(cropped_image, search_text)
         except Exception as e:
-            logger.error(f"OCR搜索文本失败: {e}, 图像: {image_input}, 搜索文本: {search_text}")
+            logger.error(f"OCR搜索文本失败: {e}, 图像: {describe_image(image_input)}, 搜索文本: {search_text}")
             return None
 
-    def ocr_extract_all_text(self, image_input: Union[str, bytes]) -> List[Tuple]:
+    def ocr_extract_all_text(self, image_input: ImageInput) -> List[Tuple]:
         """
         提取图像中的所有文本
         
         Args:
-            image_input: 输入图像
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像(如窗口截图)或 Frame
             
         Returns:
             List[Tuple]: 识别到的所有文本信息列表
         """
-        if not isinstance(image_input, (str, bytes)):
+        if not self._is_image_input(image_input):
             logger.error(f"无效的图像输入类型: {type(image_input)}")
             return []
             
@@ -112,15 +135,15 @@ class OcrActions:
             cropped_image = self._crop_image(image_input)
             return self.paddle_ocr.filter_ocr_results(cropped_image)
         except Exception as e:
-            logger.error(f"提取所有文本失败: {e}, 图像: {image_input}")
+            logger.error(f"提取所有文本失败: {e}, 图像: {describe_image(image_input)}")
             return []
 
-    def contains_all_texts(self, image_input: Union[str, bytes], texts_to_find: List[str]) -> bool:
+    def contains_all_texts(self, image_input: ImageInput, texts_to_find: List[str]) -> bool:
         """
         检查图像是否包含所有指定文本
         
         Args:
-            image_input: 输入图像
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像(如窗口截图)或 Frame
             texts_to_find: 要查找的文本列表
             
         Returns:
@@ -142,15 +165,64 @@ class OcrActions:
                         
             return found_texts == set(texts_to_find)
         except Exception as e:
-            logger.error(f"文本匹配失败: {e}, 图像: {image_input}, 待查找文本: {texts_to_find}")
+            logger.error(f"文本匹配失败: {e}, 图像: {describe_image(image_input)}, 待查找文本: {texts_to_find}")
             return False
 
-    def ocr_is_text_present(self, image_input: Union[str, bytes], search_text: str) -> bool:
+    def read_fields(self, image_input: ImageInput, fields: Dict[str, RoiSpec],
+                    multiline: Iterable[str] = ()) -> Dict[str, Tuple[str, float]]:
+        """
+        一次读取多个固定区域(字段)的文本
+        
+        单行字段跳过文本检测，所有字段的裁剪图合并为一次批量识别；multiline 中的字段按完整的
+        检测+识别流程处理，多行文本按阅读顺序以空格连接，置信度取各行的最小值。图像只解码一次，
+        各字段的裁剪图都是其视图。
+        
+        Args:
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像或 Frame
+            fields: {字段名: 区域}，区域为 (x, y, w, h) 或四角坐标 [[x1,y1], ..., [x4,y4]]
+            multiline: 需要文本检测的字段名(多行或位置不固定的文本)
+            
+        Returns:
+            Dict[str, Tuple[str, float]]: {字段名: (文本, 置信度)}，区域无效或未识别到文本时为 ('', 0.0)
+        """
+        if not self._is_image_input(image_input):
+            logger.error(f"无效的图像输入类型: {type(image_input)}")
+            return {}
+            
+        try:
+            image = ImageProcessor.read_image(image_input)
+            size = (image.shape[1], image.shape[0])
+            results = {name: ('', 0.0) for name in fields}
+            crops = {}
+            for name, roi in fields.items():
+                rects = normalize_roi(roi, size)
+                if not rects:
+                    logger.debug(f"字段区域无效: {name}, {roi}")
+                    continue
+                x0, y0 = min(r[0] for r in rects), min(r[1] for r in rects)
+                x1, y1 = max(r[0] + r[2] for r in rects), max(r[1] + r[3] for r in rects)
+                crops[name] = image[y0:y1, x0:x1]
+                
+            multiline = set(multiline)
+            single = [name for name in crops if name not in multiline]
+            results.update(zip(single, self.paddle_ocr.recognize_lines([crops[name] for name in single])))
+            for name in multiline & crops.keys():
+                items = self.paddle_ocr.filter_ocr_results(crops[name], confidence_threshold=0.0)
+                # PaddleOCR 返回的文本框已按从上到下、从左到右排序
+                if items:
+                    results[name] = (' '.join(item[1][0] for item in items), min(item[1][1] for item in items))
+            logger.debug(f"读取字段完成: 单行={len(single)}, 多行={len(multiline & crops.keys())}")
+            return results
+        except Exception as e:
+            logger.error(f"读取字段失败: {e}, 图像: {describe_image(image_input)}")
+            return {}
+
+    def ocr_is_text_present(self, image_input: ImageInput, search_text: str) -> bool:
         """
         检查指定文本是否存在于图像中
         
         Args:
-            image_input: 输入图像
+            image_input: 输入图像，路径、图像字节、np.ndarray(BGR)、PIL图像(如窗口截图)或 Frame
             search_text: 要查找的文本
             
         Returns:
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from .imgFrame import Frame, ImageInput
+from .imgHash import ahash, hamming
+
+
+def content_digest(image_input: ImageInput) -> str:
+    """图像内容的哈希
+
+    ndarray、PIL 图像和 Frame 按像素内容(含形状)计算，裁剪后的视图与相同像素的独立数组得到相同结果；
+    文件路径和编码后的字节按文件内容计算，不需要解码。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image_input, Frame):
+        image_input = image_input.bgr
+    if isinstance(image_input, Image.Image):
+        image_input = np.asarray(image_input)
+    if isinstance(image_input, np.ndarray):
+        digest.update(f"{image_input.shape}{image_input.dtype}".encode())
+        digest.update(np.ascontiguousarray(image_input).data)
+    elif isinstance(image_input, str):
+        with open(image_input, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    elif isinstance(image_input, (bytes, bytearray, memoryview)):
+        digest.update(image_input)
+    else:
+        raise TypeError(f"不支持的图像输入类型: {type(image_input)}")
+    return digest.hexdigest()
+
+
+def _plain(result) -> list:
+    """将 OCR 结果转换为只含列表、字符串和浮点数的结构，便于保存为 JSON"""
+    return [[[[float(v) for v in point] for point in box], [str(text), float(score)]]
+            for box, (text, score) in result]
+
+
+def _restore(entries) -> list:
+    """将保存的结果还原为 PaddleOCR 的结构 [[box, (text, score)], ...]，每次返回新的对象"""
+    return [[[list(point) for point in box], (text, score)] for box, (text, score) in entries]
+
+
+class OcrResultCache:
+    """OCR 结果缓存
+
+    以图像内容哈希和模型配置为键缓存未经置信度筛选的原始识别结果，同一张截图上的多次文本查询只做一次推理，
+    不同的置信度阈值共用同一条缓存。按 LRU 顺序淘汰，可保存为 JSON 文件在下次运行时加载。
+
+    tolerance 不为 None 时启用近似模式: 内容哈希未命中时，用均值哈希查找尺寸相同、
+    汉明距离不超过 tolerance 的缓存条目，让仅有噪声差异(如 JPEG 压缩)的截图复用结果。
+    单个字符的变化只改变少数几位，tolerance 应取很小的值；需要精确结果的场景应保持 tolerance 为 None。
+    """
+
+    def __init__(self, max_entries: int = 128, path: Optional[str] = None,
+                 tolerance: Optional[int] = None, hash_size: int = 32):
+        """
+        Args:
+            max_entries: 最大缓存条目数
+            path: 保存缓存的 JSON 文件路径，None 时只保存在内存中
+            tolerance: 近似模式允许的最大汉明距离，None 表示只按内容精确匹配
+            hash_size: 近似模式的均值哈希边长
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.tolerance = tolerance
+        self.hash_size = hash_size
+        # 键 -> (原始结果, 均值哈希, 图像尺寸)
+        self._entries: "OrderedDict[str, Tuple[list, Optional[int], Optional[Tuple[int, ...]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image_input: ImageInput, settings: Hashable = '') -> str:
+        """缓存键: 模型配置加图像内容哈希"""
+        return f"{settings}|{content_digest(image_input)}"
+
+    def _fingerprint(self, image_input: ImageInput) -> Tuple[int, Tuple[int, ...]]:
+        frame = Frame.of(image_input)
+        return ahash(frame, self.hash_size), frame.gray.shape
+
+    def get(self, key: str, image_input: Optional[ImageInput] = None) -> Optional[list]:
+        """查询缓存，近似模式下需要传入图像用于计算均值哈希
+
+        Returns:
+            原始 OCR 结果，结构与 PaddleOCR 的返回值相同，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _restore(entry[0])
+        if self.tolerance is not None and image_input is not None:
+            value, shape = self._fingerprint(image_input)
+            settings = key.rpartition('|')[0]
+            with self._lock:
+                for other, (result, other_value, other_shape) in self._entries.items():
+                    if other_shape == shape and other_value is not None and other.rpartition('|')[0] == settings \
+                            and hamming(value, other_value) <= self.tolerance:
+                        self._entries.move_to_end(other)
+                        self.near_hits += 1
+                        logger.debug(f"OCR缓存近似命中: 距离={hamming(value, other_value)}")
+                        return _restore(result)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: list, image_input: Optional[ImageInput] = None) -> None:
+        """写入缓存条目，超出 max_entries 时淘汰最久未使用的条目"""
+        value, shape = (None, None)
+        if self.tolerance is not None and image_input is not None:
+            value, shape = self._fingerprint(image_input)
+        with self._lock:
+            self._entries[key] = (_plain(result or []), value, shape)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.near_hits = self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'near_hits': self.near_hits, 'misses': self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """将缓存保存为 JSON 文件"""
+        path = path or self.path
+        if not path:
+            raise ValueError("未指定OCR缓存文件路径")
+        with self._lock:
+            data = [{'key': key, 'result': result, 'hash': None if value is None else f"{value:x}",
+                     'shape': None if shape is None else list(shape)}
+                    for key, (result, value, shape) in self._entries.items()]
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        logger.debug(f"OCR缓存已保存: {path}, 条目数={len(data)}")
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'OcrResultCache':
+        """从 JSON 文件加载缓存，文件不存在或无法读取时返回空缓存"""
+        cache = cls(path=path, **kwargs)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries: List[dict] = json.load(f)
+                for entry in entries[-cache.max_entries:]:
+                    value = None if entry['hash'] is None else int(entry['hash'], 16)
+                    shape = None if entry['shape'] is None else tuple(entry['shape'])
+                    cache._entries[entry['key']] = (entry['result'], value, shape)
+            except (OSError, ValueError, KeyError) as e:
+                logger.debug(f"OCR缓存读取失败: {e}")
+        logger.debug(f"OCR缓存已加载: {path}, 条目数={len(cache)}")
+        return cache
@@ -1,47 +1,128 @@
 import os
 import re
 from PIL import Image
-from paddleocr import PaddleOCR, draw_ocr
 from loguru import logger
+from ..imgFrame import Frame, decode_image, describe_image
+from ..ocrCache import OcrResultCache
+from .ocrEngine import engines, split_rec_result
+
+
+def load_ocr_input(image_input):
+    """
+    将 OCR 输入转换为 PaddleOCR 可直接识别的形式。
+
+    文件路径原样返回，由 PaddleOCR 读取；编码后的字节、PIL 图像(RGB)、Frame 和 ndarray 在内存中解码为
+    BGR 数组，不经过文件系统；ndarray 输入(包括裁剪得到的视图)不复制。
+
+    :param image_input: 文件路径、np.ndarray、编码后的图像字节、PIL图像或 Frame
+    :return: 文件路径或 BGR 图像
+    :raises FileNotFoundError: 当图像文件不存在时抛出
+    """
+    if isinstance(image_input, str):
+        if not os.path.exists(image_input):
+            raise FileNotFoundError(f"图片文件不存在: {image_input}")
+        return image_input
+    if isinstance(image_input, Frame):
+        return image_input.bgr
+    return decode_image(image_input)
+
 
 class PaddleOCRTool:
-    def __init__(self):
+    # OCR 结果缓存，同一画面上的多次文本查询只做一次推理
+    result_cache = OcrResultCache()
+
+    def __init__(self, service=None, **config):
         """
         初始化 PaddleOCR 工具类
+
+        不在此时加载模型: 相同配置的所有实例共用 ocrEngine.engines 中的一个 PaddleOCR 引擎，
+        首次识别时才加载。
+
+        :param service: ocrService.OcrService，指定时推理在服务的工作进程中进行，不在本进程加载模型
+        :param config: 覆盖 ocrEngine.DEFAULT_CONFIG 的 PaddleOCR 参数，如 use_tensorrt=False
+        """
+        self.service = service
+        self.config = service.config if service is not None else engines.config(**config)
+        # 模型配置标识，作为缓存键的一部分，模型变化后旧的缓存结果不会被使用
+        self.settings = engines.key(self.config)
+
+    @property
+    def ocr(self):
+        """共享的 PaddleOCR 引擎，未加载时加载"""
+        return engines.get(self.config)
+
+    def _run(self, image, **kwargs):
+        """执行一次 PaddleOCR.ocr: 使用服务时由工作进程执行，否则在引擎锁内执行，同一引擎上的推理串行执行"""
+        if self.service is not None:
+            return self.service.ocr(image, **kwargs)
+        with engines.session(self.config) as engine:
+            return engine.ocr(image, **kwargs)
+
+    def warm_up(self):
+        """
+        加载模型并预热，在会话开始前调用可避免首次识别时的加载延迟。
+
+        使用服务时不在本进程加载模型，只等待服务的工作进程就绪。
+        """
+        if self.service is not None:
+            self.service.wait_ready()
+            return
+        engines.warm_up(self.config)
+
+    def unload(self):
         """
-        dir = os.path.dirname(__file__)
-        self.ocr = PaddleOCR(
-            lang='ch',
-            rec_char_dict_path=f'{dir}/ppocr_keys_v1.txt',
-            det_model_dir=f'{dir}/ch_PP-OCRv4_det_infer',
-            rec_model_dir=f'{dir}/ch_PP-OCRv4_rec_infer',
-            cls_model_dir=f'{dir}/ch_ppocr_mobile_v2.0_cls_infer',
-            cls=False,
-            use_angle_cls=False,
-            use_tensorrt=True,
-            enable_mkldnn=True,
-            use_mp=True,
-            total_process_num=6
-        )
-        logger.debug("OCR模型加载完成")
-
-    def filter_ocr_results(self, img_path, confidence_threshold=0.8):
+        释放此配置的共享引擎，所有使用相同配置的实例在下次识别时重新加载。
+
+        使用服务时不做任何事，服务由创建它的一方关闭。
+        """
+        if self.service is not None:
+            logger.debug("OCR工具使用服务，模型由服务管理，不释放")
+            return
+        engines.unload(self.config)
+
+    @staticmethod
+    def load_cache(path, **kwargs):
+        """
+        从 JSON 文件加载 OCR 结果缓存并作为 result_cache，之后调用 result_cache.save() 写回同一文件。
+
+        :param path: 缓存文件路径
+        :param kwargs: OcrResultCache 的其他参数，如 max_entries、tolerance
+        :return: OcrResultCache
+        """
+        PaddleOCRTool.result_cache = OcrResultCache.load(path, **kwargs)
+        return PaddleOCRTool.result_cache
+
+    def filter_ocr_results(self, img_path, confidence_threshold=0.8, use_cache=True):
         """
         对给定的图像进行 OCR 识别，并筛选出置信度大于指定阈值的结果。
 
-        :param img_path: 图像文件路径
+        原始识别结果按图像内容缓存，相同画面的重复调用(包括不同的置信度阈值)不再推理。
+
+        :param img_path: 图像文件路径、np.ndarray(BGR)、编码后的图像字节、PIL图像或 Frame
         :param confidence_threshold: 置信度阈值，默认为 0.8
+        :param use_cache: 是否使用 OCR 结果缓存，默认为 True
         :return: 筛选后的结果列表
         """
         try:
-            logger.debug(f"开始OCR识别，图片路径: {img_path}, 置信度阈值: {confidence_threshold}")
+            logger.debug(f"开始OCR识别，图片: {describe_image(img_path)}, 置信度阈值: {confidence_threshold}")
             
-            if not os.path.exists(img_path):
-                logger.error(f"图片文件不存在: {img_path}")
+            try:
+                image = load_ocr_input(img_path)
+            except (FileNotFoundError, ValueError, TypeError) as e:
+                logger.error(str(e))
                 return []
                 
-            result = self.ocr.ocr(img_path)[0]
-            logger.debug(f"OCR识别完成，原始结果数量: {len(result)}")
+            cache = PaddleOCRTool.result_cache
+            key = cache.key(image, self.settings) if use_cache else None
+            result = cache.get(key, image) if use_cache else None
+            if result is None:
+                # 内存中的图像直接以数组传入，未识别到文本时 PaddleOCR 返回 [None]
+                result = self._run(image)[0] or []
+                logger.debug(f"OCR识别完成，原始结果数量: {len(result)}")
+                if use_cache:
+                    cache.put(key, result, image)
+            else:
+                logger.debug(f"OCR结果缓存命中，原始结果数量: {len(result)}")
             
             filtered_result = [
                 item for item in result if item[1][1] > confidence_threshold
@@ -53,12 +134,73 @@ class PaddleOCRTool:
             logger.error(f"OCR识别发生错误: {str(e)}")
             return []
 
+    def recognize_lines(self, images, use_cache=True):
+        """
+        对多张单行文本图像只做文字识别(跳过文本检测)，未命中缓存的图像合并为一次批量识别调用。
+
+        适用于位置固定、只含一行文字的区域，如表单字段、数值标签。
+
+        :param images: 单行文本图像列表，每项可以是 np.ndarray(BGR)、图像字节、PIL图像或 Frame
+        :param use_cache: 是否使用 OCR 结果缓存，默认为 True
+        :return: 与输入顺序一致的 [(text, score), ...]，无法识别的图像为 ('', 0.0)
+        """
+        results = [('', 0.0)] * len(images)
+        cache = PaddleOCRTool.result_cache
+        settings = f"{self.settings}|rec"
+        pending, keys = [], []
+        for index, image in enumerate(images):
+            try:
+                array = load_ocr_input(image)
+            except (FileNotFoundError, ValueError, TypeError) as e:
+                logger.error(f"识别图像无效: {e}")
+                continue
+            key = cache.key(array, settings) if use_cache else None
+            cached = cache.get(key) if use_cache else None
+            if cached is not None:
+                # 只识别的结果以空文本框的单条结果保存
+                results[index] = tuple(cached[0][1]) if cached else ('', 0.0)
+                continue
+            pending.append((index, array))
+            keys.append(key)
+
+        if not pending:
+            return results
+        try:
+            # det=False 时传入图像列表，识别器按 rec_batch_num 分批推理
+            recognized = split_rec_result(self._run([array for _, array in pending], det=False, cls=False),
+                                          len(pending))
+        except Exception as e:
+            logger.error(f"批量文字识别发生错误，改为逐张识别: {str(e)}")
+            recognized = [self._recognize_one(array) for _, array in pending]
+        logger.debug(f"批量文字识别完成，图像数量: {len(pending)}, 缓存命中: {len(images) - len(pending)}")
+        for (index, _), key, line in zip(pending, keys, recognized):
+            if line is None:
+                continue
+            text, score = line
+            results[index] = (text, float(score))
+            if use_cache:
+                cache.put(key, [[[], (text, score)]])
+        return results
+
+    def _recognize_one(self, image):
+        """
+        只识别单张图像，失败时返回 None。
+
+        :param image: BGR 图像
+        :return: (text, score) 或 None
+        """
+        try:
+            return split_rec_result(self._run([image], det=False, cls=False), 1)[0]
+        except Exception as e:
+            logger.error(f"文字识别发生错误: {str(e)}")
+            return None
+
     def process_image(self, img1, result, font_path=None):
         """
         处理图像并保存结果。
 
         参数:
-            img1 (str): 图像文件路径。
+            img1 (str | bytes | numpy.ndarray | PIL.Image | Frame): 图像文件路径或内存中的图像。
             result (list): 包含检测结果的列表，每个元素为 (box, (text, score))。
             font_path (str): 字体文件路径，默认为None时会使用系统默认字体。
 
@@ -66,14 +208,19 @@ class PaddleOCRTool:
             bool: 处理成功返回True，失败返回False
         """
         try:
-            logger.debug(f"开始处理图像: {img1}")
+            logger.debug(f"开始处理图像: {describe_image(img1)}")
             
-            if not os.path.exists(img1):
+            if isinstance(img1, str) and not os.path.exists(img1):
                 logger.error(f"输入图片不存在: {img1}")
                 return False
                 
-            # 打开并转换图像
-            image = Image.open(img1).convert('RGB')
+            # 打开并转换图像，内存中的图像按 BGR 解码后转换
+            if isinstance(img1, str):
+                image = Image.open(img1).convert('RGB')
+            elif isinstance(img1, Image.Image):
+                image = img1.convert('RGB')
+            else:
+                image = Image.fromarray(load_ocr_input(img1)[..., ::-1])
             
             if not result:
                 logger.warning("OCR结果为空，无法处理图像")
@@ -87,6 +234,7 @@ class PaddleOCRTool:
             logger.debug(f"检测到文本数量: {len(txts)}")
             
             # 绘制 OCR 结果
+            from paddleocr import draw_ocr
             im_show = draw_ocr(image, boxes, txts, scores, font_path=font_path)
             im_show = Image.fromarray(im_show)
 
@@ -104,13 +252,13 @@ class PaddleOCRTool:
         """
         根据给定的字符或正则表达式筛选列表中的文本，并返回筛选后的文本和其对应的框。
 
-        :param img_path: 图像文件路径
+        :param img_path: 图像文件路径、np.ndarray(BGR)、编码后的图像字节、PIL图像或 Frame
         :param pattern: 需要匹配的字符或正则表达式
         :param pattern_type: 指定 `pattern` 是字符 ('char') 还是正则表达式 ('regex')，默认为 'char'
         :return: 匹配的文本及其对应的框，或 None
         """
         try:
-            logger.debug(f"开始文本筛选，图片: {img_path}, 模式: {pattern}, 类型: {pattern_type}")
+            logger.debug(f"开始文本筛选，图片: {describe_image(img_path)}, 模式: {pattern}, 类型: {pattern_type}")
             
             pattern_type = pattern_type.lower()
             if pattern_type not in ['char', 'regex']:
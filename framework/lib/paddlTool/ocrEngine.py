@@ -0,0 +1,172 @@
+import gc
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+MODEL_DIR = os.path.dirname(__file__)
+
+# 默认的 PaddleOCR 配置，PaddleOCRTool(**config) 中的参数覆盖对应项
+DEFAULT_CONFIG = dict(
+    lang='ch',
+    rec_char_dict_path=f'{MODEL_DIR}/ppocr_keys_v1.txt',
+    det_model_dir=f'{MODEL_DIR}/ch_PP-OCRv4_det_infer',
+    rec_model_dir=f'{MODEL_DIR}/ch_PP-OCRv4_rec_infer',
+    cls_model_dir=f'{MODEL_DIR}/ch_ppocr_mobile_v2.0_cls_infer',
+    cls=False,
+    use_angle_cls=False,
+    use_tensorrt=True,
+    enable_mkldnn=True,
+    use_mp=True,
+    total_process_num=6,
+)
+
+
+def create_paddle_engine(config: Dict[str, Any]):
+    """按配置创建 PaddleOCR 实例，paddleocr 在此时才导入"""
+    from paddleocr import PaddleOCR
+    return PaddleOCR(**config)
+
+
+def split_rec_result(result, count: int) -> List[Tuple[str, float]]:
+    """将只识别(det=False)时 PaddleOCR.ocr 的返回值整理为与输入图像一一对应的 (text, score) 列表
+
+    paddleocr 2.8 起图像列表作为一批识别，返回 [[(text, score), ...]]；更早的版本逐张识别，
+    返回 [[(text, score)], [(text, score)], ...]。两种结构都转换为 [(text, score), ...]。
+
+    Args:
+        result: PaddleOCR.ocr(images, det=False) 的返回值
+        count: 输入的图像数
+
+    Returns:
+        长度为 count 的 [(text, score), ...]
+
+    Raises:
+        ValueError: 结果数与图像数不一致时抛出
+    """
+    result = result or []
+    if len(result) == 1:
+        lines = list(result[0] or [])
+    else:
+        lines = [line for group in result for line in (group or [])]
+    if len(lines) != count:
+        raise ValueError(f"识别结果数 {len(lines)} 与图像数 {count} 不一致")
+    return [(text, score) for text, score in lines]
+
+
+class _Entry:
+    """一个配置对应的引擎及其锁"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.engine = None
+        self.lock = threading.RLock()
+        self.uses = 0
+
+
+class OcrEngineRegistry:
+    """进程内共享的 OCR 引擎注册表
+
+    每种配置只加载一个引擎实例，首次使用时才加载模型，所有 PaddleOCRTool/OcrActions 对象和线程共用。
+    PaddleOCR 的推理预测器不是线程安全的，同一引擎上的推理通过 session() 持有的锁串行执行，
+    不同配置的引擎互不阻塞。
+    """
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], Any] = create_paddle_engine):
+        """
+        Args:
+            factory: 接收配置字典并返回引擎实例的函数
+        """
+        self.factory = factory
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def config(**overrides) -> Dict[str, Any]:
+        """默认配置加上覆盖项"""
+        return {**DEFAULT_CONFIG, **overrides}
+
+    @staticmethod
+    def key(config: Dict[str, Any]) -> str:
+        """配置的标识，同时作为 OCR 结果缓存键的一部分"""
+        text = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _entry(self, config: Dict[str, Any]) -> _Entry:
+        key = self.key(config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(config)
+            return entry
+
+    def _load(self, entry: _Entry) -> Any:
+        """在持有 entry.lock 时调用，未加载时加载模型"""
+        if entry.engine is None:
+            start = time.perf_counter()
+            entry.engine = self.factory(entry.config)
+            logger.debug(f"OCR模型加载完成: {self.key(entry.config)}, 耗时={time.perf_counter() - start:.2f}s")
+        return entry.engine
+
+    def get(self, config: Optional[Dict[str, Any]] = None) -> Any:
+        """获取引擎实例，未加载时加载。直接使用返回的实例推理时需自行保证串行，推荐使用 session()"""
+        entry = self._entry(config or self.config())
+        with entry.lock:
+            return self._load(entry)
+
+    @contextmanager
+    def session(self, config: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """独占使用引擎: with engines.session(config) as engine: engine.ocr(image)"""
+        entry = self._entry(config or self.config())
+        with entry.lock:
+            entry.uses += 1
+            yield self._load(entry)
+
+    def warm_up(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """加载模型并用空白图像推理一次，使首个实际请求不再承担初始化开销"""
+        with self.session(config) as engine:
+            start = time.perf_counter()
+            try:
+                engine.ocr(np.full((64, 256, 3), 255, dtype=np.uint8))
+            except Exception as e:
+                logger.debug(f"OCR预热推理失败: {e}")
+            logger.debug(f"OCR预热完成，耗时={time.perf_counter() - start:.2f}s")
+
+    def unload(self, config: Optional[Dict[str, Any]] = None) -> int:
+        """释放引擎，config 为 None 时释放全部引擎。下次使用时重新加载
+
+        Returns:
+            释放的引擎数
+        """
+        with self._lock:
+            entries = list(self._entries.values()) if config is None else \
+                [e for e in [self._entries.get(self.key(config))] if e is not None]
+        count = 0
+        for entry in entries:
+            with entry.lock:
+                if entry.engine is not None:
+                    entry.engine = None
+                    count += 1
+        if count:
+            gc.collect()
+            logger.debug(f"已释放OCR引擎: {count}")
+        return count
+
+    @property
+    def loaded(self) -> List[str]:
+        """已加载的引擎配置标识"""
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry.engine is not None]
+
+    def __repr__(self) -> str:
+        return f"OcrEngineRegistry(configs={len(self._entries)}, loaded={len(self.loaded)})"
+
+
+# 进程内共享的引擎注册表
+engines = OcrEngineRegistry()
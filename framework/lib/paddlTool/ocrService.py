@@ -0,0 +1,459 @@
+"""进程外 OCR 服务
+
+由若干工作进程组成，每个进程各自加载一个 OCR 引擎。设备控制循环提交识别请求后立即得到 Future，
+推理在其他进程中进行，调用线程不会被阻塞，多个设备会话可以共用 N 个工作进程。
+
+- 图像通过共享内存传给工作进程，只在提交时复制一次，请求和结果传递的只有元数据；
+- 未完成的请求数达到 max_pending 时 submit 阻塞(或超时抛出 queue.Full)，形成背压；
+- 每个请求可以设置期限，超过期限的请求在调用方立即以 TimeoutError 结束，工作进程也不再处理；
+- 每个工作进程有自己的任务队列，请求分配给未完成请求最少的进程，空闲进程优先；
+- 工作进程队列中积压的、参数相同的只识别(det=False)请求合并为一次批量识别；
+- 每个工作进程经独立的管道回传结果，进程被强制结束时不会持有其他进程共用的锁；
+- 工作进程异常退出时只让分配给它的请求以 RuntimeError 结束，并重启该进程。
+
+用法:
+    with OcrService(workers=2) as service:
+        future = service.submit(screenshot, timeout=2.0)
+        ...
+        result = future.result()
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+from ..imgFrame import describe_image
+from .ocrEngine import OcrEngineRegistry, create_paddle_engine, split_rec_result
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """在工作进程中打开共享内存块，块的生命周期由提交请求的进程管理"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有 track 参数。spawn 出的工作进程与父进程共用同一个资源跟踪进程，
+        # 重复登记同名内存块没有影响；不能在此取消登记，否则父进程 unlink 时跟踪进程报错
+        return shared_memory.SharedMemory(name=name)
+
+
+def _open_images(sources) -> Tuple[Any, List[shared_memory.SharedMemory]]:
+    """将请求中的图像描述还原为路径或共享内存上的数组视图"""
+    images, blocks = [], []
+    for source in sources:
+        if source[0] == 'path':
+            images.append(source[1])
+        else:
+            _, name, shape, dtype = source
+            shm = _attach(name)
+            blocks.append(shm)
+            images.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    return images, blocks
+
+
+def _close(blocks: List[shared_memory.SharedMemory]) -> None:
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # 引擎仍持有视图时由进程退出时回收
+            pass
+
+
+def _batchable(task) -> bool:
+    return task[2].get('det', True) is False
+
+
+def _worker_main(index: int, config: Dict[str, Any], factory: Callable, tasks, results, batch_size: int) -> None:
+    """工作进程: 加载引擎后循环处理请求，收到 None 时退出
+
+    取出的请求是只识别请求时，继续取出队列中紧随其后、参数相同的只识别请求合并识别；
+    遇到不能合并的请求即停止，留到下一轮单独处理。
+    """
+    engine = factory(config)
+    results.send(('ready', index, None))
+    carried = None
+    while True:
+        task = carried if carried is not None else tasks.get()
+        carried = None
+        if task is None:
+            break
+        batch = [task]
+        while _batchable(task) and len(batch) < batch_size:
+            try:
+                following = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if following is None or not _batchable(following) or following[2] != task[2]:
+                carried = following
+                break
+            batch.append(following)
+
+        now = time.time()
+        live = []
+        for request_id, sources, kwargs, deadline, single in batch:
+            if deadline is not None and now > deadline:
+                results.send((request_id, None, 'deadline'))
+            else:
+                live.append((request_id, sources, single))
+        if not live:
+            continue
+
+        images, blocks = [], []
+        try:
+            for _, sources, _ in live:
+                opened, opened_blocks = _open_images(sources)
+                images.extend(opened)
+                blocks.extend(opened_blocks)
+            if _batchable(task):
+                # 兼容不同 paddleocr 版本的返回结构，结果数与图像数不一致时整组失败，避免错位
+                recognized = split_rec_result(engine.ocr(images, **task[2]), len(images))
+                offset = 0
+                for request_id, sources, _ in live:
+                    results.send((request_id, [list(recognized[offset:offset + len(sources)])], None))
+                    offset += len(sources)
+            else:
+                request_id, _, single = live[0]
+                results.send((request_id, engine.ocr(images[0] if single else images, **task[2]), None))
+        except Exception as e:
+            for request_id, _, _ in live:
+                results.send((request_id, None, f"{type(e).__name__}: {e}"))
+        finally:
+            del images
+            _close(blocks)
+
+
+class _Pending:
+    """已提交、尚未收到结果的请求"""
+
+    __slots__ = ('future', 'blocks', 'deadline', 'worker')
+
+    def __init__(self, future: Future, blocks: List[shared_memory.SharedMemory], deadline: Optional[float],
+                 worker: int):
+        self.future = future
+        self.blocks = blocks
+        self.deadline = deadline
+        # 处理该请求的工作进程下标
+        self.worker = worker
+
+
+class OcrService:
+    """OCR 工作进程池"""
+
+    def __init__(self, workers: int = 2, config: Optional[Dict[str, Any]] = None,
+                 factory: Callable[[Dict[str, Any]], Any] = create_paddle_engine,
+                 max_pending: int = 32, batch_size: int = 8, start_timeout: Optional[float] = 120.0):
+        """
+        Args:
+            workers: 工作进程数，每个进程加载一个引擎
+            config: 覆盖 ocrEngine.DEFAULT_CONFIG 的 PaddleOCR 参数；未指定 cpu_threads 时
+                按 CPU 核数平均分配给各工作进程
+            factory: 在工作进程中创建引擎的函数，需可被 pickle(模块级函数或类)
+            max_pending: 未完成请求数上限，达到上限时 submit 阻塞
+            batch_size: 工作进程每次最多合并识别的请求数
+            start_timeout: 等待所有工作进程加载完模型的时间(秒)，None 表示不等待
+        """
+        config = OcrEngineRegistry.config(**(config or {}))
+        config.setdefault('cpu_threads', max(1, (os.cpu_count() or 1) // workers))
+        # 多进程服务中每个工作进程只使用自身的线程，不再启用 PaddleOCR 的多进程模式
+        config['use_mp'] = False
+        self.config = config
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending: Dict[int, _Pending] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+        # 工作进程全部退出等导致服务不可用的原因
+        self._failure: Optional[str] = None
+
+        # Paddle 不支持在 fork 出的子进程中使用父进程已初始化的运行时，统一使用 spawn
+        self._context = multiprocessing.get_context('spawn')
+        self._factory = factory
+        self._batch_size = batch_size
+        # 结果经各进程独立的管道回传; 共用 Queue 时，进程在发送途中被强制结束会一直持有写锁，
+        # 其他进程的结果都无法送达
+        self._results: List[Any] = [None] * workers
+        self._tasks: List[Any] = [None] * workers
+        self._processes: List[Any] = [None] * workers
+        for index in range(workers):
+            self._start_worker(index)
+        # close 经此管道通知结果线程退出
+        self._control, self._stop = self._context.Pipe(duplex=False)
+        self._ready = threading.Event()
+        # 已加载完模型的工作进程下标，只有就绪过的进程异常退出后才会重启
+        self._started: Set[int] = set()
+        self._collector = threading.Thread(target=self._collect, name="ocr-service-collector", daemon=True)
+        self._collector.start()
+        if start_timeout is not None and not self._ready.wait(start_timeout):
+            logger.warning(f"OCR工作进程未在 {start_timeout}s 内全部就绪")
+        if self._failure is not None:
+            raise RuntimeError(f"OCR服务启动失败: {self._failure}")
+        logger.debug(f"OCR服务已启动: 工作进程={workers}, 每进程线程={config['cpu_threads']}")
+
+    def _start_worker(self, index: int) -> None:
+        """启动第 index 个工作进程，使用新的任务队列和结果管道"""
+        self._tasks[index] = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_worker_main, name=f"ocr-worker-{index}", daemon=True,
+                                        args=(index, self.config, self._factory, self._tasks[index],
+                                              writer, self._batch_size))
+        process.start()
+        # 父进程不保留写端，进程退出后读端收到 EOF
+        writer.close()
+        self._results[index] = reader
+        self._processes[index] = process
+
+    def _choose_worker(self) -> int:
+        """在持有 self._lock 时调用，返回未完成请求最少的存活工作进程"""
+        loads = [0] * self.workers
+        for pending in self._pending.values():
+            loads[pending.worker] += 1
+        alive = [index for index, process in enumerate(self._processes) if process.is_alive()] \
+            or list(range(self.workers))
+        return min(alive, key=lambda index: loads[index])
+
+    def submit(self, image, timeout: Optional[float] = None, block: bool = True,
+               wait: Optional[float] = None, **kwargs) -> Future:
+        """提交识别请求
+
+        Args:
+            image: 图像路径、np.ndarray(BGR)、编码后的图像字节、PIL图像、Frame，或它们的列表(只识别时为多个单行图像)
+            timeout: 请求期限(秒)，超时后 Future 以 TimeoutError 结束
+            block: 未完成请求数达到上限时是否等待
+            wait: 等待空位的最长时间(秒)，None 表示一直等待
+            kwargs: 传给 PaddleOCR.ocr 的参数，如 det=False、cls=False
+
+        Returns:
+            Future，结果与 PaddleOCR.ocr 的返回值相同；det=False 时为 [[(text, score), ...]]
+
+        Raises:
+            RuntimeError: 服务已关闭或工作进程已全部退出时抛出
+            queue.Full: 等待空位超时或 block=False 且没有空位时抛出
+        """
+        self._check_alive()
+        if not self._slots.acquire(blocking=block, timeout=wait if block else None):
+            raise queue.Full("OCR服务待处理请求已满")
+
+        from . import load_ocr_input
+        future: Future = Future()
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            single = not isinstance(image, (list, tuple))
+            sources = []
+            for item in ([image] if single else image):
+                array = load_ocr_input(item)
+                if isinstance(array, str):
+                    sources.append(('path', os.path.abspath(array)))
+                    continue
+                array = np.ascontiguousarray(array)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                blocks.append(shm)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+                sources.append(('shm', shm.name, array.shape, array.dtype.str))
+        except Exception:
+            self._release(blocks)
+            self._slots.release()
+            raise
+
+        request_id = next(self._ids)
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            alive = not self._closed and self._collector.is_alive()
+            if alive:
+                # 记录分配的进程，进程退出时只结束分配给它的请求；与重启进程互斥，不会放入已废弃的队列
+                worker = self._choose_worker()
+                self._pending[request_id] = _Pending(future, blocks, deadline, worker)
+                self._tasks[worker].put((request_id, sources, kwargs, deadline, single))
+        if not alive:
+            # 提交期间服务已关闭或结果线程已退出，没有线程会完成这个请求
+            self._release(blocks)
+            self._slots.release()
+            raise RuntimeError(self._failure or "OCR服务已关闭")
+        logger.debug(f"提交OCR请求 {request_id} -> 工作进程 {worker}: {describe_image(image)}")
+        return future
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待所有工作进程加载完模型
+
+        Args:
+            timeout: 最长等待时间(秒)，None 表示一直等待
+
+        Returns:
+            是否全部就绪
+
+        Raises:
+            RuntimeError: 服务已关闭或工作进程已全部退出时抛出
+        """
+        ready = self._ready.wait(timeout)
+        self._check_alive()
+        return ready
+
+    def _check_alive(self) -> None:
+        if self._closed or not self._collector.is_alive():
+            raise RuntimeError(self._failure or "OCR服务已关闭")
+
+    def ocr(self, image, timeout: Optional[float] = None, **kwargs):
+        """同步识别，等价于 submit(...).result()"""
+        return self.submit(image, timeout=timeout, **kwargs).result()
+
+    @staticmethod
+    def _release(blocks: List[shared_memory.SharedMemory]) -> None:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    def _finish(self, request_id: int, result, error: Optional[str]) -> None:
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return
+        self._release(pending.blocks)
+        self._slots.release()
+        if pending.future.done():
+            # 已在调用方超时结束，忽略迟到的结果
+            return
+        if error == 'deadline':
+            pending.future.set_exception(TimeoutError(f"OCR请求 {request_id} 超过期限"))
+        elif error is not None:
+            pending.future.set_exception(RuntimeError(error))
+        else:
+            pending.future.set_result(result)
+
+    def _expire(self) -> None:
+        """超过期限的请求立即结束，共享内存在工作进程回复后释放"""
+        now = time.time()
+        with self._lock:
+            expired = [(request_id, p.future) for request_id, p in self._pending.items()
+                       if p.deadline is not None and now > p.deadline and not p.future.done()]
+        for request_id, future in expired:
+            future.set_exception(TimeoutError(f"OCR请求 {request_id} 超过期限"))
+
+    def _handle(self, message) -> None:
+        """处理一条工作进程消息"""
+        request_id, result, error = message
+        if request_id == 'ready':
+            self._started.add(result)
+            if len(self._started) == self.workers:
+                self._ready.set()
+        else:
+            self._finish(request_id, result, error)
+
+    def _receive(self, index: int, block: bool = True) -> None:
+        """读取第 index 个工作进程的结果管道，block 为 False 时读完已到达的消息即返回"""
+        reader = self._results[index]
+        while not reader.closed and (block or reader.poll()):
+            try:
+                message = reader.recv()
+            except (EOFError, OSError):
+                # 工作进程已退出，由 _check_workers 处理
+                reader.close()
+                return
+            self._handle(message)
+            block = False
+
+    def _check_workers(self) -> bool:
+        """处理异常退出的工作进程: 结束分配给它的请求，已就绪过的进程重启。服务不可用时返回 False"""
+        dead = [index for index, process in enumerate(self._processes) if not process.is_alive()]
+        if not dead or self._closed:
+            return True
+        for index in dead:
+            # 先收完进程退出前发出的结果，避免把已完成的请求当作失败
+            self._receive(index, block=False)
+            reason = f"OCR工作进程 {index} 已退出(exitcode={self._processes[index].exitcode})"
+            failed = self._fail_requests(reason, lambda p: p.worker == index)
+            if index not in self._started:
+                continue
+            logger.warning(f"{reason}，结束其请求 {failed} 个并重启")
+            with self._lock:
+                self._started.discard(index)
+                old = self._tasks[index]
+                self._results[index].close()
+                self._start_worker(index)
+            old.cancel_join_thread()
+            old.close()
+        if not any(process.is_alive() for process in self._processes):
+            # 例如模型加载失败，之后的 submit 直接抛出，构造函数不再等待就绪
+            self._failure = "OCR工作进程已全部退出"
+            self._closed = True
+            self._ready.set()
+            self._fail_all(self._failure)
+            return False
+        return True
+
+    def _collect(self) -> None:
+        """接收工作进程的结果并完成对应的 Future"""
+        try:
+            while True:
+                readers = {reader: index for index, reader in enumerate(self._results) if not reader.closed}
+                ready = wait([self._control, *readers], timeout=0.05)
+                for reader in ready:
+                    if reader is not self._control:
+                        self._receive(readers[reader])
+                if self._control in ready:
+                    # 工作进程均已停止，收完剩余结果后退出
+                    for index in readers.values():
+                        self._receive(index, block=False)
+                    break
+                self._expire()
+                if not self._check_workers():
+                    break
+        finally:
+            for reader in self._results:
+                reader.close()
+
+    def _fail_requests(self, reason: str, predicate: Callable[[_Pending], bool]) -> int:
+        """以 RuntimeError 结束满足条件的请求，返回结束的请求数"""
+        with self._lock:
+            failed = {request_id: p for request_id, p in self._pending.items() if predicate(p)}
+            for request_id in failed:
+                del self._pending[request_id]
+        for p in failed.values():
+            self._release(p.blocks)
+            self._slots.release()
+            if not p.future.done():
+                p.future.set_exception(RuntimeError(reason))
+        return len(failed)
+
+    def _fail_all(self, reason: str) -> None:
+        self._fail_requests(reason, lambda p: True)
+
+    @property
+    def pending(self) -> int:
+        """未完成的请求数"""
+        with self._lock:
+            return len(self._pending)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """停止工作进程，未完成的请求以 RuntimeError 结束"""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            for tasks in self._tasks:
+                tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._stop.send(None)
+        self._collector.join(timeout)
+        self._fail_all("OCR服务已关闭")
+        logger.debug("OCR服务已关闭")
+
+    def __enter__(self) -> 'OcrService':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"OcrService(workers={self.workers}, pending={self.pending})"
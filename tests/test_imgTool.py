@@ -0,0 +1,510 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framework.lib.imgTool import ImageProcessor
+from framework.lib.imgCache import TemplateFeatureCache
+from framework.lib.imgChange import ChangeDetector
+from framework.lib.imgFeature import FeatureBackend
+from framework.lib import imgFrame
+from framework.lib.imgFrame import Frame
+from framework.lib.imgHash import BKTree, ScreenRegistry, hamming, phash
+from framework.lib.imgPack import build_pack
+from framework.lib.imgSimilarity import SimilarityComparator
+from framework.lib.imgTemplate import non_max_suppression
+from framework.lib.imgTrack import TemplateTracker
+
+
+def make_scene(width=640, height=480, seed=0):
+    """生成带纹理的合成截图"""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    scene = cv2.resize(noise, (width, height), interpolation=cv2.INTER_NEAREST)
+    for _ in range(40):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(scene, (x, y), (x + int(rng.integers(10, 40)), y + int(rng.integers(10, 40))), color, -1)
+    return scene
+
+
+class TestImageProcessor(unittest.TestCase):
+    """ImageProcessor 图像匹配测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scene = make_scene()
+        self.box = (200, 150, 120, 90)
+        x, y, w, h = self.box
+        self.template = self.scene[y:y + h, x:x + w].copy()
+        self.scene_path = os.path.join(self.tmp.name, "scene.png")
+        self.template_path = os.path.join(self.tmp.name, "template.png")
+        cv2.imwrite(self.scene_path, self.scene)
+        cv2.imwrite(self.template_path, self.template)
+        ImageProcessor.template_cache.clear()
+        ImageProcessor.location_store.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_center_location(self):
+        x, y, w, h = self.box
+        center = ImageProcessor.get_center_location(self.template_path, self.scene_path)
+        self.assertIsNotNone(center)
+        self.assertAlmostEqual(center[0], x + w / 2, delta=3)
+        self.assertAlmostEqual(center[1], y + h / 2, delta=3)
+
+    def test_template_cache_reused(self):
+        cache = ImageProcessor.template_cache
+        for _ in range(3):
+            self.assertIsNotNone(ImageProcessor.get_corners(self.template_path, self.scene_path))
+        self.assertEqual(cache.misses, 1)
+        self.assertGreaterEqual(cache.hits, 2)
+
+    def test_template_cache_invalidated_on_change(self):
+        cache = TemplateFeatureCache()
+        cache.get(self.template_path, lambda g: ([], None))
+        cv2.imwrite(self.template_path, self.template[:50, :50])
+        os.utime(self.template_path, ns=(0, 0))
+        features = cache.get(self.template_path, lambda g: ([], None))
+        self.assertEqual(features.gray.shape, (50, 50))
+        self.assertEqual(cache.misses, 2)
+
+    def test_template_cache_budget(self):
+        cache = TemplateFeatureCache(max_bytes=self.template.shape[0] * self.template.shape[1] + 64)
+        other = os.path.join(self.tmp.name, "other.png")
+        cv2.imwrite(other, self.template)
+        cache.get(self.template_path, lambda g: ([], None))
+        cache.get(other, lambda g: ([], None))
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_in_memory_inputs(self):
+        x, y, w, h = self.box
+        ok, encoded = cv2.imencode('.png', self.scene)
+        pil_scene = Image.fromarray(cv2.cvtColor(self.scene, cv2.COLOR_BGR2RGB))
+        for back in (self.scene, encoded.tobytes(), pil_scene):
+            center = ImageProcessor.get_center_location(self.template, back)
+            self.assertIsNotNone(center)
+            self.assertAlmostEqual(center[0], x + w / 2, delta=3)
+            self.assertAlmostEqual(center[1], y + h / 2, delta=3)
+
+    def test_locate_many(self):
+        other = self.scene[300:380, 400:500].copy()
+        blank = np.full((40, 40, 3), 127, dtype=np.uint8)
+        results = ImageProcessor.locate_many({'a': self.template_path, 'b': other, 'c': blank}, self.scene)
+        x, y, w, h = self.box
+        self.assertAlmostEqual(results['a']['center'][0], x + w / 2, delta=3)
+        self.assertAlmostEqual(results['b']['center'][1], 340, delta=3)
+        self.assertGreaterEqual(results['a']['inliers'], 4)
+        self.assertIsNone(results['c'])
+        self.assertEqual(len(ImageProcessor.locate_many([other, blank], self.scene_path)), 2)
+
+    def test_feature_backends(self):
+        x, y, w, h = self.box
+        for backend in ('sift', FeatureBackend('brisk'), FeatureBackend('sift', matcher='bf', ratio=0.8)):
+            corners = ImageProcessor.get_corners(self.template_path, self.scene_path, backend=backend)
+            self.assertIsNotNone(corners, backend)
+            self.assertAlmostEqual(corners[0][0], x, delta=4)
+        with self.assertRaises(ValueError):
+            FeatureBackend('orb', matcher='flann')
+
+    def test_tiled_feature_extraction(self):
+        gray = cv2.cvtColor(make_scene(1280, 960, seed=4), cv2.COLOR_BGR2GRAY)
+        full_kp, _ = FeatureBackend('sift').extract(gray)
+        tiled = FeatureBackend('sift', tiles=(2, 2), min_tile_size=128)
+        tiled_kp, tiled_des = tiled.extract(gray)
+        self.assertEqual(len(tiled_kp), len(tiled_des))
+        self.assertAlmostEqual(len(tiled_kp) / len(full_kp), 1.0, delta=0.02)
+        full_pts = cv2.KeyPoint_convert(full_kp)
+        matches = cv2.BFMatcher(cv2.NORM_L2).match(cv2.KeyPoint_convert(tiled_kp), full_pts)
+        self.assertGreater(np.mean([m.distance < 1.0 for m in matches]), 0.98)
+
+        x, y, w, h = self.box
+        corners = ImageProcessor.get_corners(self.template_path, self.scene, backend=tiled)
+        self.assertAlmostEqual(corners[0][0], x, delta=3)
+        self.assertNotEqual(tiled.key, FeatureBackend('sift').key)
+
+    def test_auto_backend_selected_once(self):
+        selected = ImageProcessor.select_backend(self.template_path, self.scene, min_inliers=8)
+        self.assertIn(selected.name, ('orb', 'brisk', 'akaze', 'sift'))
+        center = ImageProcessor.get_center_location(self.template_path, self.scene, backend='auto')
+        self.assertIsNotNone(center)
+        self.assertIs(ImageProcessor._resolve_backend('auto', self.template_path), selected)
+
+    def test_find_template(self):
+        x, y, w, h = self.box
+        match = ImageProcessor.find_template(self.template_path, self.scene_path)
+        self.assertEqual(match[:4], (x, y, w, h))
+        self.assertGreater(match[4], 0.99)
+
+        small = cv2.resize(self.scene, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+        match = ImageProcessor.find_template(self.template, small, scales=(0.5, 1.0))
+        self.assertIsNotNone(match)
+        self.assertAlmostEqual(match[0], x // 2, delta=2)
+        self.assertIsNone(ImageProcessor.find_template(np.full((30, 30, 3), 7, np.uint8), self.scene))
+
+    def test_find_template_expected_location(self):
+        x, y, w, h = self.box
+        store = ImageProcessor.location_store
+        self.assertEqual(ImageProcessor.find_template(self.template_path, self.scene)[:4], (x, y, w, h))
+        self.assertEqual(ImageProcessor.find_template(self.template_path, self.scene)[:4], (x, y, w, h))
+        moved = cv2.warpAffine(self.scene, np.float32([[1, 0, 30], [0, 1, 20]]), (640, 480))
+        self.assertEqual(ImageProcessor.find_template(self.template_path, moved)[:2], (x + 30, y + 20))
+        self.assertEqual(store.stats, {'hits': 1, 'roi_hits': 1, 'misses': 1})
+
+        path = os.path.join(self.tmp.name, "locations.json")
+        store.save(path)
+        loaded = ImageProcessor.load_locations(path)
+        try:
+            self.assertEqual(ImageProcessor.find_template(self.template_path, moved)[:2], (x + 30, y + 20))
+            self.assertEqual(loaded.hits, 1)
+        finally:
+            ImageProcessor.location_store = store
+
+        # 附近搜索不超出调用方给定的搜索区域
+        store.record(store.key(os.path.abspath(self.template_path), (640, 480)), self.box, 'hits')
+        self.assertIsNone(ImageProcessor.find_template(self.template_path, moved, roi=(x - 5, y - 5, w + 10, h + 10)))
+
+    def test_roi_search(self):
+        x, y, w, h = self.box
+        frame = Frame(self.scene)
+        roi = (x - 40, y - 30, w + 80, h + 60)
+        corners = ImageProcessor.get_corners(self.template_path, frame, roi=roi)
+        self.assertAlmostEqual(corners[0][0], x, delta=3)
+        self.assertAlmostEqual(corners[0][1], y, delta=3)
+        region = frame.crop(roi)
+        self.assertTrue(np.shares_memory(region.bgr, frame.bgr))
+        self.assertEqual(region.offset, (x - 40, y - 30))
+
+        quad = [[x - 10, y - 10], [x + w + 10, y - 10], [x + w + 10, y + h + 10], [x - 10, y + h + 10]]
+        center = ImageProcessor.get_center_location(self.template_path, frame, roi=[(0, 0, 100, 100), quad])
+        self.assertAlmostEqual(center[0], x + w / 2, delta=3)
+        self.assertIsNone(ImageProcessor.find_template(self.template_path, frame, roi=(0, 0, 150, 150)))
+        match = ImageProcessor.find_template(self.template_path, frame, roi=roi, use_location=False)
+        self.assertEqual(match[:2], (x, y))
+        self.assertEqual(ImageProcessor.locate_many([self.template_path], frame, roi=roi)[0]['corners'], corners)
+
+    def test_resolution_profiles(self):
+        profiles = ImageProcessor.resolution_profiles
+        x, y, w, h = self.box
+        small = cv2.resize(self.scene, (320, 240), interpolation=cv2.INTER_AREA)
+        try:
+            profiles.add_profile('large', (640, 480))
+            ImageProcessor.set_template_resolution(self.tmp.name, 'large')
+            match = ImageProcessor.find_template(self.template_path, small, use_location=False)
+            self.assertIsNotNone(match)
+            self.assertEqual(match[2:4], (w // 2, h // 2))
+            self.assertAlmostEqual(match[0], x // 2, delta=1)
+            self.assertIs(ImageProcessor._template_gray(self.template_path, (320, 240)),
+                          ImageProcessor._template_gray(self.template_path, (320, 240)))
+            self.assertEqual(profiles.convert_point((x, y), 'large', (320, 240)), (x // 2, y // 2))
+            self.assertEqual(profiles.convert_rect(self.box, 'large', (1280, 960)), (2 * x, 2 * y, 2 * w, 2 * h))
+            self.assertTrue(ImageProcessor.check_image_orientation_and_size(self.scene))
+            # 登记分辨率后默认尺寸仍然允许
+            self.assertTrue(ImageProcessor.check_image_orientation_and_size(np.zeros((777, 431, 3), np.uint8)))
+            self.assertFalse(ImageProcessor.check_image_orientation_and_size(np.zeros((700, 400, 3), np.uint8)))
+        finally:
+            profiles.clear()
+
+    def test_find_all_templates_repeated_icon(self):
+        icon = make_scene(seed=3)[100:132, 100:132].copy()
+        scene = np.full((300, 400, 3), 40, dtype=np.uint8)
+        positions = [(20, 30), (120, 30), (220, 150), (300, 250)]
+        for px, py in positions:
+            scene[py:py + 32, px:px + 32] = icon
+        matches = ImageProcessor.mark_target(icon, scene, show=False)
+        self.assertEqual(matches.shape, (4, 5))
+        self.assertEqual(sorted(map(tuple, matches[:, :2].astype(int).tolist())), sorted(positions))
+        centers = ImageProcessor.find_template_centers(icon, scene)
+        self.assertEqual(sorted(map(tuple, centers.tolist())), sorted((px + 16, py + 16) for px, py in positions))
+        matches = ImageProcessor.mark_target(icon, scene, show=False, roi=[(0, 0, 200, 100), (100, 0, 200, 250)])
+        self.assertEqual(sorted(map(tuple, matches[:, :2].astype(int).tolist())), sorted(positions[:3]))
+
+    def test_batch_match(self):
+        from framework.lib.imgBatch import batch_match
+        other = os.path.join(self.tmp.name, "other.png")
+        cv2.imwrite(other, self.scene[300:380, 400:500])
+        x, y, w, h = self.box
+        for workers in (1, 2):
+            results = {os.path.basename(item.template): item
+                       for item in batch_match(self.tmp.name, self.scene_path, 'center', workers=workers)}
+            self.assertEqual(len(results), 3)
+            self.assertAlmostEqual(results['template.png'].result[0], x + w / 2, delta=3)
+            self.assertAlmostEqual(results['other.png'].result[1], 340, delta=3)
+        # 参数错误在调用时立即抛出，模板匹配不读写位置记录
+        with self.assertRaises(ValueError):
+            batch_match(self.tmp.name, self.scene_path, 'unknown')
+        with self.assertRaises(ValueError):
+            batch_match(self.tmp.name, self.scene_path, 'template', backend='orb')
+        found = list(batch_match([self.template_path], self.scene_path, 'template', workers=1))
+        self.assertEqual(found[0].result[:2], (x, y))
+        self.assertEqual(len(ImageProcessor.location_store), 0)
+        centers = ImageProcessor.process_images(self.template_path, self.scene_path, workers=1)
+        self.assertAlmostEqual(centers[self.template_path][1], y + h / 2, delta=3)
+
+    def test_batch_main_exit_code(self):
+        from framework.lib.imgBatch import main
+        output = os.path.join(self.tmp.name, "result.jsonl")
+        self.assertEqual(main(['--templates', self.template_path, '--backgrounds', self.scene_path,
+                               '--workers', '1', '--output', output]), 0)
+        blank = os.path.join(self.tmp.name, "blank.png")
+        cv2.imwrite(blank, np.full((40, 40, 3), 255, dtype=np.uint8))
+        self.assertEqual(main(['--templates', blank, '--backgrounds', self.scene_path,
+                               '--workers', '1', '--output', output]), 1)
+        with open(output, encoding='utf-8') as f:
+            self.assertIsNone(json.loads(f.readline())['result'])
+
+    def test_tracker_follows_moving_target(self):
+        x, y, w, h = self.box
+        tracker = TemplateTracker(self.template_path)
+        self.assertIsNotNone(tracker.update(self.scene))
+        for step in range(1, 4):
+            moved = cv2.warpAffine(self.scene, np.float32([[1, 0, 4 * step], [0, 1, 3 * step]]), (640, 480),
+                                   borderMode=cv2.BORDER_REFLECT)
+            corners = tracker.update(Frame(moved))
+            self.assertIsNotNone(corners)
+            self.assertAlmostEqual(tracker.center[0], x + w / 2 + 4 * step, delta=2)
+            self.assertAlmostEqual(tracker.center[1], y + h / 2 + 3 * step, delta=2)
+        self.assertEqual((tracker.redetected, tracker.tracked), (1, 3))
+        self.assertIsNone(tracker.update(make_scene(seed=9)))
+        self.assertEqual(tracker.lost, 1)
+
+    def test_template_pack(self):
+        path = os.path.join(self.tmp.name, "templates.pack")
+        self.assertEqual(build_pack({'button': self.template_path, 'icon': self.scene[300:380, 400:500]}, path,
+                                    backends=('sift', 'brisk'), levels=2), 2)
+        pack = ImageProcessor.load_template_pack(path)
+        self.assertIs(ImageProcessor.load_template_pack(path), pack)
+        self.assertEqual(sorted(pack.names), ['button', 'icon'])
+        button = pack['button']
+        self.assertIsInstance(button.gray.base, np.memmap)
+        np.testing.assert_array_equal(button.gray, cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE))
+        self.assertEqual(button.phash, phash(cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE)))
+        # 重新包装后的 Frame 从映射的灰度图解码，内容哈希与原图一致
+        self.assertEqual(Frame(button).bgr.shape, button.gray.shape + (3,))
+        self.assertEqual(ImageProcessor._template_key(button), ImageProcessor._template_key(cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE)))
+
+        x, y, w, h = self.box
+        for backend in ('sift', 'brisk'):
+            corners = ImageProcessor.get_corners(button, self.scene, backend=backend)
+            self.assertAlmostEqual(corners[0][0], x, delta=4)
+        self.assertEqual(ImageProcessor.template_cache.misses, 0)
+        self.assertEqual(ImageProcessor.find_template(button, self.scene)[:2], (x, y))
+        self.assertAlmostEqual(ImageProcessor.get_center_location(pack['icon'], self.scene)[1], 340, delta=3)
+
+    def test_non_max_suppression(self):
+        boxes = np.array([[0, 0, 10, 10, 0.9], [1, 1, 10, 10, 0.95], [50, 50, 10, 10, 0.8],
+                          [52, 50, 10, 10, 0.7]], dtype=np.float32)
+        kept = non_max_suppression(boxes, 0.3)
+        np.testing.assert_array_equal(kept[:, 4], np.float32([0.95, 0.8]))
+        self.assertEqual(len(non_max_suppression(boxes, 0.3, max_results=1)), 1)
+        self.assertEqual(non_max_suppression(np.empty((0, 5))).shape, (0, 5))
+
+    def test_frame_shared_across_calls(self):
+        with patch.object(imgFrame, 'decode_image', wraps=imgFrame.decode_image) as decode:
+            frame = Frame(self.scene_path)
+            self.assertIsNotNone(ImageProcessor.get_center_location(self.template_path, frame))
+            self.assertIsNotNone(ImageProcessor.get_corners(self.template_path, frame))
+            self.assertTrue(ImageProcessor.compare_image_v3(self.template_path, frame))
+            ImageProcessor.colors_exists(frame, [[0, 0, 0], [180, 255, 255]])
+            ImageProcessor.compare_image_colors(frame, frame, [[0, 0, 0], [180, 255, 255]], 0.9)
+            self.assertEqual(len(ImageProcessor.find_all_templates(self.template_path, frame)), 1)
+        sources = [call.args[0] for call in decode.call_args_list if isinstance(call.args[0], str)]
+        self.assertEqual(sources.count(self.scene_path), 1)
+        scene_views = [key for key in frame._views if isinstance(key, tuple) and key[0] == 'scene']
+        self.assertEqual(len(scene_views), 1)
+
+    def test_read_image_conversions(self):
+        gray = ImageProcessor.read_image(self.scene, cv2.IMREAD_GRAYSCALE)
+        self.assertEqual(gray.ndim, 2)
+        self.assertIs(ImageProcessor.read_image(self.scene), self.scene)
+        with self.assertRaises(TypeError):
+            ImageProcessor.read_image(123)
+
+    def test_colors_exists_with_array(self):
+        red = np.zeros((20, 20, 3), dtype=np.uint8)
+        red[:] = (0, 0, 255)
+        self.assertTrue(ImageProcessor.colors_exists(red, [[0, 100, 100], [10, 255, 255]]))
+        self.assertFalse(ImageProcessor.colors_exists(red, [[50, 100, 100], [70, 255, 255]]))
+        # 与原来的 cv2.inRange 实现一致，H_min > H_max 的范围不匹配
+        self.assertFalse(ImageProcessor.colors_exists(red, [[170, 100, 100], [10, 255, 255]]))
+        with self.assertRaises(ValueError):
+            ImageProcessor.colors_exists("missing.png", [[0, 100, 100], [10, 255, 255]])
+
+    def test_analyze_colors_matches_in_range(self):
+        hsv = cv2.cvtColor(self.scene, cv2.COLOR_BGR2HSV)
+        ranges = {'low': [[0, 0, 0], [90, 200, 120]], 'high': [[60, 40, 100], [179, 255, 255]],
+                  'red': [[170, 50, 50], [10, 255, 255]]}
+        frame = Frame(self.scene)
+        stats = ImageProcessor.analyze_colors(frame, ranges, blobs=True)
+        for name in ('low', 'high'):
+            mask = cv2.inRange(hsv, np.array(ranges[name][0]), np.array(ranges[name][1]))
+            self.assertEqual(stats[name].pixels, cv2.countNonZero(mask))
+            self.assertGreater(stats[name].blob_area, 0)
+        # 默认与 cv2.inRange 一致，H_min > H_max 的范围为空；wrap_hue=True 时按跨越 0 度的区间统计
+        self.assertEqual(stats['red'].pixels, 0)
+        wrapped = ImageProcessor.analyze_colors(frame, ranges, wrap_hue=True)
+        red = (cv2.inRange(hsv, np.array([170, 50, 50]), np.array([179, 255, 255]))
+               | cv2.inRange(hsv, np.array([0, 50, 50]), np.array([10, 255, 255])))
+        self.assertGreater(cv2.countNonZero(red), 0)
+        self.assertAlmostEqual(wrapped['red'].ratio, cv2.countNonZero(red) / red.size)
+        self.assertEqual(wrapped['low'], ImageProcessor.analyze_colors(frame, ranges)['low'])
+        sampled = ImageProcessor.analyze_colors(frame, ranges, step=4)
+        self.assertAlmostEqual(sampled['low'].ratio, stats['low'].ratio, delta=0.02)
+
+    def test_region_query(self):
+        ranges = {'low': [[0, 0, 0], [90, 200, 120]]}
+        hsv = cv2.cvtColor(self.scene, cv2.COLOR_BGR2HSV)
+        gray = cv2.cvtColor(self.scene, cv2.COLOR_BGR2GRAY)
+        query = ImageProcessor.region_query(self.scene, ranges)
+        rects = np.array([[10, 20, 50, 40], [600, 450, 100, 100], [0, 0, 640, 480], [700, 0, 10, 10]])
+        ratios = query.color_ratios('low', rects)
+        brightness = query.brightness_many(rects)
+        for (x, y, w, h), ratio, mean in zip(rects[:3], ratios, brightness):
+            mask = cv2.inRange(hsv[y:y + h, x:x + w], np.array(ranges['low'][0]), np.array(ranges['low'][1]))
+            self.assertAlmostEqual(ratio, cv2.countNonZero(mask) / mask.size)
+            self.assertAlmostEqual(mean, gray[y:y + h, x:x + w].mean())
+        self.assertEqual(ratios[3], 0)
+        self.assertAlmostEqual(query.ratios((0, 0, 640, 480))['low'], ratios[2])
+
+    def test_change_detector(self):
+        detector = ChangeDetector()
+        first = detector.update(self.scene)
+        self.assertTrue(first.first)
+        self.assertEqual(first.rects, [(0, 0, 640, 480)])
+        same = detector.update(self.scene.copy())
+        self.assertFalse(same.changed)
+        self.assertEqual(same.ratio, 0.0)
+
+        changed = self.scene.copy()
+        cv2.rectangle(changed, (500, 40), (560, 90), (255, 255, 255), -1)
+        change = detector.update(changed)
+        self.assertEqual(len(change.rects), 1)
+        x, y, w, h = change.rects[0]
+        self.assertTrue(x <= 500 and y <= 40 and x + w >= 561 and y + h >= 91)
+        self.assertLess(change.ratio, 0.05)
+        self.assertTrue(change.intersects((480, 0, 100, 100)))
+        self.assertFalse(change.intersects([[0, 200], [100, 200], [100, 300], [0, 300]]))
+
+        # 模板区域没有变化时沿用上一次的匹配结果
+        calls = []
+        find = lambda: calls.append(1) or ImageProcessor.find_template(self.template, change.frame)
+        box = self.box
+        self.assertEqual(detector.reuse('t', change, find, roi=box)[:4], box)
+        self.assertEqual(detector.reuse('t', detector.update(changed), find, roi=box)[:4], box)
+        self.assertEqual(len(calls), 1)
+        moved = changed.copy()
+        moved[150:240, 200:320] = 0
+        detector.update(moved)
+        detector.reuse('t', detector.update(moved), find, roi=box)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(detector.stats, {'changed': 3, 'unchanged': 3})
+
+    def test_change_detector_gradual_drift(self):
+        detector = ChangeDetector(threshold=8)
+        detector.update(self.scene)
+        calls = []
+        box = (0, 0, 100, 100)
+        detector.reuse('ocr', detector.update(self.scene), lambda: calls.append(1), roi=box)
+        changes = []
+        for step in range(1, 6):
+            # 每帧只变亮 3 个灰度级，单帧差异低于阈值
+            drifted = self.scene.copy()
+            drifted[:100, :100] = np.clip(self.scene[:100, :100].astype(np.int16) + 3 * step, 0, 255)
+            change = detector.update(drifted)
+            changes.append(change.changed)
+            detector.reuse('ocr', change, lambda: calls.append(1), roi=box)
+        # 累积差异在第 3 帧超过阈值，之后以该帧为参考重新累积
+        self.assertEqual(changes, [False, False, True, False, False])
+        self.assertEqual(len(calls), 2)
+
+    def test_rank_similar(self):
+        rng = np.random.default_rng(1)
+        references = {f'state{i}': rng.integers(0, 256, (96, 160, 3), dtype=np.uint8) for i in range(6)}
+        references['scene'] = self.scene
+        comparator = SimilarityComparator(references)
+        candidate = cv2.GaussianBlur(self.scene, (3, 3), 0)
+        ranked = ImageProcessor.rank_similar(candidate, comparator)
+        self.assertEqual(ranked.shape, (7, 5))
+        self.assertEqual(comparator.names[int(ranked[0, 0])], 'scene')
+        self.assertTrue(np.all(np.diff(ranked[:, 1]) <= 0))
+        # 直方图列为单通道和三通道 compareHist 相关系数的平均值
+        a, b = Frame(self.scene), Frame(references['state0'])
+        single = cv2.compareHist(a.hist(0), b.hist(0), cv2.HISTCMP_CORREL)
+        multi = sum(cv2.compareHist(a.hist(c, size=(256, 256)), b.hist(c, size=(256, 256)), cv2.HISTCMP_CORREL)
+                    for c in range(3)) / 3
+        self.assertAlmostEqual(float(SimilarityComparator([b]).compare(a)[0, 2]), (single + multi) / 2, delta=1e-4)
+        cropped = ImageProcessor.rank_similar(self.scene, references, roi=(0, 0, 320, 240))
+        self.assertEqual(cropped.shape, (7, 5))
+
+
+class TestScreenRegistry(unittest.TestCase):
+    """感知哈希界面识别测试"""
+
+    def setUp(self):
+        self.screens = {f"screen{i}": make_scene(seed=i) for i in range(4)}
+        self.registry = ScreenRegistry()
+        for name, image in self.screens.items():
+            self.registry.register(name, image)
+
+    def test_classify_noisy_frame(self):
+        rng = np.random.default_rng(42)
+        noisy = np.clip(self.screens['screen2'].astype(np.int16) + rng.integers(-8, 9, self.screens['screen2'].shape),
+                        0, 255).astype(np.uint8)
+        name, distance = self.registry.classify(Frame(noisy))
+        self.assertEqual(name, 'screen2')
+        self.assertLessEqual(distance, self.registry.max_distance)
+        self.assertIsNone(self.registry.classify(np.zeros((480, 640, 3), np.uint8), max_distance=2))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "screens.bin")
+            self.registry.save(path)
+            self.assertEqual(os.listdir(tmp), ["screens.bin"])
+            loaded = ScreenRegistry.load(path)
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(loaded.classify(self.screens['screen1'])[0], 'screen1')
+
+    def test_register_while_matching(self):
+        rng = np.random.default_rng(0)
+        values = [int(v) for v in rng.integers(0, 1 << 62, 20000, dtype=np.int64)]
+        errors = []
+
+        def register():
+            try:
+                for i, value in enumerate(values):
+                    self.registry._add(f"extra{i}", value)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=register)
+        thread.start()
+        while thread.is_alive():
+            self.registry.match(self.screens['screen0'], max_distance=30)
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.registry), 4 + len(values))
+
+    def test_bk_tree_query(self):
+        tree = BKTree()
+        values = [0b0000, 0b0001, 0b0011, 0b1111, 0b0111]
+        for value in values:
+            tree.add(value, value)
+        found = {label for _, label in tree.query(0b0001, 1)}
+        self.assertEqual(found, {v for v in values if hamming(v, 0b0001) <= 1})
+        self.assertEqual(phash(self.screens['screen0']).bit_length() <= 64, True)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,371 @@
+import unittest
+import os
+import sys
+import queue
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framework.lib.imgFrame import Frame
+from framework.lib.ocrAc import OcrActions
+from framework.lib.ocrCache import OcrResultCache, content_digest
+from framework.lib.paddlTool import PaddleOCRTool, load_ocr_input
+from framework.lib.paddlTool.ocrEngine import OcrEngineRegistry, engines, split_rec_result
+from framework.lib.paddlTool.ocrService import OcrService
+
+
+def make_text_image(text="OCR 123", width=320, height=80):
+    """生成白底黑字的合成文本图片"""
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(image, text, (10, height - 25), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2, cv2.LINE_AA)
+    return image
+
+
+RESULT = [[[[10, 20], [200, 20], [200, 60], [10, 60]], ('OCR 123', 0.97)]]
+
+
+class TestOcrResultCache(unittest.TestCase):
+    """OCR 结果缓存测试(不依赖 PaddleOCR)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = make_text_image()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_content_digest(self):
+        scene = np.zeros((200, 400, 3), dtype=np.uint8)
+        scene[50:130, 40:360] = self.image
+        # 裁剪视图与相同像素的独立数组哈希一致
+        self.assertEqual(content_digest(scene[50:130, 40:360]), content_digest(self.image.copy()))
+        pil = Image.fromarray(self.image)
+        self.assertEqual(content_digest(pil), content_digest(self.image))
+        path = os.path.join(self.tmp.name, "text.png")
+        cv2.imwrite(path, self.image)
+        with open(path, 'rb') as f:
+            self.assertEqual(content_digest(path), content_digest(f.read()))
+        self.assertNotEqual(content_digest(self.image), content_digest(make_text_image("OCR 124")))
+
+    def test_lru_and_settings(self):
+        cache = OcrResultCache(max_entries=2)
+        key = cache.key(self.image, 'v4')
+        self.assertIsNone(cache.get(key))
+        cache.put(key, RESULT)
+        self.assertEqual(cache.get(key), RESULT)
+        self.assertIsNone(cache.get(cache.key(self.image, 'v3')))
+        for text in ("A", "B"):
+            cache.put(cache.key(make_text_image(text), 'v4'), [])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats, {'hits': 1, 'near_hits': 0, 'misses': 3})
+
+    def test_tolerance_and_persistence(self):
+        cache = OcrResultCache(tolerance=2)
+        cache.put(cache.key(self.image, 'v4'), RESULT, self.image)
+        noisy = cv2.imdecode(cv2.imencode('.jpg', self.image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1], cv2.IMREAD_COLOR)
+        self.assertEqual(cache.get(cache.key(noisy, 'v4'), noisy)[0][1][0], 'OCR 123')
+        self.assertIsNone(cache.get(cache.key(noisy, 'v3'), noisy))
+        changed = make_text_image("OCR 124")
+        self.assertIsNone(cache.get(cache.key(changed, 'v4'), changed))
+        self.assertEqual(cache.near_hits, 1)
+
+        path = os.path.join(self.tmp.name, "ocr_cache.json")
+        cache.save(path)
+        loaded = OcrResultCache.load(path, tolerance=2)
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(loaded.get(loaded.key(noisy, 'v4'), noisy), cache.get(cache.key(self.image, 'v4')))
+
+
+class FakeEngine:
+    """按图像宽度返回固定文本的引擎，记录每次调用"""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = []
+
+    def ocr(self, image, det=True, rec=True, cls=False):
+        self.calls.append((image, det))
+        time.sleep(self.config.get('delay', 0))
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        if det:
+            return [[[[[0, 0], [10, 0], [10, 10], [0, 10]], (f"w{image.shape[1]}", 0.9)]]]
+        if self.config.get('legacy'):
+            # paddleocr 2.8 之前逐张识别，每张图像一个结果列表
+            return [[(f"w{crop.shape[1]}", 0.95)] for crop in image]
+        return [[(f"w{crop.shape[1]}", 0.95) for crop in image]]
+
+
+class ShortEngine(FakeEngine):
+    """只识别时少返回一个结果的引擎"""
+
+    def ocr(self, image, det=True, rec=True, cls=False):
+        result = super().ocr(image, det, rec, cls)
+        return result if det else [result[0][:-1]]
+
+
+def broken_engine(config):
+    """模拟工作进程中模型加载失败"""
+    raise RuntimeError("模型加载失败")
+
+
+class FakeEngineTestCase(unittest.TestCase):
+    """以 FakeEngine 代替 PaddleOCR 的测试基类"""
+
+    def setUp(self):
+        self.loads = []
+
+        def factory(config):
+            self.loads.append(config)
+            return FakeEngine(config)
+
+        self.factory, engines.factory = engines.factory, factory
+        engines.unload()
+        PaddleOCRTool.result_cache.clear()
+
+    def tearDown(self):
+        engines.unload()
+        engines.factory = self.factory
+
+    @property
+    def engine(self):
+        return engines.get(engines.config())
+
+
+class TestOcrInputs(FakeEngineTestCase):
+    """内存图像输入测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = make_text_image()
+        # 左右两半颜色不同，用于检查通道顺序
+        self.image[:, :160] = (255, 0, 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def test_inputs_reach_engine_as_bgr(self):
+        tool = PaddleOCRTool()
+        path = os.path.join(self.tmp.name, "text.png")
+        cv2.imwrite(path, self.image)
+        inputs = {
+            'bytes': cv2.imencode('.png', self.image)[1].tobytes(),
+            'ndarray': self.image,
+            'pil': Image.fromarray(self.image[..., ::-1].copy()),
+            'frame': Frame(self.image),
+        }
+        for name, image_input in inputs.items():
+            with self.subTest(name):
+                self.assertEqual(tool.filter_ocr_results(image_input, use_cache=False)[0][1][0], 'w320')
+                received = self.engine.calls[-1][0]
+                self.assertIsInstance(received, np.ndarray)
+                np.testing.assert_array_equal(received, self.image)
+        # 文件路径原样交给引擎读取
+        self.assertEqual(tool.filter_ocr_results(path, use_cache=False)[0][1][0], 'w320')
+        self.assertEqual(self.engine.calls[-1][0], path)
+        self.assertIs(load_ocr_input(self.image), self.image)
+
+    def test_roi_crop_is_view(self):
+        corners = [[20, 10], [220, 10], [220, 60], [20, 60]]
+        actions = OcrActions(region_of_interest=corners)
+        self.assertTrue(np.shares_memory(actions._crop_image(self.image), self.image))
+        actions.ocr_extract_all_text(self.image)
+        received = self.engine.calls[-1][0]
+        self.assertTrue(np.shares_memory(received, self.image))
+        self.assertEqual(received.shape, (50, 200, 3))
+
+    def test_unsupported_input(self):
+        actions = OcrActions()
+        self.assertFalse(actions._validate_input(123, "OCR"))
+        self.assertTrue(actions._validate_input(Frame(self.image), ["OCR"]))
+        self.assertIsNone(actions.ocr_search_text(123, "OCR"))
+        with self.assertRaises(TypeError):
+            load_ocr_input(123)
+        self.assertEqual(PaddleOCRTool().filter_ocr_results(123), [])
+        self.assertEqual(PaddleOCRTool().filter_ocr_results(os.path.join(self.tmp.name, "missing.png")), [])
+        self.assertEqual(self.loads, [])
+
+
+class TestOcrEngineRegistry(FakeEngineTestCase):
+    """共享 OCR 引擎测试"""
+
+    def test_lazy_shared_engine(self):
+        self.assertNotIn('paddleocr', sys.modules)
+        tools = [PaddleOCRTool() for _ in range(3)]
+        self.assertEqual(self.loads, [])
+        threads = [threading.Thread(target=tool.filter_ocr_results, args=(make_text_image(),)) for tool in tools]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.loads), 1)
+        self.assertIs(tools[0].ocr, tools[2].ocr)
+        PaddleOCRTool(use_tensorrt=False).warm_up()
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(len(engines.loaded), 2)
+        tools[0].unload()
+        self.assertEqual(len(engines.loaded), 1)
+
+    def test_filter_ocr_results_cached(self):
+        tool = PaddleOCRTool()
+        image = make_text_image()
+        first = tool.filter_ocr_results(image)
+        second = tool.filter_ocr_results(image.copy())
+        self.assertEqual(second, first)
+        self.assertIsInstance(second[0][1], tuple)
+        # 缓存命中时不再推理，不同阈值共用同一条缓存
+        self.assertEqual(len(engines.get(engines.config()).calls), 1)
+        self.assertEqual(tool.filter_ocr_results(image, confidence_threshold=0.95), [])
+        self.assertEqual(len(engines.get(engines.config()).calls), 1)
+
+    def test_registry_key(self):
+        registry = OcrEngineRegistry(FakeEngine)
+        self.assertEqual(registry.key(registry.config()), registry.key(registry.config()))
+        self.assertNotEqual(registry.key(registry.config()), registry.key(registry.config(lang='en')))
+        with registry.session() as engine:
+            self.assertIs(engine, registry.get())
+
+
+class TestReadFields(FakeEngineTestCase):
+    """批量读取字段测试"""
+
+    def test_read_fields_batched(self):
+        scene = np.full((200, 400, 3), 255, dtype=np.uint8)
+        fields = {'name': (10, 10, 120, 30), 'level': [[200, 10], [260, 10], [260, 40], [200, 40]],
+                  'notes': (0, 100, 300, 80), 'outside': (500, 500, 10, 10)}
+        result = OcrActions().read_fields(scene, fields, multiline=['notes'])
+        self.assertEqual(result['name'], ('w120', 0.95))
+        self.assertEqual(result['level'], ('w61', 0.95))
+        self.assertEqual(result['notes'], ('w300', 0.9))
+        self.assertEqual(result['outside'], ('', 0.0))
+        engine = engines.get(engines.config())
+        self.assertEqual([det for _, det in engine.calls], [False, True])
+        # 相同画面再次读取只命中缓存
+        OcrActions().read_fields(scene, fields, multiline=['notes'])
+        self.assertEqual(len(engine.calls), 2)
+
+
+    def test_legacy_rec_result_shape(self):
+        crops = [np.full((32, width, 3), 255, dtype=np.uint8) for width in (40, 50, 60)]
+        expected = [('w40', 0.95), ('w50', 0.95), ('w60', 0.95)]
+        self.assertEqual(PaddleOCRTool(legacy=True).recognize_lines(crops), expected)
+        self.assertEqual(split_rec_result([[('a', 0.9)], [('b', 0.8)]], 2), [('a', 0.9), ('b', 0.8)])
+        self.assertEqual(split_rec_result([[('a', 0.9), ('b', 0.8)]], 2), [('a', 0.9), ('b', 0.8)])
+        with self.assertRaises(ValueError):
+            split_rec_result([[('a', 0.9)]], 2)
+
+    def test_rec_count_mismatch_falls_back(self):
+        crops = [np.full((32, width, 3), 255, dtype=np.uint8) for width in (40, 50)]
+        tool = PaddleOCRTool()
+        with patch.object(FakeEngine, 'ocr', autospec=True, side_effect=[
+                [[('w40', 0.95)]], [[('w40', 0.95)]], [[('w50', 0.95)]]]):
+            self.assertEqual(tool.recognize_lines(crops), [('w40', 0.95), ('w50', 0.95)])
+
+class TestOcrService(unittest.TestCase):
+    """进程外 OCR 服务测试"""
+
+    def test_submit_batch_and_deadline(self):
+        crops = [np.full((32, width, 3), 255, dtype=np.uint8) for width in (40, 50, 60)]
+        with OcrService(workers=1, factory=FakeEngine, config={'delay': 0.2}, max_pending=4) as service:
+            first = service.submit(make_text_image())
+            lines = [service.submit(crops[:2], det=False), service.submit(crops[2:], det=False)]
+            with self.assertRaises(queue.Full):
+                for _ in range(2):
+                    service.submit(crops[0], det=False, block=False)
+            self.assertEqual(first.result(timeout=30)[0][0][1], ('w320', 0.9))
+            self.assertEqual(lines[0].result(timeout=30), [[('w40', 0.95), ('w50', 0.95)]])
+            self.assertEqual(lines[1].result(timeout=30), [[('w60', 0.95)]])
+            expired = service.submit(crops[0], timeout=0.0)
+            with self.assertRaises(TimeoutError):
+                expired.result(timeout=30)
+            tool = PaddleOCRTool(service=service)
+            self.assertEqual(tool.recognize_lines(crops), [('w40', 0.95), ('w50', 0.95), ('w60', 0.95)])
+        self.assertEqual(service.pending, 0)
+        with self.assertRaises(RuntimeError):
+            service.submit(crops[0])
+
+    def test_mixed_requests_use_all_workers(self):
+        crops = [np.full((32, width, 3), 255, dtype=np.uint8) for width in (40, 50)]
+        with OcrService(workers=2, factory=FakeEngine, config={'delay': 0.5}) as service:
+            start = time.perf_counter()
+            futures = [service.submit(make_text_image()), service.submit(crops, det=False),
+                       service.submit(make_text_image(width=200)), service.submit(crops[:1], det=False)]
+            self.assertEqual(sorted(p.worker for p in service._pending.values()), [0, 0, 1, 1])
+            results = [future.result(timeout=30) for future in futures]
+            # 两个进程各处理两个请求，整段耗时约为两次推理而不是四次
+            self.assertLess(time.perf_counter() - start, 1.8)
+        self.assertEqual(results[0][0][0][1], ('w320', 0.9))
+        self.assertEqual(results[1], [[('w40', 0.95), ('w50', 0.95)]])
+        self.assertEqual(results[2][0][0][1], ('w200', 0.9))
+        self.assertEqual(results[3], [[('w40', 0.95)]])
+
+    def test_worker_crash_fails_only_its_requests(self):
+        with OcrService(workers=2, factory=FakeEngine, config={'delay': 1.0}) as service:
+            futures = [service.submit(make_text_image()) for _ in range(2)]
+            # 空闲进程优先，两个请求分别分配给两个进程
+            self.assertEqual([p.worker for _, p in sorted(service._pending.items())], [0, 1])
+            crashed = service._processes[0]
+            crashed.kill()
+            with self.assertRaises(RuntimeError):
+                futures[0].result(timeout=30)
+            self.assertEqual(futures[1].result(timeout=30)[0][0][1], ('w320', 0.9))
+            # 退出的进程被重启，之后的请求正常完成
+            deadline = time.time() + 30
+            while len(service._started) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNot(service._processes[0], crashed)
+            self.assertEqual(service.ocr(make_text_image(), timeout=30)[0][0][1], ('w320', 0.9))
+            self.assertEqual(service.pending, 0)
+
+    def test_tool_warm_up_uses_service(self):
+        loads = []
+        factory, engines.factory = engines.factory, loads.append
+        try:
+            with OcrService(workers=1, factory=FakeEngine, start_timeout=None) as service:
+                tool = PaddleOCRTool(service=service)
+                tool.warm_up()
+                self.assertTrue(service._ready.is_set())
+                tool.unload()
+                self.assertEqual(tool.filter_ocr_results(make_text_image(), use_cache=False)[0][1], ('w320', 0.9))
+            # 预热和释放都不在本进程加载或释放引擎
+            self.assertEqual(loads, [])
+            with self.assertRaises(RuntimeError):
+                tool.warm_up()
+        finally:
+            engines.factory = factory
+
+    def test_workers_fail_to_start(self):
+        start = time.perf_counter()
+        with self.assertRaises(RuntimeError):
+            OcrService(workers=1, factory=broken_engine, start_timeout=60)
+        self.assertLess(time.perf_counter() - start, 30)
+
+        service = OcrService(workers=1, factory=broken_engine, start_timeout=None)
+        self.assertTrue(service._ready.wait(60))
+        with self.assertRaises(RuntimeError):
+            service.submit(make_text_image())
+        self.assertEqual(service.pending, 0)
+        service.close()
+
+    def test_rec_count_mismatch_fails_group(self):
+        crops = [np.full((32, width, 3), 255, dtype=np.uint8) for width in (40, 50)]
+        with OcrService(workers=1, factory=ShortEngine) as service:
+            futures = [service.submit(crops[:1], det=False), service.submit(crops[1:], det=False)]
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=30)
+
+
+if __name__ == '__main__':
+    unittest.main()